@@ -4,18 +4,184 @@ Application Configuration
 
 import os
 from pathlib import Path
+from typing import Optional
 
 
 class Settings:
     """Application settings"""
 
-    # API Settings
+    # API Settings (an empty API_KEY disables the shared key)
     API_KEY: str = os.getenv("API_KEY", "veefyed-UV9tbAcqbFpk")
+    # Per-client keys: JSON file or SQLite database (.db/.sqlite) of salted
+    # key hashes, managed with python -m app.utils.api_keys
+    API_KEYS_FILE: Optional[Path] = (
+        Path(os.environ["API_KEYS_FILE"]) if os.getenv("API_KEYS_FILE") else None
+    )
+    # Seconds between checks of API_KEYS_FILE for changes
+    API_KEYS_RELOAD_INTERVAL: float = float(os.getenv("API_KEYS_RELOAD_INTERVAL", "5"))
+    API_KEY_CACHE_SIZE: int = int(os.getenv("API_KEY_CACHE_SIZE", "4096"))
+    # Default per-key token bucket: requests per second (0 disables) and burst
+    API_KEY_RATE_LIMIT: float = float(os.getenv("API_KEY_RATE_LIMIT", "0"))
+    API_KEY_RATE_BURST: int = int(os.getenv("API_KEY_RATE_BURST", "20"))
 
     # File Upload Settings
     MAX_FILE_SIZE: int = 5 * 1024 * 1024  # 5MB
     ALLOWED_EXTENSIONS: set = {".jpg", ".jpeg", ".png"}
     UPLOAD_DIR: Path = Path("uploads")
+    # Upload bytes buffered between writes to storage
+    UPLOAD_CHUNK_SIZE: int = int(os.getenv("UPLOAD_CHUNK_SIZE", str(256 * 1024)))  # 256KB
+    # Dimension limits checked from the image header before storing
+    MAX_IMAGE_WIDTH: int = int(os.getenv("MAX_IMAGE_WIDTH", "10000"))
+    MAX_IMAGE_HEIGHT: int = int(os.getenv("MAX_IMAGE_HEIGHT", "10000"))
+    MAX_IMAGE_PIXELS: int = int(os.getenv("MAX_IMAGE_PIXELS", str(50_000_000)))
+    # How far into a file to look for the JPEG SOF / PNG IHDR header
+    IMAGE_HEADER_MAX_BYTES: int = int(os.getenv("IMAGE_HEADER_MAX_BYTES", str(256 * 1024)))
+    UPLOAD_FSYNC: bool = os.getenv("UPLOAD_FSYNC", "false").lower() == "true"
+
+    # Multi-file uploads: limits for the whole request (each file is still
+    # bound by MAX_FILE_SIZE) and files committed at once
+    UPLOAD_BATCH_MAX_FILES: int = int(os.getenv("UPLOAD_BATCH_MAX_FILES", "20"))
+    UPLOAD_BATCH_MAX_BYTES: int = int(
+        os.getenv("UPLOAD_BATCH_MAX_BYTES", str(50 * 1024 * 1024))
+    )  # 50MB
+    UPLOAD_BATCH_CONCURRENCY: int = int(os.getenv("UPLOAD_BATCH_CONCURRENCY", "4"))
+
+    # Resumable upload sessions (kept in a hidden directory of UPLOAD_DIR so
+    # completed files can be renamed into place)
+    UPLOAD_SESSION_DIR: Path = UPLOAD_DIR / ".sessions"
+    # Seconds without activity before an incomplete session is discarded
+    UPLOAD_SESSION_TTL: float = float(os.getenv("UPLOAD_SESSION_TTL", str(24 * 3600)))
+    UPLOAD_SESSION_GC_INTERVAL: float = float(os.getenv("UPLOAD_SESSION_GC_INTERVAL", "600"))
+
+    # Admission control: requests of each class running at once (0 disables
+    # the limit) and requests allowed to wait for a slot; beyond that, or
+    # after ADMISSION_QUEUE_TIMEOUT seconds of waiting, requests get a 503
+    UPLOAD_MAX_CONCURRENCY: int = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "16"))
+    UPLOAD_MAX_QUEUE: int = int(os.getenv("UPLOAD_MAX_QUEUE", "64"))
+    # Upload bytes (by Content-Length) admitted at once, 0 for no byte limit
+    UPLOAD_MAX_INFLIGHT_BYTES: int = int(
+        os.getenv("UPLOAD_MAX_INFLIGHT_BYTES", str(128 * 1024 * 1024))
+    )  # 128MB
+    ANALYZE_MAX_CONCURRENCY: int = int(os.getenv("ANALYZE_MAX_CONCURRENCY", "32"))
+    ANALYZE_MAX_QUEUE: int = int(os.getenv("ANALYZE_MAX_QUEUE", "128"))
+    ADMISSION_QUEUE_TIMEOUT: float = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+    ADMISSION_RETRY_AFTER: float = float(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+    # /health status code while saturated (503 lets a load balancer route around)
+    HEALTH_SATURATED_STATUS: int = int(os.getenv("HEALTH_SATURATED_STATUS", "200"))
+
+    # Sharded layout: files live in nested directories named after the ID
+    # prefix, e.g. uploads/ab/12/ab12cd34-....jpg with depth 2 (0 is flat;
+    # migrate existing files with python -m app.utils.migrate_storage)
+    STORAGE_SHARD_DEPTH: int = int(os.getenv("STORAGE_SHARD_DEPTH", "0"))
+    STORAGE_SHARD_WIDTH: int = int(os.getenv("STORAGE_SHARD_WIDTH", "2"))
+
+    # Content-addressed storage: identical uploads share one blob in BLOB_DIR
+    CONTENT_ADDRESSED_STORAGE: bool = (
+        os.getenv("CONTENT_ADDRESSED_STORAGE", "false").lower() == "true"
+    )
+    BLOB_DIR: Path = UPLOAD_DIR / "blobs"
+
+    # Derivatives generated after upload as "name:max_side" pairs, stored
+    # next to the original as {image_id}.{name}.jpg (workers 0 disables them)
+    DERIVATIVES: str = os.getenv("DERIVATIVES", "thumb:256,analysis:512")
+    DERIVATIVE_WORKERS: int = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+    DERIVATIVE_QUALITY: int = int(os.getenv("DERIVATIVE_QUALITY", "85"))
+    # Rendition engines that decode pixels read instead of the original (rendered
+    # on demand when an analyze request arrives before the background render)
+    ANALYSIS_RENDITION: str = os.getenv("ANALYSIS_RENDITION", "analysis")
+
+    # Ingest normalization in NORMALIZE_WORKERS threads (0 disables it):
+    # EXIF orientation applied, EXIF/XMP stripped and images downscaled to
+    # NORMALIZE_MAX_DIMENSION before they are stored
+    NORMALIZE_WORKERS: int = int(os.getenv("NORMALIZE_WORKERS", "0"))
+    NORMALIZE_MAX_DIMENSION: int = int(os.getenv("NORMALIZE_MAX_DIMENSION", "2048"))
+    NORMALIZE_QUALITY: int = int(os.getenv("NORMALIZE_QUALITY", "85"))
+
+    # Cache-Control of served images. Downloads require an API key, so
+    # responses are private; originals tagged with their content digest
+    # never change, while renditions can be re-rendered
+    IMAGE_CACHE_CONTROL: str = os.getenv(
+        "IMAGE_CACHE_CONTROL", "private, max-age=31536000, immutable"
+    )
+    RENDITION_CACHE_CONTROL: str = os.getenv("RENDITION_CACHE_CONTROL", "private, max-age=3600")
+
+    # Perceptual hashes (dHash) of uploads, computed by PHASH_WORKERS threads
+    # and logged to PHASH_INDEX_FILE; only while NEAR_DUPLICATE_REUSE is on
+    PHASH_WORKERS: int = int(os.getenv("PHASH_WORKERS", "1"))
+    PHASH_INDEX_FILE: Path = Path(os.getenv("PHASH_INDEX_FILE", str(UPLOAD_DIR / ".phash.log")))
+    # Serve the cached analysis of an image whose hash differs in at most
+    # NEAR_DUPLICATE_DISTANCE of 64 bits instead of running the engine
+    NEAR_DUPLICATE_REUSE: bool = os.getenv("NEAR_DUPLICATE_REUSE", "false").lower() == "true"
+    NEAR_DUPLICATE_DISTANCE: int = int(os.getenv("NEAR_DUPLICATE_DISTANCE", "4"))
+
+    # Analysis Settings
+    # "mock" or "features"; features decodes images and needs ANALYSIS_WORKERS
+    ANALYSIS_ENGINE: str = os.getenv("ANALYSIS_ENGINE", "mock")
+    # Worker processes running the engine (0 runs it inline on the event loop,
+    # which only suits the mock engine)
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", "0"))
+    # Seconds per engine call in the worker pool; inline calls can't time out
+    ANALYSIS_TIMEOUT: float = float(os.getenv("ANALYSIS_TIMEOUT", "30"))
+    # Micro-batching of concurrent analyze requests into engine batches
+    MICRO_BATCH_ENABLED: bool = os.getenv("MICRO_BATCH_ENABLED", "false").lower() == "true"
+    MICRO_BATCH_MAX_SIZE: int = int(os.getenv("MICRO_BATCH_MAX_SIZE", "32"))
+    MICRO_BATCH_MAX_WAIT_MS: float = float(os.getenv("MICRO_BATCH_MAX_WAIT_MS", "5"))
+
+    ANALYZE_BATCH_MAX_SIZE: int = int(os.getenv("ANALYZE_BATCH_MAX_SIZE", "200"))
+    ANALYZE_BATCH_CONCURRENCY: int = int(os.getenv("ANALYZE_BATCH_CONCURRENCY", "8"))
+
+    # Analysis Cache Settings (size 0 disables the cache)
+    ANALYSIS_CACHE_SIZE: int = int(os.getenv("ANALYSIS_CACHE_SIZE", "10000"))
+    ANALYSIS_CACHE_TTL: float = float(os.getenv("ANALYSIS_CACHE_TTL", "86400"))  # 1 day
+    ANALYSIS_CACHE_DB: Optional[Path] = (
+        Path(os.environ["ANALYSIS_CACHE_DB"]) if os.getenv("ANALYSIS_CACHE_DB") else None
+    )
+    # "image_id" or "digest" (share results between identical uploads)
+    ANALYSIS_CACHE_KEY: str = os.getenv("ANALYSIS_CACHE_KEY", "image_id")
+
+    # Asynchronous Job Settings (0 workers disables the job endpoints)
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "0"))
+    JOB_QUEUE_DB: Path = Path(os.getenv("JOB_QUEUE_DB", str(UPLOAD_DIR / ".jobs.db")))
+    # Seconds after which a running job whose worker vanished is retried
+    JOB_LEASE_TIMEOUT: float = float(os.getenv("JOB_LEASE_TIMEOUT", "300"))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    # Seconds between queue polls for jobs submitted by other processes
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "1"))
+
+    # Metadata store: one SQLite (WAL) row per image with its latest analysis,
+    # written in batches every METADATA_FLUSH_INTERVAL_MS or once
+    # METADATA_FLUSH_MAX_BATCH rows are queued
+    METADATA_STORE_ENABLED: bool = os.getenv("METADATA_STORE_ENABLED", "true").lower() == "true"
+    METADATA_DB: Path = Path(os.getenv("METADATA_DB", str(UPLOAD_DIR / ".metadata.db")))
+    METADATA_FLUSH_INTERVAL_MS: float = float(os.getenv("METADATA_FLUSH_INTERVAL_MS", "100"))
+    METADATA_FLUSH_MAX_BATCH: int = int(os.getenv("METADATA_FLUSH_MAX_BATCH", "500"))
+    # Page size of GET /api/images (default and largest accepted)
+    METADATA_PAGE_SIZE: int = int(os.getenv("METADATA_PAGE_SIZE", "50"))
+    METADATA_MAX_PAGE_SIZE: int = int(os.getenv("METADATA_MAX_PAGE_SIZE", "500"))
+
+    # Image Index Settings
+    IMAGE_INDEX_SNAPSHOT: Optional[Path] = (
+        Path(os.environ["IMAGE_INDEX_SNAPSHOT"])
+        if os.getenv("IMAGE_INDEX_SNAPSHOT")
+        else None
+    )
+    # When true, index misses are final; otherwise they fall back to a disk
+    # probe so images written by other workers are still found
+    IMAGE_INDEX_AUTHORITATIVE: bool = (
+        os.getenv("IMAGE_INDEX_AUTHORITATIVE", "false").lower() == "true"
+    )
+
+    # Logging Settings
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO").upper()
+    # "text" or "json" (one compact JSON object per line)
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "text")
+    # Hand records to a background thread instead of writing on the event loop
+    LOG_QUEUE: bool = os.getenv("LOG_QUEUE", "true").lower() == "true"
+    # Fraction of requests whose INFO/DEBUG lines are kept (warnings always are)
+    LOG_SAMPLE_RATE: float = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+
+    # Expose Prometheus metrics at /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
 
     # Server Settings
     HOST: str = os.getenv("HOST", "0.0.0.0")
@@ -24,6 +190,8 @@ class Settings:
     def __init__(self):
         # Create upload directory if it doesn't exist
         self.UPLOAD_DIR.mkdir(exist_ok=True)
+        if self.CONTENT_ADDRESSED_STORAGE:
+            self.BLOB_DIR.mkdir(exist_ok=True)
 
 
 settings = Settings()
@@ -3,28 +3,77 @@ FastAPI Backend Service for Image Upload and Analysis
 Main application entry point
 """
 
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import logging
-import time
 
-from app.routes import upload, analyze
+from app.routes import upload, uploads, images, analyze, jobs
 from app.config import settings
+from app.services.batch_scheduler import batch_scheduler
+from app.services.derivative_service import derivative_service
+from app.services.engine_pool import engine_pool
+from app.services.job_service import job_service
+from app.services.metadata_service import metadata_service
+from app.services.near_duplicate_service import near_duplicate_service
+from app.services.normalize_service import ingest_normalizer
+from app.services.upload_session_service import upload_session_service
+from app.utils.analysis_cache import analysis_cache
+from app.utils.api_keys import api_key_store
+from app.utils.image_index import image_index
+from app.utils.log_config import configure_logging
+from app.utils.admission import admission_status, analyze_admission, is_saturated, upload_admission
+from app.utils.middleware import AdmissionMiddleware, RequestContextMiddleware
+from app.utils import metrics
 
 # Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application startup and shutdown"""
+    await api_key_store.start()
+    await image_index.load()
+    await metadata_service.start()
+    await asyncio.to_thread(engine_pool.start)
+    await asyncio.to_thread(analysis_cache.open, engine_pool.engine.identity)
+    if settings.MICRO_BATCH_ENABLED:
+        batch_scheduler.start()
+    derivative_service.start()
+    await near_duplicate_service.start()
+    ingest_normalizer.start()
+    await upload_session_service.start()
+    await job_service.start()
+    yield
+    await job_service.stop()
+    await upload_session_service.stop()
+    await ingest_normalizer.stop()
+    await near_duplicate_service.stop()
+    await derivative_service.stop()
+    await batch_scheduler.stop()
+    await asyncio.to_thread(engine_pool.shutdown)
+    await metadata_service.stop()
+    await image_index.persist()
+    await asyncio.to_thread(analysis_cache.close)
+    await api_key_store.stop()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Veefyed - Backend Technical Task",
     description="Backend service for image upload and analysis",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+# Admission control for uploads and analysis (innermost, so shed requests
+# still get CORS headers, a request ID and metrics)
+app.add_middleware(AdmissionMiddleware)
+
 # CORS middleware (adjust origins for production)
 app.add_middleware(
     CORSMiddleware,
@@ -35,31 +84,77 @@ app.add_middleware(
 )
 
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start_time = time.time()
-
-    logger.info(f"Request: {request.method} {request.url.path}")
-
-    response = await call_next(request)
-
-    process_time = time.time() - start_time
-    logger.info(f"Response: {response.status_code} | Time: {process_time:.2f}s")
-
-    return response
+# Request ID, timing, logging and metrics (raw ASGI, outermost)
+app.add_middleware(RequestContextMiddleware)
 
 
 # Include routers
 app.include_router(upload.router, prefix="/api", tags=["Upload"])
+app.include_router(uploads.router, prefix="/api", tags=["Upload"])
+app.include_router(images.router, prefix="/api", tags=["Images"])
 app.include_router(analyze.router, prefix="/api", tags=["Analysis"])
+app.include_router(jobs.router, prefix="/api", tags=["Jobs"])
 
 
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "veefyed-backend-task", "version": "1.0.0"}
+    """
+    Health check endpoint
+
+    Reports "saturated" while any admission-controlled route class is at
+    its limit, with HEALTH_SATURATED_STATUS as the status code.
+    """
+    saturated = is_saturated()
+    content = {
+        "status": "saturated" if saturated else "healthy",
+        "service": "veefyed-backend-task",
+        "version": "1.0.0",
+        "admission": admission_status(),
+    }
+    if saturated:
+        return JSONResponse(status_code=settings.HEALTH_SATURATED_STATUS, content=content)
+    return content
+
+
+# Prometheus metrics endpoint
+if settings.METRICS_ENABLED:
+    metrics.register_stats(
+        "analysis_cache",
+        analysis_cache.stats,
+        counters=("hits", "disk_hits", "misses", "evictions", "expirations"),
+    )
+    metrics.register_stats(
+        "analysis_batching", batch_scheduler.stats, counters=("batches", "items")
+    )
+    metrics.register_stats(
+        "derivatives", derivative_service.stats, counters=("generated", "failed")
+    )
+    metrics.register_stats(
+        "near_duplicates",
+        near_duplicate_service.stats,
+        counters=("hashed", "failed", "reused", "misses"),
+    )
+    metrics.register_stats(
+        "normalization",
+        ingest_normalizer.stats,
+        counters=("normalized", "unchanged", "failed", "bytes_before", "bytes_after"),
+    )
+    metrics.register_stats(
+        "metadata_store", metadata_service.stats, counters=("written", "batches", "failures")
+    )
+    for limiter in (upload_admission, analyze_admission):
+        metrics.register_stats(
+            f"admission_{limiter.name}",
+            limiter.stats,
+            counters=("admitted", "rejected", "timeouts"),
+        )
+
+    @app.get("/metrics", include_in_schema=False)
+    async def prometheus_metrics():
+        """Metrics in the Prometheus text format"""
+        body, content_type = metrics.render_metrics()
+        return Response(content=body, media_type=content_type)
 
 
 # Root endpoint
@@ -71,7 +166,12 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "upload": "/api/upload",
+            "upload_batch": "/api/upload/batch",
+            "resumable_upload": "/api/uploads",
+            "images": "/api/images",
             "analyze": "/api/analyze",
+            "analyze_batch": "/api/analyze/batch",
+            "jobs": "/api/jobs",
             "health": "/health",
         },
         "docs": "/docs",
@@ -81,7 +181,7 @@ async def root():
 # Global exception handler
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
-    logger.error(f"Unhandled exception: {str(exc)}", exc_info=True)
+    logger.error("Unhandled exception: %s", exc, exc_info=True)
     return JSONResponse(
         status_code=500,
         content={
@@ -2,10 +2,20 @@
 Analysis Route Handler
 """
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
+from typing import List
+import asyncio
+import json
 import logging
 
+from app.config import settings
 from app.services.analysis_service import AnalysisService
+from app.services.batch_scheduler import batch_scheduler
+from app.services.derivative_service import derivative_service
+from app.services.job_service import job_service
+from app.services.near_duplicate_service import near_duplicate_service
+from app.utils.analysis_cache import analysis_cache
 from app.utils.auth import verify_api_key
 
 logger = logging.getLogger(__name__)
@@ -25,6 +35,41 @@ class AnalyzeRequest(BaseModel):
         }
 
 
+class BatchAnalyzeRequest(BaseModel):
+    """Request model for batch image analysis"""
+    image_ids: List[str]
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "image_ids": ["abc123-def456-ghi789", "jkl012-mno345-pqr678"]
+            }
+        }
+
+
+def validate_batch_request(request: BatchAnalyzeRequest) -> None:
+    """
+    Validate the size of a batch analysis request
+    
+    Args:
+        request: Batch analysis request
+        
+    Raises:
+        HTTPException: If the batch is empty or too large
+    """
+    if not request.image_ids:
+        raise HTTPException(
+            status_code=400,
+            detail="image_ids is required and cannot be empty"
+        )
+    
+    if len(request.image_ids) > settings.ANALYZE_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch size exceeds maximum of {settings.ANALYZE_BATCH_MAX_SIZE} images"
+        )
+
+
 @router.post("/analyze")
 async def analyze_image(
     request: AnalyzeRequest,
@@ -49,10 +94,13 @@ async def analyze_image(
     - 401: Missing API key
     - 403: Invalid API key
     - 404: Image not found
+    - 422: Image could not be decoded
     - 500: Server error
+    - 503: Analysis engine unavailable (its worker pool broke)
+    - 504: Analysis timed out
     """
     try:
-        logger.info(f"Analysis request received for image: {request.image_id}")
+        logger.info("Analysis request received for image: %s", request.image_id)
         
         if not request.image_id or not request.image_id.strip():
             raise HTTPException(
@@ -63,7 +111,7 @@ async def analyze_image(
         # Perform analysis
         result = await AnalysisService.analyze_image(request.image_id)
         
-        logger.info(f"Analysis successful for: {request.image_id}")
+        logger.info("Analysis successful for: %s", request.image_id)
         
         return result
         
@@ -72,8 +120,112 @@ async def analyze_image(
         raise
         
     except Exception as e:
-        logger.error(f"Analysis failed: {str(e)}", exc_info=True)
+        logger.error("Analysis failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="Failed to analyze image"
         )
+
+
+@router.post("/analyze/batch")
+async def analyze_batch(
+    request: BatchAnalyzeRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Analyze several uploaded images in one request
+    
+    **Authentication:** Requires X-API-Key header
+    
+    **Request:**
+    - image_ids: List of image identifiers (max ANALYZE_BATCH_MAX_SIZE)
+    
+    **Response:**
+    - results: Per-image entries in request order, each with index, image_id,
+      status ("ok" or "error") and either result or error
+    - succeeded: Number of successful analyses
+    - failed: Number of failed analyses
+    
+    **Errors:**
+    - 400: Empty or oversized batch
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 500: Server error
+    """
+    validate_batch_request(request)
+    
+    logger.info("Batch analysis request received for %s images", len(request.image_ids))
+    
+    results = await AnalysisService.analyze_batch(
+        request.image_ids, settings.ANALYZE_BATCH_CONCURRENCY
+    )
+    succeeded = sum(1 for item in results if item["status"] == "ok")
+    
+    logger.info("Batch analysis completed: %s/%s succeeded", succeeded, len(results))
+    
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
+
+
+@router.post("/analyze/batch/stream")
+async def analyze_batch_stream(
+    request: BatchAnalyzeRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Analyze several uploaded images, streaming results as NDJSON
+    
+    **Authentication:** Requires X-API-Key header
+    
+    **Request:**
+    - image_ids: List of image identifiers (max ANALYZE_BATCH_MAX_SIZE)
+    
+    **Response:**
+    - application/x-ndjson stream with one line per image, emitted in
+      completion order (same entry shape as /analyze/batch results)
+    
+    **Errors:**
+    - 400: Empty or oversized batch
+    - 401: Missing API key
+    - 403: Invalid API key
+    """
+    validate_batch_request(request)
+    
+    logger.info(
+        "Streaming batch analysis request received for %s images", len(request.image_ids)
+    )
+    
+    async def generate():
+        async for item in AnalysisService.iter_analyze_batch(
+            request.image_ids, settings.ANALYZE_BATCH_CONCURRENCY
+        ):
+            yield json.dumps(item) + "\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.get("/analyze/stats")
+async def analysis_stats(api_key: str = Depends(verify_api_key)):
+    """
+    Get analysis pipeline statistics
+    
+    **Authentication:** Requires X-API-Key header
+    
+    **Response:**
+    - cache: Result cache counters (hits, misses, evictions, ...)
+    - batching: Micro-batch scheduler metrics (queue depth, batch sizes,
+      added latency)
+    - jobs: Asynchronous job counts by status
+    - derivatives: Background rendition counters
+    - near_duplicates: Perceptual hash index size and reuse counters
+    """
+    return {
+        "cache": analysis_cache.stats(),
+        "batching": batch_scheduler.stats(),
+        "jobs": await asyncio.to_thread(job_service.stats),
+        "derivatives": derivative_service.stats(),
+        "near_duplicates": near_duplicate_service.stats()
+    }
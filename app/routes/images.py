@@ -0,0 +1,208 @@
+"""
+Image Retrieval Route Handler
+"""
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import FileResponse
+from typing import Literal, Optional
+import logging
+import os
+
+from app.config import settings
+from app.services.image_service import ImageService
+from app.services.metadata_service import metadata_service
+from app.utils.auth import verify_api_key
+from app.utils.image_index import ImageRecord
+from app.utils.storage import ORIGINAL_RENDITION
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def make_etag(record: ImageRecord, rendition: Optional[str], stat_result: os.stat_result) -> str:
+    """
+    Build a strong ETag for a served file
+
+    Originals with a known SHA-256 digest are tagged with it, so identical
+    content shares a tag across image IDs and restarts. Renditions (which
+    can be regenerated with other settings) and originals without a digest
+    are tagged with their size and modification time.
+
+    Args:
+        record: Record of the image
+        rendition: Derivative name, or None for the original
+        stat_result: Stat result of the served file
+
+    Returns:
+        Quoted entity tag
+    """
+    if rendition is None and record.digest:
+        return f'"{record.digest}"'
+
+    version = f"{stat_result.st_size:x}-{stat_result.st_mtime_ns:x}"
+    if rendition is not None:
+        return f'"{record.image_id}.{rendition}-{version}"'
+    return f'"{version}"'
+
+
+def cache_control(record: ImageRecord, rendition: Optional[str]) -> str:
+    """
+    Choose the Cache-Control header of a served file
+
+    Only originals tagged with their digest are immutable; renditions and
+    files tagged by size and modification time can change, and are
+    revalidated against their ETag once stale.
+
+    Args:
+        record: Record of the image
+        rendition: Derivative name, or None for the original
+
+    Returns:
+        Cache-Control header value
+    """
+    if rendition is None and record.digest:
+        return settings.IMAGE_CACHE_CONTROL
+    return settings.RENDITION_CACHE_CONTROL
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """
+    Evaluate an If-None-Match header (weak comparison, RFC 9110)
+
+    Args:
+        if_none_match: Header value, e.g. '"abc", W/"def"' or '*'
+        etag: Current entity tag
+
+    Returns:
+        True if the client's copy is current
+    """
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return etag in candidates
+
+
+@router.get("/images")
+async def list_images(
+    limit: int = Query(
+        settings.METADATA_PAGE_SIZE, ge=1, le=settings.METADATA_MAX_PAGE_SIZE,
+        description="Images per page"
+    ),
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    since: Optional[float] = Query(None, description="Created at or after (Unix time)"),
+    until: Optional[float] = Query(None, description="Created before (Unix time)"),
+    format: Optional[Literal["jpeg", "png"]] = Query(None, description="Image format"),
+    digest: Optional[str] = Query(None, description="SHA-256 content digest"),
+    analyzed: Optional[bool] = Query(None, description="Only analyzed / unanalyzed images"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    List uploaded images with their latest analysis, newest first
+
+    **Authentication:** Requires X-API-Key header
+
+    **Request (query):**
+    - limit: Page size (default METADATA_PAGE_SIZE, max METADATA_MAX_PAGE_SIZE)
+    - cursor: Continue after the previous page
+    - since / until, format, digest, analyzed: Optional filters
+
+    **Response:**
+    - images: image_id, filename, size, content_type, format, width,
+      height, digest, created_at and analysis (engine, result,
+      analyzed_at, or null if never analyzed)
+    - next_cursor: Cursor of the next page, or null on the last page
+
+    **Errors:**
+    - 400: Invalid cursor
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 503: Metadata store is disabled
+    """
+    images, next_cursor = await metadata_service.query(
+        limit,
+        cursor=cursor,
+        since=since,
+        until=until,
+        format=format,
+        digest=digest,
+        analyzed=analyzed,
+    )
+    return {"images": images, "next_cursor": next_cursor}
+
+
+@router.get("/images/{image_id}/metadata")
+async def get_image_metadata(image_id: str, api_key: str = Depends(verify_api_key)):
+    """
+    Get the stored metadata and latest analysis of an image
+
+    **Authentication:** Requires X-API-Key header
+
+    **Response:**
+    - Same entry shape as GET /images
+
+    **Errors:**
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Image not found
+    - 503: Metadata store is disabled
+    """
+    return await metadata_service.get(image_id)
+
+
+@router.api_route("/images/{image_id}", methods=["GET", "HEAD"])
+async def get_image(
+    image_id: str,
+    request: Request,
+    rendition: Optional[str] = Query(
+        None, description="Derivative to serve, e.g. thumb, or original"
+    ),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Download a stored image or one of its renditions
+
+    **Authentication:** Requires X-API-Key header
+
+    **Request:**
+    - image_id: Unique identifier of the uploaded image
+    - rendition (query, optional): Derivative name from DERIVATIVES
+      (e.g. thumb); renditions are JPEG. "original" serves an upload kept
+      as sent by ingest normalization (keep_original)
+
+    The file is streamed by the server (with the ASGI pathsend extension
+    where the server supports it). Responses carry a strong ETag and a
+    private Cache-Control header (IMAGE_CACHE_CONTROL for originals,
+    RENDITION_CACHE_CONTROL for renditions) and vary on X-API-Key, so
+    shared caches never serve one client's images to another;
+    If-None-Match returns 304, and Range / If-Range requests return 206
+    partial content.
+
+    **Errors:**
+    - 400: Unknown rendition
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Image not found, rendition not generated yet, or original not kept
+    - 416: Range not satisfiable
+    """
+    record, path, stat_result = await ImageService.get_image_file(image_id, rendition)
+
+    headers = {
+        "ETag": make_etag(record, rendition, stat_result),
+        "Cache-Control": cache_control(record, rendition),
+        "Vary": "X-API-Key",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    return FileResponse(
+        path,
+        headers=headers,
+        media_type=(
+            record.content_type
+            if rendition in (None, ORIGINAL_RENDITION)
+            else "image/jpeg"
+        ),
+        stat_result=stat_result,
+    )
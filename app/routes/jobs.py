@@ -0,0 +1,123 @@
+"""
+Analysis Job Route Handler
+"""
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import JSONResponse, StreamingResponse
+import json
+import logging
+
+from app.routes.analyze import AnalyzeRequest
+from app.services.job_service import job_service
+from app.utils.auth import verify_api_key
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Seconds between SSE keep-alive comments on an idle stream
+SSE_HEARTBEAT = 15.0
+
+
+@router.post("/jobs", status_code=202)
+async def submit_job(
+    request: AnalyzeRequest,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Submit an uploaded image for asynchronous analysis
+
+    **Authentication:** Requires X-API-Key header
+
+    **Request:**
+    - image_id: Unique identifier of the uploaded image
+
+    **Response (202, or 200 if an existing job was returned):**
+    - job_id: Job identifier for polling and event streams
+    - image_id: Image identifier
+    - status: queued, running, succeeded or failed
+    - created: False when a job for this image already existed
+    - result / error: Set once the job has finished
+
+    Submissions are idempotent per image: resubmitting returns the
+    existing job, and a failed job is re-queued.
+
+    **Errors:**
+    - 400: Invalid request
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Image not found
+    - 503: Asynchronous jobs are disabled
+    """
+    if not request.image_id or not request.image_id.strip():
+        raise HTTPException(
+            status_code=400,
+            detail="image_id is required and cannot be empty"
+        )
+
+    job, created = await job_service.submit(request.image_id)
+
+    return JSONResponse(
+        status_code=202 if created else 200,
+        content={**job, "created": created}
+    )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: str, api_key: str = Depends(verify_api_key)):
+    """
+    Get the status of an analysis job
+
+    **Authentication:** Requires X-API-Key header
+
+    **Response:**
+    - job_id, image_id, status, attempts, created_at, updated_at
+    - result: Analysis result once status is succeeded
+    - error: status_code and detail once status is failed
+
+    **Errors:**
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Job not found
+    - 503: Asynchronous jobs are disabled
+    """
+    return await job_service.get(job_id)
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, api_key: str = Depends(verify_api_key)):
+    """
+    Stream job status changes as Server-Sent Events
+
+    **Authentication:** Requires X-API-Key header
+
+    **Response:**
+    - text/event-stream with one event per status change, named after the
+      status and carrying the job as JSON; the stream ends after the
+      succeeded or failed event
+
+    **Errors:**
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Job not found
+    - 503: Asynchronous jobs are disabled
+    """
+    # Resolve the job up front so unknown IDs get a plain 404
+    events = job_service.watch(job_id, SSE_HEARTBEAT)
+    first = await events.__anext__()
+
+    async def generate():
+        try:
+            yield f"event: {first['status']}\ndata: {json.dumps(first)}\n\n"
+            async for job in events:
+                if job is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield f"event: {job['status']}\ndata: {json.dumps(job)}\n\n"
+        finally:
+            await events.aclose()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
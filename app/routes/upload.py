@@ -1,20 +1,200 @@
 """
 Upload Route Handler
 """
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import AsyncIterator, Callable, List
 import logging
 
+from app.config import settings
 from app.services.image_service import ImageService
 from app.utils.auth import verify_api_key
+from app.utils.upload_stream import ReceivedFile, UploadStreamParser
+from app.utils.validators import file_too_large
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Room for the multipart boundaries and part headers around a single file
+MULTIPART_OVERHEAD = 16 * 1024
 
-@router.post("/upload")
+# Multipart bodies of the upload endpoints, documented by hand because the
+# form is parsed inside the handler (after the request limits are checked)
+UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"],
+                }
+            }
+        },
+    }
+}
+
+BATCH_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "files": {
+                            "type": "array",
+                            "items": {"type": "string", "format": "binary"},
+                        }
+                    },
+                    "required": ["files"],
+                }
+            }
+        },
+    }
+}
+
+
+def request_too_large() -> HTTPException:
+    max_size_mb = settings.UPLOAD_BATCH_MAX_BYTES / (1024 * 1024)
+    return HTTPException(
+        status_code=400,
+        detail=f"Request size exceeds maximum allowed size of {max_size_mb}MB"
+    )
+
+
+async def limit_body(
+    request: Request, max_bytes: int, too_large: Callable[[], HTTPException]
+) -> AsyncIterator[bytes]:
+    """
+    Stream a request body, enforcing a size limit as it arrives
+    
+    Args:
+        request: Incoming request
+        max_bytes: Largest body accepted
+        too_large: Builds the error raised once the body exceeds max_bytes
+        
+    Yields:
+        Body chunks
+        
+    Raises:
+        HTTPException: As soon as the body exceeds the limit
+    """
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_bytes:
+            raise too_large()
+        yield chunk
+
+
+async def read_form_files(
+    request: Request,
+    field: str,
+    max_bytes: int,
+    max_files: int,
+    too_large: Callable[[], HTTPException],
+    fail_fast: bool = False,
+) -> List[ReceivedFile]:
+    """
+    Stream the files of a multipart upload into storage within the request limits
+    
+    The declared Content-Length is checked before anything is read, and
+    the body size and file count while it is parsed. Each file is written
+    straight to its temporary path in the upload directory (see
+    ImageService.upload_target), so it is never spooled or copied.
+    
+    Args:
+        request: Incoming multipart/form-data request
+        field: Form field holding the files
+        max_bytes: Largest request body accepted
+        max_files: Largest number of files accepted
+        too_large: Builds the error raised for an oversized body
+        fail_fast: Raise the first invalid file at once instead of
+            reporting it with the others
+        
+    Returns:
+        Received files from the field; the caller stores or discards them
+        
+    Raises:
+        HTTPException: If the request is malformed, too large, has too
+            many files or none
+    """
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit():
+        if int(content_length) > max_bytes:
+            raise too_large()
+    
+    if not request.headers.get("content-type", "").startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data request")
+    
+    parser = UploadStreamParser(
+        request.headers,
+        limit_body(request, max_bytes, too_large),
+        field,
+        max_files,
+        ImageService.upload_target,
+        fail_fast,
+    )
+    files = await parser.parse()
+    if not files:
+        raise HTTPException(status_code=400, detail="No files provided")
+    return files
+
+
+async def read_upload_file(request: Request) -> ReceivedFile:
+    """
+    Receive the file of a single-image upload
+    
+    The body may exceed MAX_FILE_SIZE only by MULTIPART_OVERHEAD; the
+    exact file size is checked as the file is written. Content that is
+    not a JPEG/PNG (or doesn't match its extension or dimension limits)
+    is rejected from its first bytes, without reading the rest of the body.
+    
+    Args:
+        request: Incoming multipart/form-data request
+        
+    Returns:
+        The received file from the "file" field
+    """
+    files = await read_form_files(
+        request,
+        "file",
+        settings.MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+        1,
+        file_too_large,
+        fail_fast=True,
+    )
+    return files[0]
+
+
+async def read_batch_files(request: Request) -> List[ReceivedFile]:
+    """
+    Receive the files of a multi-file upload within UPLOAD_BATCH_MAX_BYTES
+    and UPLOAD_BATCH_MAX_FILES
+    
+    Args:
+        request: Incoming multipart/form-data request
+        
+    Returns:
+        Received files from the "files" field
+    """
+    return await read_form_files(
+        request,
+        "files",
+        settings.UPLOAD_BATCH_MAX_BYTES,
+        settings.UPLOAD_BATCH_MAX_FILES,
+        request_too_large,
+    )
+
+
+@router.post("/upload", openapi_extra=UPLOAD_BODY)
 async def upload_image(
-    file: UploadFile = File(...),
+    request: Request,
+    keep_original: bool = Query(
+        False, description="Keep the upload as sent if ingest normalization rewrites it"
+    ),
     api_key: str = Depends(verify_api_key)
 ):
     """
@@ -23,26 +203,37 @@ async def upload_image(
     **Authentication:** Requires X-API-Key header
     
     **Request:**
-    - file: Image file (JPEG or PNG, max 5MB)
+    - file (form-data): Image file (JPEG or PNG, max 5MB)
+    - keep_original (query, optional): With NORMALIZE_WORKERS set, keep
+      the upload as sent next to the normalized image (served as the
+      "original" rendition)
     
     **Response:**
     - image_id: Unique identifier for the uploaded image
     - filename: Original filename
     - status: Upload status
+    - format, width, height: Of the stored image
+    - normalization: With NORMALIZE_WORKERS set, whether the upload was
+      rewritten, bytes_before / bytes_after and original_kept
     
     **Errors:**
-    - 400: Invalid file type or size
+    - 400: Invalid file type, size, content or dimensions
     - 401: Missing API key
     - 403: Invalid API key
     - 500: Server error
+    
+    The body is parsed inside the handler, so a request larger than
+    MAX_FILE_SIZE is rejected as soon as it crosses the limit, and
+    invalid content as soon as its leading bytes arrive.
     """
+    file = await read_upload_file(request)
     try:
-        logger.info(f"Upload request received for file: {file.filename}")
+        logger.info("Upload request received for file: %s", file.filename)
         
         # Process the upload
-        result = await ImageService.process_upload(file)
+        result = await ImageService.process_upload(file, keep_original)
         
-        logger.info(f"Upload successful: {result['image_id']}")
+        logger.info("Upload successful: %s", result["image_id"])
         
         return result
         
@@ -51,8 +242,67 @@ async def upload_image(
         raise
         
     except Exception as e:
-        logger.error(f"Upload failed: {str(e)}", exc_info=True)
+        logger.error("Upload failed: %s", e, exc_info=True)
         raise HTTPException(
             status_code=500,
             detail="Failed to process image upload"
         )
+    
+    finally:
+        # Removes the temporary file unless it was stored
+        await file.discard()
+
+
+@router.post("/upload/batch", openapi_extra=BATCH_UPLOAD_BODY)
+async def upload_batch(
+    request: Request,
+    keep_original: bool = Query(
+        False, description="Keep the upload as sent if ingest normalization rewrites it"
+    ),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Upload several images in one request
+    
+    **Authentication:** Requires X-API-Key header
+    
+    **Request:**
+    - files (form-data, repeated): Image files (JPEG or PNG, max 5MB each,
+      at most UPLOAD_BATCH_MAX_FILES files and UPLOAD_BATCH_MAX_BYTES in total)
+    - keep_original (query, optional): As for /upload, for every file
+    
+    Files are validated and stored concurrently; one invalid file does
+    not fail the others.
+    
+    **Response:**
+    - results: Per-file entries in request order, each with index,
+      filename, status ("ok" or "error") and either result (as returned
+      by /upload) or error
+    - succeeded: Number of stored files
+    - failed: Number of rejected files
+    
+    **Errors:**
+    - 400: Malformed request, no files, too many files or request too large
+    - 401: Missing API key
+    - 403: Invalid API key
+    """
+    files = await read_batch_files(request)
+    
+    logger.info("Batch upload request received for %s files", len(files))
+    
+    try:
+        results = await ImageService.process_upload_batch(
+            files, settings.UPLOAD_BATCH_CONCURRENCY, keep_original
+        )
+    finally:
+        for file in files:
+            await file.discard()
+    succeeded = sum(1 for item in results if item["status"] == "ok")
+    
+    logger.info("Batch upload completed: %s/%s succeeded", succeeded, len(results))
+    
+    return {
+        "results": results,
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded
+    }
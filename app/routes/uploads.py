@@ -0,0 +1,205 @@
+"""
+Resumable Upload Route Handler
+"""
+from fastapi import APIRouter, HTTPException, Depends, Header, Request, Response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import logging
+
+from app.services.upload_session_service import upload_session_service
+from app.utils.auth import verify_api_key
+from app.utils.upload_sessions import UploadSession
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+# Content type required for PATCH bodies (as in tus)
+CHUNK_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+class UploadSessionRequest(BaseModel):
+    """Request model for starting a resumable upload"""
+    filename: str
+    length: int
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "filename": "photo.jpg",
+                "length": 4718592
+            }
+        }
+
+
+def session_response(session: UploadSession, status_code: int = 200) -> JSONResponse:
+    """
+    Build the JSON response describing a session
+
+    The offset and length are also sent as Upload-Offset/Upload-Length
+    headers so clients can resume from HEAD responses alone.
+    """
+    return JSONResponse(
+        status_code=status_code,
+        content={
+            "upload_id": session.upload_id,
+            "filename": session.filename,
+            "offset": session.offset,
+            "length": session.length,
+            "complete": session.complete,
+            "finalized": session.result is not None,
+        },
+        headers={
+            "Upload-Offset": str(session.offset),
+            "Upload-Length": str(session.length),
+            "Cache-Control": "no-store",
+        },
+    )
+
+
+@router.post("/uploads", status_code=201)
+async def create_upload(
+    request: UploadSessionRequest,
+    http_request: Request,
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Start a resumable upload
+
+    **Authentication:** Requires X-API-Key header
+
+    **Request:**
+    - filename: Original filename (JPEG or PNG)
+    - length: Total size in bytes (max 5MB)
+
+    **Response (201):**
+    - upload_id: Session identifier (also in the Location header)
+    - offset, length, complete, finalized
+
+    Then PATCH the bytes to /api/uploads/{upload_id} and POST
+    /api/uploads/{upload_id}/finalize once complete. Sessions without
+    activity for UPLOAD_SESSION_TTL seconds are discarded.
+
+    **Errors:**
+    - 400: Invalid file type or length
+    - 401: Missing API key
+    - 403: Invalid API key
+    """
+    session = await upload_session_service.create(request.filename, request.length)
+
+    response = session_response(session, status_code=201)
+    response.headers["Location"] = str(
+        http_request.url_for("get_upload", upload_id=session.upload_id)
+    )
+    return response
+
+
+@router.api_route("/uploads/{upload_id}", methods=["GET", "HEAD"])
+async def get_upload(upload_id: str, api_key: str = Depends(verify_api_key)):
+    """
+    Get the offset of a resumable upload
+
+    **Authentication:** Requires X-API-Key header
+
+    Clients resuming after a dropped connection continue from the
+    returned offset (HEAD returns only the Upload-Offset and
+    Upload-Length headers).
+
+    **Errors:**
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Session not found or expired
+    """
+    return session_response(await upload_session_service.get(upload_id))
+
+
+@router.patch("/uploads/{upload_id}")
+async def append_upload(
+    upload_id: str,
+    request: Request,
+    upload_offset: int = Header(..., alias="Upload-Offset"),
+    api_key: str = Depends(verify_api_key)
+):
+    """
+    Append a chunk to a resumable upload
+
+    **Authentication:** Requires X-API-Key header
+
+    **Request:**
+    - Upload-Offset header: Offset the chunk starts at (the current offset)
+    - Content-Type: application/offset+octet-stream
+    - Body: Raw bytes of the chunk
+
+    Bytes received before a dropped connection are kept; query the
+    offset and continue from there. The image header is validated as
+    soon as it has arrived.
+
+    **Errors:**
+    - 400: Chunk exceeds the declared length, or invalid image content
+      or dimensions (the session is discarded)
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Session not found or expired
+    - 409: Upload-Offset doesn't match the current offset
+    - 415: Wrong Content-Type
+    - 423: Another request is writing to the session
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    if content_type != CHUNK_CONTENT_TYPE:
+        raise HTTPException(
+            status_code=415,
+            detail=f"Content-Type must be {CHUNK_CONTENT_TYPE}"
+        )
+
+    session = await upload_session_service.append(upload_id, upload_offset, request.stream())
+    return session_response(session)
+
+
+@router.post("/uploads/{upload_id}/finalize")
+async def finalize_upload(upload_id: str, api_key: str = Depends(verify_api_key)):
+    """
+    Store a completely received upload
+
+    **Authentication:** Requires X-API-Key header
+
+    **Response:** Same as POST /api/upload. Repeating the call returns
+    the same result, so it is safe to retry.
+
+    **Errors:**
+    - 400: No valid image header was received
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Session not found or expired
+    - 409: Data is still missing
+    - 423: A request is still writing to the session
+    """
+    try:
+        result = await upload_session_service.finalize(upload_id)
+        logger.info("Upload successful: %s", result["image_id"])
+        return result
+
+    except HTTPException:
+        raise
+
+    except Exception as e:
+        logger.error("Upload finalize failed: %s", e, exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to process image upload"
+        )
+
+
+@router.delete("/uploads/{upload_id}", status_code=204)
+async def abort_upload(upload_id: str, api_key: str = Depends(verify_api_key)):
+    """
+    Discard a resumable upload
+
+    **Authentication:** Requires X-API-Key header
+
+    **Errors:**
+    - 401: Missing API key
+    - 403: Invalid API key
+    - 404: Session not found or expired
+    """
+    await upload_session_service.abort(upload_id)
+    return Response(status_code=204)
@@ -1,12 +1,21 @@
 """
 Analysis Service
-Handles image analysis operations (mock implementation)
+Handles image analysis operations
 """
-import random
+import asyncio
 import logging
+from typing import AsyncIterator, List
 from fastapi import HTTPException
 
-from app.utils.storage import image_exists, get_existing_image_path
+from app.services.batch_scheduler import batch_scheduler
+from app.services.derivative_service import derivative_service
+from app.services.engine_pool import EngineTimeoutError, EngineUnavailableError, engine_pool
+from app.services.engines import AnalysisError
+from app.services.metadata_service import metadata_service
+from app.services.near_duplicate_service import NEAR_DUPLICATE_KEY, near_duplicate_service
+from app.utils.analysis_cache import analysis_cache
+from app.utils.metrics import stage_timer
+from app.utils.storage import find_image
 
 logger = logging.getLogger(__name__)
 
@@ -14,94 +23,184 @@ logger = logging.getLogger(__name__)
 class AnalysisService:
     """Service for image analysis operations"""
     
-    # Mock data for analysis
-    SKIN_TYPES = ["Normal", "Oily", "Dry", "Combination", "Sensitive"]
-    
-    POSSIBLE_ISSUES = [
-        "Hyperpigmentation",
-        "Acne",
-        "Dark Spots",
-        "Fine Lines",
-        "Uneven Tone",
-        "Redness",
-        "Dryness",
-        "Enlarged Pores"
-    ]
-    
     @staticmethod
-    def _generate_mock_analysis(image_id: str) -> dict:
+    async def analyze_image(image_id: str) -> dict:
         """
-        Generate mock analysis results
-        
-        This simulates AI-based analysis. In production, this would call
-        an actual ML model or image processing pipeline.
+        Analyze an image by its ID
         
         Args:
-            image_id: Image identifier
+            image_id: Unique image identifier
             
         Returns:
             Dictionary containing analysis results
+            
+        Raises:
+            HTTPException: If image doesn't exist, cannot be analyzed,
+                the engine times out or its worker pool broke
         """
-        # Use image_id as seed for consistent results per image
-        random.seed(hash(image_id))
+        logger.info("Analyzing image: %s", image_id)
+        
+        # Resolve the image through the in-memory index, then the cache
+        with stage_timer("analyze", "lookup").time():
+            record = await find_image(image_id)
+            if record is None:
+                logger.error("Image not found: %s", image_id)
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Image not found: {image_id}"
+                )
+            logger.info("Processing image at: %s", record.path)
+            
+            # Serve repeated analyses from the cache
+            cache_key = analysis_cache.make_key(image_id, record.digest)
+            cached_result = await analysis_cache.get(cache_key)
+        if cached_result is not None:
+            logger.info("Analysis cache hit for %s", image_id)
+            # Nothing new was computed, so the metadata store is not written
+            return {**cached_result, "image_id": image_id}
         
-        # Randomly select skin type
-        skin_type = random.choice(AnalysisService.SKIN_TYPES)
+        # Reuse the analysis of a near-identical upload (re-crop, re-compression,
+        # burst shot); the result names the image it was computed for
+        if near_duplicate_service.reuse:
+            match = await near_duplicate_service.find_analysis(record)
+            if match is not None:
+                neighbor_result, neighbor_id, distance = match
+                logger.info(
+                    "Reusing analysis of near-duplicate %s (distance %s) for %s",
+                    neighbor_id, distance, image_id
+                )
+                analysis_result = {
+                    **neighbor_result,
+                    "image_id": image_id,
+                    NEAR_DUPLICATE_KEY: neighbor_id,
+                    "hamming_distance": distance
+                }
+                await analysis_cache.set(cache_key, analysis_result)
+                metadata_service.record_analysis(
+                    record, engine_pool.engine.identity, analysis_result
+                )
+                return analysis_result
         
-        # Randomly select 1-3 issues
-        num_issues = random.randint(1, 3)
-        issues = random.sample(AnalysisService.POSSIBLE_ISSUES, num_issues)
+        # Engines that decode pixels read the downscaled rendition (rendered
+        # now if still queued); the others never open the file
+        if engine_pool.engine.uses_pixels:
+            source_path = await derivative_service.analysis_path(record)
+        else:
+            source_path = record.path
         
-        # Generate confidence score (between 0.7 and 0.99)
-        confidence = round(random.uniform(0.70, 0.99), 2)
+        # Run the analysis engine off the event loop
+        try:
+            with stage_timer("analyze", "engine").time():
+                if batch_scheduler.running:
+                    analysis_result = await batch_scheduler.submit(image_id, source_path)
+                else:
+                    analysis_result = await engine_pool.analyze(image_id, source_path)
+        except AnalysisError as e:
+            logger.warning("Analysis rejected for %s: %s", image_id, e)
+            raise HTTPException(
+                status_code=422,
+                detail=str(e)
+            )
+        except EngineTimeoutError as e:
+            logger.error(str(e))
+            raise HTTPException(
+                status_code=504,
+                detail="Analysis timed out"
+            )
+        except EngineUnavailableError as e:
+            logger.error(str(e))
+            raise HTTPException(
+                status_code=503,
+                detail="Analysis engine unavailable"
+            )
+        with stage_timer("analyze", "serialize").time():
+            await analysis_cache.set(cache_key, analysis_result)
+        metadata_service.record_analysis(record, engine_pool.engine.identity, analysis_result)
         
-        logger.info(f"Mock analysis generated for {image_id}: {skin_type}")
+        logger.info("Analysis completed for %s", image_id)
         
-        return {
-            "image_id": image_id,
-            "skin_type": skin_type,
-            "issues": issues,
-            "confidence": confidence
-        }
+        return analysis_result
     
     @staticmethod
-    async def analyze_image(image_id: str) -> dict:
+    async def _analyze_batch_item(index: int, image_id: str) -> dict:
         """
-        Analyze an image by its ID
-        
+        Analyze one image of a batch, capturing errors in the result
+
         Args:
+            index: Position of the image in the batch request
             image_id: Unique image identifier
-            
+
         Returns:
-            Dictionary containing analysis results
+            Dictionary with status "ok" and the result, or status "error"
+        """
+        try:
+            if not image_id or not image_id.strip():
+                raise HTTPException(
+                    status_code=400,
+                    detail="image_id is required and cannot be empty"
+                )
+            result = await AnalysisService.analyze_image(image_id)
+            return {"index": index, "image_id": image_id, "status": "ok", "result": result}
+        
+        except HTTPException as e:
+            error = {"status_code": e.status_code, "detail": e.detail}
+        
+        except Exception as e:
+            logger.error("Batch item analysis failed: %s", e, exc_info=True)
+            error = {"status_code": 500, "detail": "Failed to analyze image"}
+        
+        return {"index": index, "image_id": image_id, "status": "error", "error": error}
+    
+    @staticmethod
+    async def analyze_batch(image_ids: List[str], concurrency: int) -> List[dict]:
+        """
+        Analyze several images with bounded concurrency
+        
+        Args:
+            image_ids: Image identifiers to analyze
+            concurrency: Maximum number of analyses running at once
             
-        Raises:
-            HTTPException: If image doesn't exist
+        Returns:
+            Per-item results in request order
         """
-        logger.info(f"Analyzing image: {image_id}")
+        semaphore = asyncio.Semaphore(concurrency)
         
-        # Check if image exists
-        if not image_exists(image_id):
-            logger.error(f"Image not found: {image_id}")
-            raise HTTPException(
-                status_code=404,
-                detail=f"Image not found: {image_id}"
-            )
+        async def run(index: int, image_id: str) -> dict:
+            async with semaphore:
+                return await AnalysisService._analyze_batch_item(index, image_id)
         
-        # Get image path (for potential future processing)
-        try:
-            image_path = get_existing_image_path(image_id)
-            logger.info(f"Processing image at: {image_path}")
-        except FileNotFoundError as e:
-            logger.error(f"Error retrieving image: {str(e)}")
-            raise HTTPException(
-                status_code=404,
-                detail=str(e)
-            )
+        return await asyncio.gather(
+            *(run(index, image_id) for index, image_id in enumerate(image_ids))
+        )
+    
+    @staticmethod
+    async def iter_analyze_batch(
+        image_ids: List[str], concurrency: int
+    ) -> AsyncIterator[dict]:
+        """
+        Analyze several images, yielding each result as soon as it completes
         
-        # Generate mock analysis
-        analysis_result = AnalysisService._generate_mock_analysis(image_id)
+        Args:
+            image_ids: Image identifiers to analyze
+            concurrency: Maximum number of analyses running at once
+            
+        Yields:
+            Per-item results in completion order
+        """
+        semaphore = asyncio.Semaphore(concurrency)
         
-        logger.info(f"Analysis completed for {image_id}")
+        async def run(index: int, image_id: str) -> dict:
+            async with semaphore:
+                return await AnalysisService._analyze_batch_item(index, image_id)
         
-        return analysis_result
+        tasks = [
+            asyncio.create_task(run(index, image_id))
+            for index, image_id in enumerate(image_ids)
+        ]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            # Client went away or iteration stopped early
+            for task in tasks:
+                task.cancel()
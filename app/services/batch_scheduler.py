@@ -0,0 +1,213 @@
+"""
+Batch Scheduler
+Coalesces concurrent analysis requests into engine batches
+"""
+
+import asyncio
+import time
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Set
+import logging
+
+from app.config import settings
+from app.services.engine_pool import EnginePool, engine_pool
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the batch size histogram buckets
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, float("inf"))
+
+
+class _PendingAnalysis(NamedTuple):
+    image_id: str
+    image_path: Path
+    future: asyncio.Future
+    enqueued_at: float
+
+
+class BatchScheduler:
+    """
+    Dynamic micro-batching in front of the engine pool
+
+    Requests are queued and collected into a batch until either
+    max_batch_size items are waiting or the oldest item has waited
+    max_wait seconds. Each batch is sent to the engine in one
+    analyze_batch call and the results are fanned back out. At most one
+    batch per engine worker is in flight, so under load the queue grows
+    and batches get larger automatically.
+    """
+
+    def __init__(self, pool: EnginePool, max_batch_size: int, max_wait: float):
+        self.pool = pool
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._in_flight: Optional[asyncio.Semaphore] = None
+        self._dispatching: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.items = 0
+        self.batch_size_counts = {bucket: 0 for bucket in BATCH_SIZE_BUCKETS}
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self) -> None:
+        """Start collecting batches on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._in_flight = asyncio.Semaphore(max(1, self.pool.pool_size))
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            "Batch scheduler started (max %s items / %.1fms)",
+            self.max_batch_size,
+            self.max_wait * 1000,
+        )
+
+    async def stop(self) -> None:
+        """Stop the scheduler, failing anything still queued"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+        while not self._queue.empty():
+            pending = self._queue.get_nowait()
+            if not pending.future.done():
+                pending.future.set_exception(RuntimeError("Batch scheduler stopped"))
+
+    async def submit(self, image_id: str, image_path: Path) -> dict:
+        """
+        Queue an image for batched analysis and wait for its result
+
+        Args:
+            image_id: Image identifier
+            image_path: Path to the stored image
+
+        Returns:
+            Dictionary containing analysis results
+
+        Raises:
+            AnalysisError: If the engine cannot analyze the image
+            EngineTimeoutError: If the batch containing the image times out
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(
+            _PendingAnalysis(image_id, image_path, future, time.perf_counter())
+        )
+        return await future
+
+    def stats(self) -> dict:
+        """
+        Get scheduler metrics
+
+        Returns:
+            Dictionary with queue depth, batch size distribution and the
+            latency added by waiting for a batch
+        """
+        return {
+            "enabled": self.running,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "batch_size_distribution": {
+                f"le_{bucket:g}": count for bucket, count in self.batch_size_counts.items()
+            },
+            "avg_wait_ms": (
+                round(self.wait_time_total / self.items * 1000, 3) if self.items else 0.0
+            ),
+            "max_wait_ms_observed": round(self.wait_time_max * 1000, 3),
+        }
+
+    async def _run(self) -> None:
+        while True:
+            # Wait for a free engine slot before collecting, so the queue
+            # keeps filling while every worker is busy
+            await self._in_flight.acquire()
+            try:
+                batch = await self._collect()
+            except BaseException:
+                self._in_flight.release()
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self._dispatching.add(task)
+            task.add_done_callback(self._dispatching.discard)
+
+    async def _collect(self) -> List[_PendingAnalysis]:
+        batch = [await self._queue.get()]
+        deadline = batch[0].enqueued_at + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _dispatch(self, batch: List[_PendingAnalysis]) -> None:
+        try:
+            # Requests that were cancelled while queued are dropped
+            batch = [pending for pending in batch if not pending.future.done()]
+            if not batch:
+                return
+
+            self._record(batch)
+            items = [(pending.image_id, pending.image_path) for pending in batch]
+            try:
+                results = await self.pool.analyze_batch(items)
+            except Exception as e:
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+                return
+
+            for pending, result in zip(batch, results):
+                if pending.future.done():
+                    continue
+                if isinstance(result, Exception):
+                    pending.future.set_exception(result)
+                else:
+                    pending.future.set_result(result)
+        finally:
+            self._in_flight.release()
+
+    def _record(self, batch: List[_PendingAnalysis]) -> None:
+        now = time.perf_counter()
+        self.batches += 1
+        self.items += len(batch)
+        for bucket in BATCH_SIZE_BUCKETS:
+            if len(batch) <= bucket:
+                self.batch_size_counts[bucket] += 1
+                break
+
+        for pending in batch:
+            waited = now - pending.enqueued_at
+            self.wait_time_total += waited
+            self.wait_time_max = max(self.wait_time_max, waited)
+
+
+batch_scheduler = BatchScheduler(
+    pool=engine_pool,
+    max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+    max_wait=settings.MICRO_BATCH_MAX_WAIT_MS / 1000,
+)
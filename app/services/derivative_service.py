@@ -0,0 +1,253 @@
+"""
+Derivative Service
+Generates downscaled renditions of uploads in a background worker pool
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+import logging
+
+from PIL import Image, ImageOps
+
+from app.config import settings
+from app.utils.image_index import ImageRecord
+from app.utils.metrics import stage_timer
+from app.utils.storage import ORIGINAL_RENDITION, get_derivative_path, get_temp_path
+
+logger = logging.getLogger(__name__)
+
+
+def parse_derivative_specs(value: str) -> Dict[str, int]:
+    """
+    Parse a DERIVATIVES setting
+
+    Args:
+        value: Comma-separated "name:max_side" pairs, e.g. "thumb:256,analysis:512"
+
+    Returns:
+        Dictionary of derivative name to maximum side length in pixels
+
+    Raises:
+        ValueError: If an entry is malformed or uses the reserved name
+            of the original rendition
+    """
+    specs = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        name, _, size = item.partition(":")
+        if not name.isidentifier() or not size.isdigit() or int(size) <= 0:
+            raise ValueError(f"Invalid derivative spec: {item!r}")
+        if name == ORIGINAL_RENDITION:
+            # /images/{id}/original serves the kept upload, not a derivative
+            raise ValueError(f"Derivative name {name!r} is reserved")
+        specs[name] = int(size)
+    return specs
+
+
+def render_derivatives(record: ImageRecord, specs: Dict[str, int], quality: int) -> Dict[str, Path]:
+    """
+    Decode an image once and write every derivative
+
+    JPEGs are decoded with DCT scaling to roughly the largest requested
+    size; smaller derivatives are resized from the larger ones. Files are
+    written to a temporary name and renamed into place, so readers never
+    see a partial rendition.
+
+    Args:
+        record: Record of the original image
+        specs: Derivative name to maximum side length
+        quality: JPEG quality of the renditions
+
+    Returns:
+        Dictionary of derivative name to written path
+    """
+    paths = {}
+    with Image.open(record.path) as original:
+        largest = max(specs.values())
+        original.draft("RGB", (largest, largest))
+        image = ImageOps.exif_transpose(original).convert("RGB")
+
+        for name, size in sorted(specs.items(), key=lambda spec: -spec[1]):
+            image.thumbnail((size, size), Image.LANCZOS)
+            path = get_derivative_path(record, name)
+            temp_path = get_temp_path(path)
+            try:
+                image.save(temp_path, "JPEG", quality=quality, optimize=True)
+                os.replace(temp_path, path)
+            except BaseException:
+                temp_path.unlink(missing_ok=True)
+                raise
+            paths[name] = path
+    return paths
+
+
+@dataclass
+class _RenderJob:
+    """One render of an image's derivatives, shared by the queue and analysis"""
+
+    record: ImageRecord
+    done: asyncio.Future
+    claimed: bool = False
+
+
+class DerivativeService:
+    """
+    Post-processes uploads off the request path
+
+    schedule() returns immediately; renditions are rendered in a thread
+    pool (Pillow releases the GIL while decoding and resizing). Readers
+    use get_path(), which falls back to None until a rendition exists.
+    Analysis uses analysis_path(), which waits for the rendition instead.
+    """
+
+    def __init__(self, specs: Dict[str, int], workers: int, quality: int):
+        self.specs = specs
+        self.workers = workers
+        self.quality = quality
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # Renders queued or running, by image ID; a job is rendered once
+        # by whichever thread claims it first
+        self._pending: Dict[str, _RenderJob] = {}
+        self._claim_lock = threading.Lock()
+
+        self.generated = 0
+        self.failed = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Start the worker pool"""
+        if self.workers <= 0 or not self.specs:
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="derivatives"
+        )
+        logger.info(
+            "Derivative service started with %s workers (%s)",
+            self.workers,
+            ", ".join(f"{name} {size}px" for name, size in self.specs.items()),
+        )
+
+    async def stop(self) -> None:
+        """Finish scheduled renditions and stop the worker pool"""
+        if self._executor is None:
+            return
+        if self._pending:
+            await asyncio.gather(
+                *(job.done for job in self._pending.values()), return_exceptions=True
+            )
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        self._executor = None
+
+    def schedule(self, record: ImageRecord) -> None:
+        """
+        Queue derivative generation for a stored image
+
+        Args:
+            record: Record of the original image
+        """
+        if self._executor is None:
+            return
+        job = self._add_job(record)
+        asyncio.get_running_loop().run_in_executor(self._executor, self._run, job)
+
+    async def get_path(self, record: ImageRecord, name: str) -> Optional[Path]:
+        """
+        Get a rendition if it has been generated
+
+        Args:
+            record: Record of the original image
+            name: Derivative name
+
+        Returns:
+            Path of the rendition, or None if it doesn't exist (yet)
+        """
+        if name not in self.specs:
+            return None
+        path = get_derivative_path(record, name)
+        return path if await asyncio.to_thread(path.exists) else None
+
+    async def analysis_path(self, record: ImageRecord) -> Path:
+        """
+        Get the file analysis should decode
+
+        While derivatives are enabled, analysis always decodes the
+        ANALYSIS_RENDITION: one not generated yet is awaited if a worker
+        is rendering it, and otherwise (upload still in the queue, or
+        stored before derivatives were enabled) rendered now rather than
+        after every upload queued ahead of it. Whether an image's result
+        comes from the rendition or the original therefore never depends
+        on timing.
+
+        Args:
+            record: Record of the original image
+
+        Returns:
+            The ANALYSIS_RENDITION, or the original if derivatives are
+            disabled or the rendition cannot be rendered
+        """
+        name = settings.ANALYSIS_RENDITION
+        if self._executor is None or name not in self.specs:
+            return record.path
+
+        path = await self.get_path(record, name)
+        if path is not None:
+            return path
+
+        job = self._pending.get(record.image_id) or self._add_job(record)
+        if not job.claimed:
+            # Render on the default executor; the queued run of the same
+            # job finds it claimed and returns
+            asyncio.get_running_loop().run_in_executor(None, self._run, job)
+        with stage_timer("analyze", "render").time():
+            await asyncio.shield(job.done)
+        return await self.get_path(record, name) or record.path
+
+    def _add_job(self, record: ImageRecord) -> _RenderJob:
+        job = _RenderJob(record, asyncio.get_running_loop().create_future())
+        self._pending[record.image_id] = job
+        job.done.add_done_callback(lambda _: self._pending.pop(record.image_id, None))
+        return job
+
+    def stats(self) -> dict:
+        """
+        Get derivative counters
+
+        Returns:
+            Dictionary of derivative statistics
+        """
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "generated": self.generated,
+            "failed": self.failed,
+        }
+
+    def _run(self, job: _RenderJob) -> None:
+        with self._claim_lock:
+            if job.claimed:
+                return
+            job.claimed = True
+        try:
+            with stage_timer("upload", "derivatives").time():
+                render_derivatives(job.record, self.specs, self.quality)
+            self.generated += 1
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Derivatives failed for %s: %s", job.record.image_id, e)
+        finally:
+            loop = job.done.get_loop()
+            loop.call_soon_threadsafe(job.done.set_result, None)
+
+
+derivative_service = DerivativeService(
+    specs=parse_derivative_specs(settings.DERIVATIVES),
+    workers=settings.DERIVATIVE_WORKERS,
+    quality=settings.DERIVATIVE_QUALITY,
+)
@@ -0,0 +1,214 @@
+"""
+Engine Pool
+Runs the configured analysis engine in a process pool
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+import logging
+
+from app.config import settings
+from app.services.engines import AnalysisEngine, AnalysisError, create_engine
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for all workers to load their engine at startup
+WARMUP_TIMEOUT = 120
+
+# Engine instance owned by each worker process
+_worker_engine: Optional[AnalysisEngine] = None
+_worker_barrier = None
+
+
+class EngineTimeoutError(Exception):
+    """Raised when an engine call exceeds its timeout"""
+
+
+class EngineUnavailableError(Exception):
+    """Raised when the worker pool broke and could not complete a call"""
+
+
+def _init_worker(engine_name: str, barrier) -> None:
+    """Load the engine once when a worker process starts"""
+    global _worker_engine, _worker_barrier
+    _worker_engine = create_engine(engine_name)
+    _worker_engine.load()
+    _worker_barrier = barrier
+
+
+def _worker_ready() -> int:
+    """Block until every worker has loaded its engine"""
+    try:
+        _worker_barrier.wait(timeout=WARMUP_TIMEOUT)
+    except threading.BrokenBarrierError:
+        pass
+    return os.getpid()
+
+
+def _worker_analyze(image_id: str, image_path: Path) -> dict:
+    return _worker_engine.analyze(image_id, image_path)
+
+
+def _worker_analyze_batch(
+    items: List[Tuple[str, Path]]
+) -> List[Union[dict, AnalysisError]]:
+    return _worker_engine.analyze_batch(items)
+
+
+class EnginePool:
+    """
+    Executes analysis engine calls without blocking the event loop
+
+    With pool_size > 0 calls are dispatched to a ProcessPoolExecutor whose
+    workers each load the engine once at startup. If a worker dies (the
+    pool is then broken), the pool is rebuilt and the call retried once.
+    With pool_size == 0 the engine runs inline, which is only suitable for
+    trivial engines: an inline call blocks the event loop, so it cannot be
+    interrupted and ANALYSIS_TIMEOUT does not apply.
+    """
+
+    def __init__(self, engine_name: str, pool_size: int, timeout: float):
+        self.engine = create_engine(engine_name)
+        self.pool_size = pool_size
+        self.timeout = self.engine.timeout or timeout
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._restart_lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start and warm up the worker processes"""
+        if self.pool_size <= 0:
+            self.engine.load()
+            logger.info("Analysis engine %s running inline", self.engine.identity)
+            return
+
+        self._executor = self._create_executor()
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        """Spawn the worker processes and wait until each has loaded the engine"""
+        context = multiprocessing.get_context("spawn")
+        executor = ProcessPoolExecutor(
+            max_workers=self.pool_size,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(self.engine.name, context.Barrier(self.pool_size)),
+        )
+
+        # Workers are spawned lazily; submit one barrier task per worker so
+        # every engine is loaded before the first request arrives
+        pids = {
+            future.result()
+            for future in [
+                executor.submit(_worker_ready) for _ in range(self.pool_size)
+            ]
+        }
+        logger.info(
+            "Analysis engine %s started in %s worker processes",
+            self.engine.identity,
+            len(pids),
+        )
+        return executor
+
+    def _restart(self, broken: ProcessPoolExecutor) -> None:
+        """Replace a broken executor, unless another call already has"""
+        with self._restart_lock:
+            if self._executor is not broken:
+                return
+            logger.error(
+                "Analysis engine %s worker pool broke; restarting it", self.engine.identity
+            )
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._create_executor()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes, dropping queued work"""
+        with self._restart_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    async def analyze(self, image_id: str, image_path: Path) -> dict:
+        """
+        Run the engine on one image
+
+        Args:
+            image_id: Image identifier
+            image_path: Path to the stored image
+
+        Returns:
+            Dictionary containing analysis results
+
+        Raises:
+            AnalysisError: If the engine cannot analyze the image
+            EngineTimeoutError: If the engine does not finish within its timeout
+            EngineUnavailableError: If the worker pool broke on the retry too
+        """
+        if self._executor is None:
+            return self.engine.analyze(image_id, image_path)
+
+        return await self._run(_worker_analyze, image_id, image_path)
+
+    async def analyze_batch(
+        self, items: List[Tuple[str, Path]]
+    ) -> List[Union[dict, AnalysisError]]:
+        """
+        Run the engine on several images in one worker call
+
+        Args:
+            items: List of (image_id, image_path) pairs
+
+        Returns:
+            Analysis results in the same order as items (AnalysisError
+            instances for items that could not be analyzed)
+
+        Raises:
+            EngineTimeoutError: If the engine does not finish within its timeout
+            EngineUnavailableError: If the worker pool broke on the retry too
+        """
+        if self._executor is None:
+            return self.engine.analyze_batch(items)
+
+        return await self._run(_worker_analyze_batch, items)
+
+    async def _run(self, func, *args):
+        # A dead worker breaks every call in flight; the first to notice
+        # rebuilds the pool and each retries once. A call that breaks the
+        # new pool too (e.g. an input that crashes the engine) fails alone
+        for attempt in range(2):
+            executor = self._executor
+            if executor is None:
+                raise EngineUnavailableError(
+                    f"Analysis engine {self.engine.identity} is not running"
+                )
+            try:
+                return await self._call(executor, func, *args)
+            except BrokenProcessPool:
+                await asyncio.to_thread(self._restart, executor)
+
+        raise EngineUnavailableError(
+            f"Analysis engine {self.engine.identity} worker pool broke during the call"
+        )
+
+    async def _call(self, executor: ProcessPoolExecutor, func, *args):
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor, func, *args)
+        try:
+            # Cancelling the awaiting request cancels the pool future too;
+            # work that already started in a worker runs to completion
+            return await asyncio.wait_for(future, self.timeout)
+        except asyncio.TimeoutError:
+            raise EngineTimeoutError(
+                f"Analysis engine {self.engine.identity} timed out after {self.timeout}s"
+            )
+
+
+engine_pool = EnginePool(
+    engine_name=settings.ANALYSIS_ENGINE,
+    pool_size=settings.ANALYSIS_WORKERS,
+    timeout=settings.ANALYSIS_TIMEOUT,
+)
@@ -0,0 +1,35 @@
+"""
+Analysis Engines
+Pluggable implementations of the image analysis step
+"""
+
+from app.services.engines.base import AnalysisEngine, AnalysisError
+from app.services.engines.features import FeatureAnalysisEngine
+from app.services.engines.mock import MockAnalysisEngine
+
+ENGINES = {
+    FeatureAnalysisEngine.name: FeatureAnalysisEngine,
+    MockAnalysisEngine.name: MockAnalysisEngine,
+}
+
+
+def create_engine(name: str) -> AnalysisEngine:
+    """
+    Instantiate an analysis engine by name
+
+    Args:
+        name: Registered engine name (e.g. 'features' or 'mock')
+
+    Returns:
+        New engine instance (not yet loaded)
+
+    Raises:
+        ValueError: If no engine is registered under the name
+    """
+    try:
+        engine_class = ENGINES[name]
+    except KeyError:
+        available = ", ".join(sorted(ENGINES))
+        raise ValueError(f"Unknown analysis engine '{name}'. Available: {available}")
+
+    return engine_class()
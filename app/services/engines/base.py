@@ -0,0 +1,81 @@
+"""
+Analysis Engine Interface
+"""
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Optional, Tuple, Union
+
+
+class AnalysisError(Exception):
+    """Raised when an engine cannot analyze an image (e.g. undecodable data)"""
+
+
+class AnalysisEngine(ABC):
+    """
+    Base class for analysis engines
+
+    Engines run inside worker processes, so they must be constructible
+    without arguments and their results must be picklable dictionaries.
+    """
+
+    # Registry name and version; together they scope cached results
+    name: str = ""
+    version: str = ""
+
+    # Per-engine timeout in seconds (None uses ANALYSIS_TIMEOUT)
+    timeout: Optional[float] = None
+
+    # Whether analyze() decodes the image; engines that don't are given
+    # the original path without waiting for the analysis rendition
+    uses_pixels: bool = False
+
+    @property
+    def identity(self) -> str:
+        """Engine name and version, e.g. 'mock-1'"""
+        return f"{self.name}-{self.version}"
+
+    def load(self) -> None:
+        """
+        Load models or other expensive resources
+
+        Called once per worker process before any analysis is run.
+        """
+
+    @abstractmethod
+    def analyze(self, image_id: str, image_path: Path) -> dict:
+        """
+        Analyze a single image
+
+        Args:
+            image_id: Image identifier
+            image_path: Path to the stored image
+
+        Returns:
+            Dictionary containing analysis results
+        """
+
+    def analyze_batch(
+        self, items: List[Tuple[str, Path]]
+    ) -> List[Union[dict, AnalysisError]]:
+        """
+        Analyze several images in one call
+
+        Engines that benefit from batching (vectorized or model-based)
+        should override this; the default analyzes items one by one.
+
+        Args:
+            items: List of (image_id, image_path) pairs
+
+        Returns:
+            Analysis results in the same order as items; an item that could
+            not be analyzed is returned as an AnalysisError instance so it
+            does not fail the rest of the batch
+        """
+        results: List[Union[dict, AnalysisError]] = []
+        for image_id, image_path in items:
+            try:
+                results.append(self.analyze(image_id, image_path))
+            except AnalysisError as e:
+                results.append(e)
+        return results
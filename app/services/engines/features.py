@@ -0,0 +1,237 @@
+"""
+Feature Analysis Engine
+Deterministic image statistics computed with vectorized NumPy operations
+"""
+
+from pathlib import Path
+from typing import Dict, List, Tuple, Union
+import logging
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from app.services.engines.base import AnalysisEngine, AnalysisError
+
+logger = logging.getLogger(__name__)
+
+# Side length images are downsampled to before feature extraction
+ANALYSIS_SIZE = 128
+
+# Histogram bins per RGB channel
+HISTOGRAM_BINS = 16
+
+# Skin-tone bounds in YCbCr (Cb/Cr on a 0-1 scale, after Chai & Ngan)
+SKIN_CB_RANGE = (77 / 255, 127 / 255)
+SKIN_CR_RANGE = (133 / 255, 173 / 255)
+
+# Minimum fraction of skin pixels for the skin mask to be trusted
+MIN_SKIN_FRACTION = 0.05
+
+
+def load_image_array(image_path: Path, size: int = ANALYSIS_SIZE) -> np.ndarray:
+    """
+    Decode an image and downsample it to a square RGB array
+
+    JPEGs are decoded with DCT scaling (Image.draft), so only a fraction
+    of the full-resolution pixels is ever materialized. EXIF orientation
+    is applied, as it is for derivatives, so an original and its
+    rendition are analyzed the same way up.
+
+    Args:
+        image_path: Path to a JPEG or PNG file
+        size: Output side length in pixels
+
+    Returns:
+        uint8 array of shape (size, size, 3)
+
+    Raises:
+        AnalysisError: If the file cannot be decoded
+    """
+    try:
+        with Image.open(image_path) as image:
+            image.draft("RGB", (size, size))
+            image = ImageOps.exif_transpose(image).convert("RGB")
+            image = image.resize((size, size), Image.BILINEAR)
+            return np.asarray(image, dtype=np.uint8)
+    except (OSError, ValueError, Image.DecompressionBombError) as e:
+        raise AnalysisError(f"Image could not be decoded: {image_path.name}") from e
+
+
+def extract_features(batch: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute per-image statistics for a whole batch in single array operations
+
+    Args:
+        batch: uint8 array of shape (N, H, W, 3)
+
+    Returns:
+        Dictionary of feature arrays, each with leading dimension N:
+        skin_fraction, ycc_mean (N, 3), ycc_var (N, 3), histogram
+        (N, 3, HISTOGRAM_BINS), redness, texture, highlights, dark_spots
+    """
+    n = batch.shape[0]
+    rgb = np.multiply(batch, np.float32(1 / 255), dtype=np.float32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+
+    # ITU-R BT.601 YCbCr
+    y = 0.299 * r + 0.587 * g + 0.114 * b
+    cb = 0.5 - 0.168736 * r - 0.331264 * g + 0.5 * b
+    cr = 0.5 + 0.5 * r - 0.418688 * g - 0.081312 * b
+
+    # Skin mask; images with too little detected skin fall back to all pixels
+    mask = (
+        (cb >= SKIN_CB_RANGE[0]) & (cb <= SKIN_CB_RANGE[1])
+        & (cr >= SKIN_CR_RANGE[0]) & (cr <= SKIN_CR_RANGE[1])
+    )
+    skin_fraction = mask.mean(axis=(1, 2))
+    weights = np.where(
+        (skin_fraction >= MIN_SKIN_FRACTION)[:, None, None], mask, True
+    ).astype(np.float32)
+    weights /= weights.sum(axis=(1, 2), keepdims=True)
+
+    def weighted_mean(values: np.ndarray) -> np.ndarray:
+        return np.einsum("nhw,nhw->n", values, weights)
+
+    # Weighted mean/variance per YCbCr channel (E[x^2] - E[x]^2)
+    ycc_mean = np.stack([weighted_mean(channel) for channel in (y, cb, cr)], axis=1)
+    ycc_var = np.stack(
+        [weighted_mean(channel * channel) for channel in (y, cb, cr)], axis=1
+    ) - ycc_mean ** 2
+    ycc_var = np.maximum(ycc_var, 0.0)
+
+    # RGB histograms for every image and channel in one bincount, sampled
+    # on every other row/column (plenty for 16 bins, 4x fewer elements)
+    sample = batch[:, ::2, ::2]
+    shift = 8 - int(np.log2(HISTOGRAM_BINS))
+    offsets = (np.arange(n, dtype=np.intp)[:, None, None, None] * 3 + np.arange(3)) * HISTOGRAM_BINS
+    histogram = np.bincount(
+        (np.right_shift(sample, shift) + offsets).ravel(), minlength=n * 3 * HISTOGRAM_BINS
+    ).reshape(n, 3, HISTOGRAM_BINS) / float(sample.shape[1] * sample.shape[2])
+
+    # Redness: how far red exceeds green on skin
+    redness = weighted_mean(np.clip(r - g, 0.0, None))
+
+    # Texture: mean absolute luminance gradient on skin
+    gradient = np.abs(np.diff(y, axis=1))[:, :, :-1] + np.abs(np.diff(y, axis=2))[:, :-1, :]
+    gradient_weights = weights[:, :-1, :-1]
+    texture = np.einsum("nhw,nhw->n", gradient, gradient_weights) / np.maximum(
+        gradient_weights.sum(axis=(1, 2)), 1e-6
+    )
+
+    # Specular highlights and dark spots relative to the mean luminance
+    luma_std = np.sqrt(ycc_var[:, 0])[:, None, None]
+    luma_mean = ycc_mean[:, 0][:, None, None]
+    highlights = weighted_mean((y > 0.85).astype(np.float32))
+    dark_spots = weighted_mean((y < luma_mean - 3 * luma_std).astype(np.float32))
+
+    return {
+        "skin_fraction": skin_fraction,
+        "ycc_mean": ycc_mean,
+        "ycc_var": ycc_var,
+        "histogram": histogram,
+        "redness": redness,
+        "texture": texture,
+        "highlights": highlights,
+        "dark_spots": dark_spots,
+    }
+
+
+class FeatureAnalysisEngine(AnalysisEngine):
+    """Maps extracted image statistics to skin type, issues and confidence"""
+
+    name = "features"
+    version = "1"
+    uses_pixels = True
+
+    def analyze(self, image_id: str, image_path: Path) -> dict:
+        """
+        Analyze a single image
+
+        Args:
+            image_id: Image identifier
+            image_path: Path to the stored image
+
+        Returns:
+            Dictionary containing analysis results
+
+        Raises:
+            AnalysisError: If the image cannot be decoded
+        """
+        result = self.analyze_batch([(image_id, image_path)])[0]
+        if isinstance(result, AnalysisError):
+            raise result
+        return result
+
+    def analyze_batch(
+        self, items: List[Tuple[str, Path]]
+    ) -> List[Union[dict, AnalysisError]]:
+        """
+        Decode a batch of images and analyze them with one feature pass
+
+        Args:
+            items: List of (image_id, image_path) pairs
+
+        Returns:
+            Analysis results in the same order as items; undecodable images
+            are returned as AnalysisError instances
+        """
+        results: List[Union[dict, AnalysisError]] = [None] * len(items)
+        arrays = []
+        positions = []
+        for position, (image_id, image_path) in enumerate(items):
+            try:
+                arrays.append(load_image_array(image_path))
+                positions.append(position)
+            except AnalysisError as e:
+                logger.warning("Feature extraction skipped for %s: %s", image_id, e)
+                results[position] = e
+
+        if arrays:
+            features = extract_features(np.stack(arrays))
+            for row, position in enumerate(positions):
+                results[position] = self._interpret(items[position][0], features, row)
+
+        return results
+
+    def _interpret(self, image_id: str, features: Dict[str, np.ndarray], row: int) -> dict:
+        skin_fraction = float(features["skin_fraction"][row])
+        redness = float(features["redness"][row])
+        texture = float(features["texture"][row])
+        highlights = float(features["highlights"][row])
+        dark_spots = float(features["dark_spots"][row])
+        chroma_var = float(features["ycc_var"][row, 1] + features["ycc_var"][row, 2])
+        luma_mean = float(features["ycc_mean"][row, 0])
+
+        # Issue scores normalised so 1.0 is the reporting threshold
+        issue_scores = {
+            "Redness": redness / 0.22,
+            "Acne": (redness / 0.22) * (texture / 0.06),
+            "Enlarged Pores": texture / 0.08,
+            "Fine Lines": texture / 0.10,
+            "Uneven Tone": chroma_var / 0.002,
+            "Hyperpigmentation": float(features["ycc_var"][row, 2]) / 0.0012,
+            "Dark Spots": dark_spots / 0.01,
+            "Dryness": (1.0 - highlights / 0.02) * (texture / 0.07) if luma_mean > 0.55 else 0.0,
+        }
+        ranked = sorted(issue_scores, key=lambda issue: -issue_scores[issue])
+        issues = [issue for issue in ranked[:3] if issue_scores[issue] >= 1.0] or ranked[:1]
+
+        if redness > 0.25:
+            skin_type = "Sensitive"
+        elif highlights > 0.05:
+            skin_type = "Oily" if texture < 0.07 else "Combination"
+        elif texture > 0.07:
+            skin_type = "Dry"
+        else:
+            skin_type = "Normal"
+
+        # More visible skin and clearer issue scores give higher confidence
+        margin = min(1.0, abs(issue_scores[ranked[0]] - 1.0))
+        confidence = round(0.70 + 0.17 * min(1.0, skin_fraction / 0.5) + 0.12 * margin, 2)
+
+        return {
+            "image_id": image_id,
+            "skin_type": skin_type,
+            "issues": issues,
+            "confidence": min(confidence, 0.99),
+        }
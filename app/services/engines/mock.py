@@ -0,0 +1,146 @@
+"""
+Mock Analysis Engine
+"""
+
+import hashlib
+import logging
+from pathlib import Path
+from typing import List, Tuple
+
+import numpy as np
+
+from app.services.engines.base import AnalysisEngine
+
+logger = logging.getLogger(__name__)
+
+
+def image_id_digest(image_id: str) -> bytes:
+    """
+    Stable per-image seed material
+
+    Unlike hash(), a SHA-256 digest is identical in every process, so all
+    workers produce the same result for the same image.
+
+    Args:
+        image_id: Image identifier
+
+    Returns:
+        32-byte digest of the image ID
+    """
+    return hashlib.sha256(image_id.encode("utf-8")).digest()
+
+
+class MockAnalysisEngine(AnalysisEngine):
+    """
+    Simulates AI-based analysis with deterministic per-image results
+
+    Every random draw is taken from the SHA-256 digest of the image ID
+    rather than global random state, so results are process-independent
+    and thread-safe. The scalar and vectorized paths consume the digest
+    bytes identically and always agree.
+    """
+
+    name = "mock"
+    version = "2"
+
+    # Mock data for analysis
+    SKIN_TYPES = ["Normal", "Oily", "Dry", "Combination", "Sensitive"]
+
+    POSSIBLE_ISSUES = [
+        "Hyperpigmentation",
+        "Acne",
+        "Dark Spots",
+        "Fine Lines",
+        "Uneven Tone",
+        "Redness",
+        "Dryness",
+        "Enlarged Pores",
+    ]
+
+    # Digest byte layout: skin type, issue count, one sort key per issue,
+    # then two bytes for the confidence
+    _ISSUE_KEYS = slice(2, 2 + len(POSSIBLE_ISSUES))
+    _CONFIDENCE = 2 + len(POSSIBLE_ISSUES)
+
+    def analyze(self, image_id: str, image_path: Path) -> dict:
+        """
+        Generate mock analysis results
+
+        This simulates AI-based analysis. In production, this would call
+        an actual ML model or image processing pipeline.
+
+        Args:
+            image_id: Image identifier
+            image_path: Path to the stored image (unused by the mock)
+
+        Returns:
+            Dictionary containing analysis results
+        """
+        digest = image_id_digest(image_id)
+
+        # Select skin type
+        skin_type = self.SKIN_TYPES[digest[0] % len(self.SKIN_TYPES)]
+
+        # Select 1-3 issues, ordered by their per-issue sort key
+        num_issues = 1 + digest[1] % 3
+        issue_keys = digest[self._ISSUE_KEYS]
+        order = sorted(range(len(self.POSSIBLE_ISSUES)), key=lambda i: issue_keys[i])
+        issues = [self.POSSIBLE_ISSUES[i] for i in order[:num_issues]]
+
+        # Confidence score between 0.70 and 0.99, rounded to hundredths
+        sample = digest[self._CONFIDENCE] << 8 | digest[self._CONFIDENCE + 1]
+        confidence = self._confidence_cents(sample) / 100
+
+        logger.info("Mock analysis generated for %s: %s", image_id, skin_type)
+
+        return {
+            "image_id": image_id,
+            "skin_type": skin_type,
+            "issues": issues,
+            "confidence": confidence,
+        }
+
+    def analyze_batch(self, items: List[Tuple[str, Path]]) -> List[dict]:
+        """
+        Generate mock analysis results for many images at once
+
+        The digests are stacked into one array and every draw is computed
+        with vectorized NumPy operations.
+
+        Args:
+            items: List of (image_id, image_path) pairs
+
+        Returns:
+            Analysis results in the same order as items
+        """
+        if not items:
+            return []
+
+        image_ids = [image_id for image_id, _ in items]
+        digests = np.frombuffer(
+            b"".join(image_id_digest(image_id) for image_id in image_ids), dtype=np.uint8
+        ).reshape(len(image_ids), -1)
+
+        skin_types = digests[:, 0] % len(self.SKIN_TYPES)
+        num_issues = 1 + digests[:, 1] % 3
+        orders = np.argsort(digests[:, self._ISSUE_KEYS], axis=1, kind="stable")
+        samples = (
+            digests[:, self._CONFIDENCE].astype(np.int64) << 8
+        ) | digests[:, self._CONFIDENCE + 1]
+        confidence_cents = self._confidence_cents(samples)
+
+        return [
+            {
+                "image_id": image_id,
+                "skin_type": self.SKIN_TYPES[skin_types[row]],
+                "issues": [self.POSSIBLE_ISSUES[i] for i in orders[row, :num_issues[row]]],
+                "confidence": int(confidence_cents[row]) / 100,
+            }
+            for row, image_id in enumerate(image_ids)
+        ]
+
+    @staticmethod
+    def _confidence_cents(sample):
+        # Map a 16-bit sample onto 70..99 with integer round-half-up, so the
+        # scalar and vectorized paths round identically
+        return 70 + (sample * 29 * 2 + 65535) // (2 * 65535)
@@ -2,11 +2,33 @@
 Image Service
 Handles image upload and storage operations
 """
-from fastapi import UploadFile
+from fastapi import HTTPException
+from pathlib import Path
+from typing import List, Optional, Tuple
+import aiofiles.os
+import asyncio
 import logging
+import os
 
-from app.utils.validators import validate_image_file
-from app.utils.storage import generate_image_id, save_image
+from app.config import settings
+from app.services.derivative_service import derivative_service
+from app.services.metadata_service import metadata_service
+from app.services.near_duplicate_service import near_duplicate_service
+from app.services.normalize_service import ingest_normalizer
+from app.utils.image_header import ImageHeader
+from app.utils.image_index import ImageRecord
+from app.utils.upload_stream import ReceivedFile
+from app.utils.storage import (
+    ORIGINAL_RENDITION,
+    SavedImage,
+    find_image,
+    generate_image_id,
+    get_file_path,
+    get_original_path,
+    get_temp_path,
+    save_image,
+    save_image_file,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -15,34 +37,276 @@ class ImageService:
     """Service for image-related operations"""
     
     @staticmethod
-    async def process_upload(file: UploadFile) -> dict:
+    def upload_target(extension: str) -> Tuple[str, Path]:
+        """
+        Choose the image ID and temporary path a multipart upload is written to
+        
+        Args:
+            extension: Lower-case file extension, e.g. ".jpg"
+            
+        Returns:
+            Tuple of (new image ID, temporary path inside the image's
+            directory, so storing it is a rename)
+        """
+        image_id = generate_image_id()
+        file_path = get_file_path(image_id, extension)
+        if ingest_normalizer.enabled:
+            # The normalized image is written to the image's own temporary path
+            return image_id, get_temp_path(get_original_path(file_path))
+        return image_id, get_temp_path(file_path)
+    
+    @staticmethod
+    async def process_upload(file: ReceivedFile, keep_original: bool = False) -> dict:
         """
         Process image upload
         
         Args:
-            file: Uploaded image file
+            file: Upload received by the multipart parser (see upload_target)
+            keep_original: Keep the upload as sent when ingest normalization
+                rewrites it (served as the "original" rendition)
             
         Returns:
-            Dictionary containing image_id
+            Dictionary containing image_id, format and dimensions (plus
+            duplicate/digest when content-addressed storage is enabled, and
+            normalization when ingest normalization is enabled)
             
         Raises:
             HTTPException: If validation or storage fails
         """
-        logger.info(f"Processing upload: {file.filename}")
+        logger.info("Processing upload: %s", file.filename)
         
-        # Validate the file
-        await validate_image_file(file)
+        # Size, extension and header were checked as the file arrived
+        if file.error is not None:
+            raise file.error
+        header = file.header
+        logger.info("Generated image ID: %s", file.image_id)
         
-        # Generate unique ID
+        # Store the file (the commit stage is timed inside)
+        if ingest_normalizer.enabled:
+            try:
+                saved, header, normalization = await ImageService._normalize_and_store(
+                    file.path, file.image_id, file.extension, header, keep_original
+                )
+            except BaseException:
+                await file.discard()
+                raise
+        else:
+            saved = await save_image(file)
+            normalization = None
+        logger.info("Image saved successfully at: %s", saved.record.path)
+        
+        return ImageService._stored(saved, file.filename, header, normalization)
+    
+    @staticmethod
+    async def _normalize_and_store(
+        source_path: Path,
+        image_id: str,
+        extension: str,
+        header: ImageHeader,
+        keep_original: bool,
+    ) -> Tuple[SavedImage, ImageHeader, dict]:
+        """
+        Normalize a received upload and store the result
+        
+        The source file is consumed on success: it is stored as the image
+        if normalization left it unchanged, and otherwise kept next to the
+        image (keep_original) or deleted.
+        
+        Args:
+            source_path: Complete file inside the upload directory
+            image_id: Unique identifier for the image
+            extension: Lower-case file extension, e.g. ".jpg"
+            header: Format and dimensions from validation
+            keep_original: Keep the source file if it is rewritten
+            
+        Returns:
+            Tuple of (saved image, header of the stored file, normalization summary)
+        """
+        file_path = get_file_path(image_id, extension)
+        normalized_path = get_temp_path(file_path)
+        await aiofiles.os.makedirs(file_path.parent, exist_ok=True)
+        
+        result = await ingest_normalizer.normalize(source_path, normalized_path)
+        original_kept = False
+        try:
+            if result.header is None:
+                saved = await save_image_file(source_path, image_id, extension, header)
+            else:
+                header = result.header
+                if keep_original:
+                    await aiofiles.os.replace(source_path, get_original_path(file_path))
+                    original_kept = True
+                else:
+                    await aiofiles.os.remove(source_path)
+                saved = await save_image_file(normalized_path, image_id, extension, header)
+        except BaseException:
+            await asyncio.to_thread(normalized_path.unlink, missing_ok=True)
+            raise
+        
+        normalization = {
+            "normalized": result.header is not None,
+            "bytes_before": result.bytes_before,
+            "bytes_after": result.bytes_after,
+            "original_kept": original_kept,
+        }
+        return saved, header, normalization
+    
+    @staticmethod
+    async def _process_batch_item(index: int, file: ReceivedFile, keep_original: bool) -> dict:
+        """
+        Process one file of a multi-file upload, capturing errors in the result
+        
+        Args:
+            index: Position of the file in the request
+            file: Upload received by the multipart parser
+            keep_original: Keep the upload as sent if normalization rewrites it
+        
+        Returns:
+            Dictionary with status "ok" and the upload result, or status "error"
+        """
+        try:
+            result = await ImageService.process_upload(file, keep_original)
+            return {"index": index, "filename": file.filename, "status": "ok", "result": result}
+        
+        except HTTPException as e:
+            error = {"status_code": e.status_code, "detail": e.detail}
+        
+        except Exception as e:
+            logger.error("Batch item upload failed: %s", e, exc_info=True)
+            error = {"status_code": 500, "detail": "Failed to process image upload"}
+        
+        return {"index": index, "filename": file.filename, "status": "error", "error": error}
+    
+    @staticmethod
+    async def process_upload_batch(
+        files: List[ReceivedFile], concurrency: int, keep_original: bool = False
+    ) -> List[dict]:
+        """
+        Store several uploads with bounded concurrency
+        
+        Args:
+            files: Uploads received by the multipart parser
+            concurrency: Maximum number of files processed at once
+            keep_original: Keep uploads as sent when normalization rewrites them
+            
+        Returns:
+            Per-file results in request order
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def run(index: int, file: ReceivedFile) -> dict:
+            async with semaphore:
+                return await ImageService._process_batch_item(index, file, keep_original)
+        
+        return await asyncio.gather(
+            *(run(index, file) for index, file in enumerate(files))
+        )
+    
+    @staticmethod
+    async def store_file(source_path: Path, filename: str, header: ImageHeader) -> dict:
+        """
+        Store an upload that was received and validated elsewhere
+        
+        Used by resumable uploads; the file is moved into storage (after
+        ingest normalization, when enabled).
+        
+        Args:
+            source_path: Complete file inside the upload directory
+            filename: Original filename
+            header: Format and dimensions validated while receiving the file
+            
+        Returns:
+            Dictionary in the same shape as process_upload
+        """
         image_id = generate_image_id()
-        logger.info(f"Generated image ID: {image_id}")
+        logger.info("Generated image ID: %s", image_id)
         
-        # Save the file
-        file_path = await save_image(file, image_id)
-        logger.info(f"Image saved successfully at: {file_path}")
+        extension = Path(filename).suffix.lower()
+        if ingest_normalizer.enabled:
+            saved, header, normalization = await ImageService._normalize_and_store(
+                source_path, image_id, extension, header, keep_original=False
+            )
+        else:
+            saved = await save_image_file(source_path, image_id, extension, header)
+            normalization = None
+        logger.info("Image saved successfully at: %s", saved.record.path)
         
-        return {
-            "image_id": image_id,
-            "filename": file.filename,
-            "status": "uploaded"
+        return ImageService._stored(saved, filename, header, normalization)
+    
+    @staticmethod
+    async def get_image_file(
+        image_id: str, rendition: Optional[str] = None
+    ) -> Tuple[ImageRecord, Path, os.stat_result]:
+        """
+        Resolve a stored image, or one of its renditions, for serving
+        
+        Args:
+            image_id: Unique image identifier
+            rendition: Derivative name (e.g. "thumb"), "original" for an
+                upload kept as sent, or None for the stored image
+            
+        Returns:
+            Tuple of (record, path of the file to serve, its stat result)
+            
+        Raises:
+            HTTPException: 400 for an unknown rendition, 404 if the image or
+                the rendition doesn't exist (yet)
+        """
+        record = await find_image(image_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail=f"Image not found: {image_id}")
+        
+        path = record.path
+        if rendition == ORIGINAL_RENDITION:
+            path = get_original_path(record.path)
+        elif rendition is not None:
+            if rendition not in derivative_service.specs:
+                available = ", ".join(derivative_service.specs) or "none"
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Unknown rendition: {rendition}. Available renditions: {available}"
+                )
+            path = await derivative_service.get_path(record, rendition)
+            if path is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Rendition {rendition} is not available for image: {image_id}"
+                )
+        
+        try:
+            stat_result = await asyncio.to_thread(os.stat, path)
+        except FileNotFoundError:
+            if rendition == ORIGINAL_RENDITION:
+                raise HTTPException(
+                    status_code=404,
+                    detail=f"Original is not kept for image: {image_id}"
+                )
+            raise HTTPException(status_code=404, detail=f"Image not found: {image_id}")
+        
+        return record, path, stat_result
+    
+    @staticmethod
+    def _stored(
+        saved: SavedImage, filename: str, header: ImageHeader, normalization: Optional[dict] = None
+    ) -> dict:
+        """Schedule post-processing of a stored image and build the upload response"""
+        # Thumbnails and the analysis rendition are rendered in the background
+        derivative_service.schedule(saved.record)
+        near_duplicate_service.schedule(saved.record)
+        metadata_service.record_image(saved.record, filename, header.format)
+        
+        result = {
+            "image_id": saved.record.image_id,
+            "filename": filename,
+            "status": "uploaded",
+            "format": header.format,
+            "width": header.width,
+            "height": header.height
         }
+        if settings.CONTENT_ADDRESSED_STORAGE:
+            result["duplicate"] = saved.duplicate
+            result["digest"] = saved.record.digest
+        if normalization is not None:
+            result["normalization"] = normalization
+        
+        return result
@@ -0,0 +1,243 @@
+"""
+Job Service
+Runs analysis jobs from the persistent queue in background workers
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.analysis_service import AnalysisService
+from app.services.engine_pool import engine_pool
+from app.utils.job_queue import FINISHED_STATUSES, JobQueue, job_queue
+from app.utils.storage import find_image
+
+logger = logging.getLogger(__name__)
+
+
+class JobService:
+    """
+    Asynchronous analysis jobs
+
+    Submitted jobs are written to the JobQueue and drained by a fixed
+    number of worker tasks on the event loop; the analysis itself still
+    goes through AnalysisService, so the cache, micro-batching and the
+    engine pool all apply. Workers are woken immediately for jobs
+    submitted to this process and poll for jobs submitted elsewhere.
+    """
+
+    def __init__(self, queue: JobQueue, workers: int, poll_interval: float):
+        self.queue = queue
+        self.workers = workers
+        self.poll_interval = poll_interval
+
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._watchers: Dict[str, Set[asyncio.Event]] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self) -> None:
+        """Open the queue and start the worker tasks"""
+        if self.workers <= 0:
+            return
+
+        await asyncio.to_thread(self.queue.open)
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._worker(number)) for number in range(self.workers)
+        ]
+        logger.info("Job service started with %s workers", self.workers)
+
+    async def stop(self) -> None:
+        """Stop the workers, returning jobs they were running to the queue"""
+        if not self._tasks:
+            return
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(self.queue.close)
+
+    async def submit(self, image_id: str) -> Tuple[dict, bool]:
+        """
+        Submit an image for asynchronous analysis
+
+        Args:
+            image_id: Unique image identifier
+
+        Returns:
+            Tuple of (job, created); created is False when an existing job
+            for the image was returned
+
+        Raises:
+            HTTPException: If jobs are disabled or the image doesn't exist
+        """
+        self._ensure_running()
+
+        if await find_image(image_id) is None:
+            logger.error("Image not found: %s", image_id)
+            raise HTTPException(
+                status_code=404,
+                detail=f"Image not found: {image_id}"
+            )
+
+        job, created = await asyncio.to_thread(
+            self.queue.submit, image_id, engine_pool.engine.identity
+        )
+        if job["status"] not in FINISHED_STATUSES:
+            self._wakeup.set()
+        logger.info(
+            "Job %s %s for %s (%s)",
+            job["job_id"],
+            "created" if created else "reused",
+            image_id,
+            job["status"],
+        )
+        return job, created
+
+    async def get(self, job_id: str) -> dict:
+        """
+        Get the current state of a job
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            Job dictionary
+
+        Raises:
+            HTTPException: If jobs are disabled or the job doesn't exist
+        """
+        self._ensure_running()
+
+        job = await asyncio.to_thread(self.queue.get, job_id)
+        if job is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Job not found: {job_id}"
+            )
+        return job
+
+    async def watch(self, job_id: str, heartbeat: float) -> AsyncIterator[Optional[dict]]:
+        """
+        Follow a job until it finishes
+
+        Args:
+            job_id: Job identifier
+            heartbeat: Seconds after which None is yielded if nothing changed
+
+        Yields:
+            The job whenever its status changes (starting with its current
+            state), or None as a keep-alive
+
+        Raises:
+            HTTPException: If jobs are disabled or the job doesn't exist
+        """
+        job = await self.get(job_id)
+        yield job
+
+        changed = asyncio.Event()
+        self._watchers.setdefault(job_id, set()).add(changed)
+        try:
+            status = job["status"]
+            idle = 0.0
+            while status not in FINISHED_STATUSES:
+                # Wake on local updates; poll for jobs run by other processes
+                try:
+                    await asyncio.wait_for(changed.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    idle += self.poll_interval
+                changed.clear()
+
+                job = await self.get(job_id)
+                if job["status"] != status:
+                    status = job["status"]
+                    idle = 0.0
+                    yield job
+                elif idle >= heartbeat:
+                    idle = 0.0
+                    yield None
+        finally:
+            watchers = self._watchers.get(job_id)
+            if watchers is not None:
+                watchers.discard(changed)
+                if not watchers:
+                    del self._watchers[job_id]
+
+    def stats(self) -> dict:
+        """
+        Get job counts by status
+
+        Returns:
+            Dictionary of job statistics
+        """
+        if not self.running:
+            return {"enabled": False}
+        return {"enabled": True, "workers": self.workers, "jobs": self.queue.counts()}
+
+    def _ensure_running(self) -> None:
+        if not self.running:
+            raise HTTPException(
+                status_code=503,
+                detail="Asynchronous analysis jobs are disabled"
+            )
+
+    def _notify(self, job_id: str) -> None:
+        for changed in self._watchers.get(job_id, ()):
+            changed.set()
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            job = await asyncio.to_thread(self.queue.claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+                continue
+
+            # Other workers may find more queued work
+            self._wakeup.set()
+            await self._run(job)
+
+    async def _run(self, job: dict) -> None:
+        job_id = job["job_id"]
+        self._notify(job_id)
+        logger.info("Job %s started (attempt %s)", job_id, job["attempts"])
+
+        try:
+            result = await AnalysisService.analyze_image(job["image_id"])
+        except asyncio.CancelledError:
+            # Shutting down: hand the job back so it runs on the next start
+            self.queue.release(job_id)
+            logger.warning("Job %s interrupted by shutdown, re-queued", job_id)
+            raise
+        except HTTPException as e:
+            await asyncio.to_thread(
+                self.queue.fail, job_id, {"status_code": e.status_code, "detail": e.detail}
+            )
+            logger.warning("Job %s failed: %s", job_id, e.detail)
+        except Exception as e:
+            logger.error("Job %s failed: %s", job_id, e, exc_info=True)
+            await asyncio.to_thread(
+                self.queue.fail, job_id, {"status_code": 500, "detail": "Failed to analyze image"}
+            )
+        else:
+            await asyncio.to_thread(self.queue.complete, job_id, result)
+            logger.info("Job %s succeeded", job_id)
+
+        self._notify(job_id)
+
+
+job_service = JobService(
+    queue=job_queue,
+    workers=settings.JOB_WORKERS,
+    poll_interval=settings.JOB_POLL_INTERVAL,
+)
@@ -0,0 +1,232 @@
+"""
+Metadata Service
+Records uploads and analysis results in the metadata store in batches
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException
+
+from app.config import settings
+from app.utils.image_index import ImageRecord, image_index
+from app.utils.metadata_store import MetadataStore, analysis_row, image_row
+
+logger = logging.getLogger(__name__)
+
+
+class MetadataService:
+    """
+    Write-behind front end of the MetadataStore
+
+    record_image() and record_analysis() only queue a row, so requests
+    never wait on SQLite. A background task writes everything queued in
+    one transaction every flush_interval seconds, or as soon as max_batch
+    rows are waiting. Rows are keyed by image ID, so repeated analyses of
+    an image between flushes cost one write. Reads flush first, which
+    keeps a process's own writes visible to its listings.
+    """
+
+    def __init__(self, store: MetadataStore, enabled: bool, flush_interval: float, max_batch: int):
+        self.store = store
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+
+        self._images: Dict[str, tuple] = {}
+        self._analyses: Dict[str, tuple] = {}
+        self._flush_lock = asyncio.Lock()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self.written = 0
+        self.batches = 0
+        self.failures = 0
+        self.last_batch_seconds = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def pending(self) -> int:
+        return len(self._images) + len(self._analyses)
+
+    async def start(self) -> None:
+        """
+        Open the store and start the flush task
+
+        An empty store is seeded from the image index, so images uploaded
+        before the store existed can be listed (without their filename).
+        """
+        if not self.enabled:
+            return
+
+        await asyncio.to_thread(self.store.open)
+        if await asyncio.to_thread(self.store.is_empty) and len(image_index):
+            rows = [image_row(record, None, None) for record in image_index.records()]
+            await asyncio.to_thread(self.store.write, rows, ())
+            logger.info("Metadata store seeded with %s indexed images", len(rows))
+
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """Write the remaining rows and close the store"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        await self.flush()
+        await asyncio.to_thread(self.store.close)
+
+    def record_image(self, record: ImageRecord, filename: Optional[str], format: str) -> None:
+        """
+        Queue a stored upload for writing
+
+        Args:
+            record: Record of the stored image
+            filename: Original filename
+            format: Image format from the validated header
+        """
+        if self._task is None:
+            return
+        self._images[record.image_id] = image_row(record, filename, format)
+        self._queued()
+
+    def record_analysis(self, record: ImageRecord, engine: str, result: dict) -> None:
+        """
+        Queue an analysis result for writing
+
+        Args:
+            record: Record of the analyzed image
+            engine: Identity of the analysis engine
+            result: Analysis result
+        """
+        if self._task is None:
+            return
+        self._analyses[record.image_id] = analysis_row(record, engine, result, time.time())
+        self._queued()
+
+    async def flush(self) -> None:
+        """Write every queued row in one transaction"""
+        async with self._flush_lock:
+            if not self.pending:
+                return
+
+            images, self._images = self._images, {}
+            analyses, self._analyses = self._analyses, {}
+            start_time = time.perf_counter()
+            try:
+                await asyncio.to_thread(self.store.write, images.values(), analyses.values())
+            except sqlite3.Error as e:
+                # Keep the rows for the next flush unless newer ones replaced them
+                logger.error("Writing %s metadata rows failed: %s", len(images) + len(analyses), e)
+                self.failures += 1
+                for image_id, row in images.items():
+                    self._images.setdefault(image_id, row)
+                for image_id, row in analyses.items():
+                    self._analyses.setdefault(image_id, row)
+                return
+
+            self.last_batch_seconds = time.perf_counter() - start_time
+            self.written += len(images) + len(analyses)
+            self.batches += 1
+
+    async def get(self, image_id: str) -> dict:
+        """
+        Get the metadata of an image
+
+        Args:
+            image_id: Unique image identifier
+
+        Returns:
+            Image dictionary including its latest analysis
+
+        Raises:
+            HTTPException: If the store is disabled or the image is unknown
+        """
+        self._ensure_running()
+        await self.flush()
+
+        image = await asyncio.to_thread(self.store.get, image_id)
+        if image is None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"Image not found: {image_id}"
+            )
+        return image
+
+    async def query(self, limit: int, **filters) -> Tuple[list, Optional[str]]:
+        """
+        List images newest first (see MetadataStore.query for the filters)
+
+        Args:
+            limit: Page size
+            **filters: cursor, since, until, format, digest, analyzed
+
+        Returns:
+            Tuple of (images, next cursor or None)
+
+        Raises:
+            HTTPException: If the store is disabled or the cursor is invalid
+        """
+        self._ensure_running()
+        await self.flush()
+
+        try:
+            return await asyncio.to_thread(self.store.query, limit, **filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    def stats(self) -> dict:
+        """
+        Get write counters
+
+        Returns:
+            Dictionary of metadata store statistics
+        """
+        return {
+            "enabled": self.running,
+            "pending": self.pending,
+            "written": self.written,
+            "batches": self.batches,
+            "failures": self.failures,
+            "average_batch_size": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "last_batch_ms": round(self.last_batch_seconds * 1000, 3),
+        }
+
+    def _ensure_running(self) -> None:
+        if not self.running:
+            raise HTTPException(
+                status_code=503,
+                detail="Metadata store is disabled"
+            )
+
+    def _queued(self) -> None:
+        if self.pending >= self.max_batch:
+            self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error("Metadata flush failed: %s", e, exc_info=True)
+
+
+metadata_service = MetadataService(
+    store=MetadataStore(settings.METADATA_DB),
+    enabled=settings.METADATA_STORE_ENABLED,
+    flush_interval=settings.METADATA_FLUSH_INTERVAL_MS / 1000,
+    max_batch=settings.METADATA_FLUSH_MAX_BATCH,
+)
@@ -0,0 +1,225 @@
+"""
+Near-Duplicate Service
+Hashes uploads in the background and finds near-identical images
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Set, TextIO, Tuple
+import logging
+
+from PIL import Image
+
+from app.config import settings
+from app.utils.analysis_cache import analysis_cache
+from app.utils.image_index import ImageRecord
+from app.utils.metrics import stage_timer
+from app.utils.perceptual_hash import HammingIndex, dhash_file, is_informative
+from app.utils.storage import find_image
+
+logger = logging.getLogger(__name__)
+
+# Neighbors whose cached analyses are tried, nearest first
+MAX_CANDIDATES = 5
+
+# Key marking a result that was itself reused from a near-duplicate
+NEAR_DUPLICATE_KEY = "near_duplicate_of"
+
+
+class NearDuplicateService:
+    """
+    Perceptual hashes of stored images
+
+    schedule() hashes an upload in a small thread pool, adds it to a
+    HammingIndex and appends "<image_id> <hash>" to an append-only log,
+    which is replayed at startup (a torn last line after a crash is
+    skipped). Images without a hash, such as uploads from before the
+    index existed, are hashed on first lookup. Hashes only serve
+    analysis reuse, so nothing is hashed unless reuse is enabled.
+    """
+
+    def __init__(self, index_path: Path, workers: int, max_distance: int, reuse: bool):
+        self.index_path = index_path
+        self.workers = workers
+        self.max_distance = max_distance
+        self.reuse = reuse
+
+        self.index = HammingIndex()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pending: Set[asyncio.Future] = set()
+        self._log: Optional[TextIO] = None
+        self._log_lock = threading.Lock()
+
+        self.hashed = 0
+        self.failed = 0
+        self.reused = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    async def start(self) -> None:
+        """Replay the hash log and start the worker pool"""
+        if self.workers <= 0 or not self.reuse:
+            return
+
+        start_time = time.perf_counter()
+        await asyncio.to_thread(self._open_log)
+        logger.info(
+            "Near-duplicate index loaded %s hashes in %.2fs",
+            len(self.index),
+            time.perf_counter() - start_time,
+        )
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="phash"
+        )
+
+    async def stop(self) -> None:
+        """Finish scheduled hashes, stop the worker pool and close the log"""
+        if self._executor is None:
+            return
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        self._executor = None
+        with self._log_lock:
+            self._log.close()
+            self._log = None
+
+    def schedule(self, record: ImageRecord) -> None:
+        """
+        Queue hashing of a stored image
+
+        Args:
+            record: Record of the original image
+        """
+        if self._executor is None:
+            return
+
+        future = asyncio.get_running_loop().run_in_executor(
+            self._executor, self._hash, record
+        )
+        self._pending.add(future)
+        future.add_done_callback(self._pending.discard)
+
+    async def neighbors(self, record: ImageRecord) -> List[Tuple[str, int]]:
+        """
+        Find near-identical images
+
+        Args:
+            record: Record of the query image
+
+        Returns:
+            List of (image_id, Hamming distance) within max_distance,
+            nearest first, excluding the image itself (empty for images
+            too flat to match on)
+        """
+        if self._executor is None:
+            return []
+
+        value = self.index.get(record.image_id)
+        if value is None:
+            value = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._hash, record
+            )
+            if value is None:
+                return []
+        if not is_informative(value):
+            return []
+
+        matches = self.index.search(value, self.max_distance, limit=MAX_CANDIDATES + 1)
+        return [match for match in matches if match[0] != record.image_id][:MAX_CANDIDATES]
+
+    async def find_analysis(self, record: ImageRecord) -> Optional[Tuple[dict, str, int]]:
+        """
+        Find a cached analysis of a near-identical image
+
+        Only results computed by the current engine are considered, and
+        never results that were reused themselves, so reuse does not
+        chain from one near-duplicate to the next.
+
+        Args:
+            record: Record of the image to analyze
+
+        Returns:
+            Tuple of (cached result, image_id it belongs to, Hamming
+            distance), or None if no near-duplicate has been analyzed
+        """
+        for image_id, distance in await self.neighbors(record):
+            neighbor = await find_image(image_id)
+            if neighbor is None:
+                continue
+            result = await analysis_cache.get(analysis_cache.make_key(image_id, neighbor.digest))
+            if result is not None and NEAR_DUPLICATE_KEY not in result:
+                self.reused += 1
+                return result, image_id, distance
+        self.misses += 1
+        return None
+
+    def stats(self) -> dict:
+        """
+        Get hashing and reuse counters
+
+        Returns:
+            Dictionary of near-duplicate statistics
+        """
+        return {
+            "enabled": self.enabled,
+            "reuse": self.reuse,
+            "max_distance": self.max_distance,
+            "indexed": len(self.index),
+            "pending": len(self._pending),
+            "hashed": self.hashed,
+            "failed": self.failed,
+            "reused": self.reused,
+            "misses": self.misses,
+        }
+
+    def _hash(self, record: ImageRecord) -> Optional[int]:
+        try:
+            with stage_timer("upload", "phash").time():
+                value = dhash_file(record.path)
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            self.failed += 1
+            logger.warning("Perceptual hash failed for %s: %s", record.image_id, e)
+            return None
+
+        self.hashed += 1
+        if self.index.add(record.image_id, value):
+            with self._log_lock:
+                if self._log is not None:
+                    self._log.write(f"{record.image_id} {value:016x}\n")
+                    self._log.flush()
+        return value
+
+    def _open_log(self) -> None:
+        ends_with_newline = True
+        try:
+            with open(self.index_path, "r") as log_file:
+                for line in log_file:
+                    ends_with_newline = line.endswith("\n")
+                    image_id, _, value = line.rstrip("\n").partition(" ")
+                    try:
+                        if not ends_with_newline or len(value) != 16:
+                            raise ValueError(value)
+                        self.index.add(image_id, int(value, 16))
+                    except ValueError:
+                        logger.warning("Skipping malformed near-duplicate log line")
+        except FileNotFoundError:
+            pass
+        self._log = open(self.index_path, "a")
+        if not ends_with_newline:
+            # Terminate a line torn by a crash so the next entry starts fresh
+            self._log.write("\n")
+
+
+near_duplicate_service = NearDuplicateService(
+    index_path=settings.PHASH_INDEX_FILE,
+    workers=settings.PHASH_WORKERS,
+    max_distance=settings.NEAR_DUPLICATE_DISTANCE,
+    reuse=settings.NEAR_DUPLICATE_REUSE,
+)
@@ -0,0 +1,221 @@
+"""
+Normalize Service
+Ingest-time orientation fix, metadata stripping and downscaling in a worker pool
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import logging
+
+from PIL import ExifTags, Image, ImageOps
+
+from app.config import settings
+from app.utils.image_header import ImageHeader
+from app.utils.metrics import stage_timer
+
+logger = logging.getLogger(__name__)
+
+# Pillow format names for the header formats stored
+SAVE_FORMATS = {
+    "jpeg": "JPEG",
+    "png": "PNG",
+}
+
+# Metadata Pillow exposes in Image.info that is dropped on re-encoding
+# (the ICC profile is kept: without it wide-gamut photos change color)
+METADATA_KEYS = ("exif", "xmp", "XML:com.adobe.xmp", "comment", "photoshop", "adobe")
+
+
+@dataclass
+class NormalizeResult:
+    """Outcome of normalizing one upload"""
+
+    # Header of the rewritten file, or None if the upload was left as sent
+    header: Optional[ImageHeader]
+    bytes_before: int
+    bytes_after: int
+
+
+def needs_normalizing(image: Image.Image, max_dimension: int) -> bool:
+    """
+    Check whether an opened image has anything to normalize
+
+    Args:
+        image: Image opened with Image.open (pixels not yet decoded)
+        max_dimension: Largest side length to keep
+
+    Returns:
+        True if the image is rotated by EXIF, carries metadata or is too large
+    """
+    if max(image.size) > max_dimension:
+        return True
+    if image.getexif().get(ExifTags.Base.Orientation, 1) != 1:
+        return True
+    return any(key in image.info for key in METADATA_KEYS) or bool(getattr(image, "text", None))
+
+
+def normalize_image(
+    source_path: Path, target_path: Path, max_dimension: int, quality: int
+) -> Optional[ImageHeader]:
+    """
+    Rewrite an image upright, without metadata and within a maximum size
+
+    EXIF orientation is applied to the pixels, EXIF/XMP/comment blocks
+    (and the embedded thumbnail inside EXIF) are dropped, and images
+    larger than max_dimension are downscaled, JPEGs with DCT scaling so
+    the full resolution is never decoded. The format is kept: JPEGs are
+    re-encoded at `quality`, PNGs stay lossless. Files with nothing to
+    normalize are left alone rather than re-encoded.
+
+    Args:
+        source_path: Uploaded file
+        target_path: File to write (removed again if writing fails)
+        max_dimension: Largest side length in pixels
+        quality: JPEG quality
+
+    Returns:
+        Header of the written file, or None if nothing was written
+    """
+    with Image.open(source_path) as original:
+        if not needs_normalizing(original, max_dimension):
+            return None
+
+        format = "png" if original.format == "PNG" else "jpeg"
+        icc_profile = original.info.get("icc_profile")
+        width, height = original.size
+        if max(width, height) > max_dimension:
+            scale = max_dimension / max(width, height)
+            original.draft(original.mode, (int(width * scale), int(height * scale)))
+
+        image = ImageOps.exif_transpose(original)
+        image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+
+        options = {"icc_profile": icc_profile} if icc_profile else {}
+        if format == "jpeg":
+            if image.mode not in ("L", "RGB", "CMYK"):
+                image = image.convert("RGB")
+            options.update(quality=quality, optimize=True)
+
+        try:
+            image.save(target_path, SAVE_FORMATS[format], **options)
+        except BaseException:
+            target_path.unlink(missing_ok=True)
+            raise
+        return ImageHeader(format=format, width=image.width, height=image.height)
+
+
+class IngestNormalizer:
+    """
+    Normalizes uploads before they are stored
+
+    Decoding and re-encoding run in a thread pool (Pillow releases the
+    GIL while doing so), keeping the event loop free. Uploads that cannot
+    be decoded are stored as sent; analysis will report them.
+    """
+
+    def __init__(self, workers: int, max_dimension: int, quality: int):
+        self.workers = workers
+        self.max_dimension = max_dimension
+        self.quality = quality
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+        self.normalized = 0
+        self.unchanged = 0
+        self.failed = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._executor is not None
+
+    def start(self) -> None:
+        """Start the worker pool"""
+        if self.workers <= 0:
+            return
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers, thread_name_prefix="normalize"
+        )
+        logger.info(
+            "Ingest normalization enabled: max %spx, JPEG quality %s, %s workers",
+            self.max_dimension,
+            self.quality,
+            self.workers,
+        )
+
+    async def stop(self) -> None:
+        """Stop the worker pool after running normalizations finish"""
+        if self._executor is None:
+            return
+        await asyncio.to_thread(self._executor.shutdown, wait=True)
+        self._executor = None
+
+    async def normalize(self, source_path: Path, target_path: Path) -> NormalizeResult:
+        """
+        Normalize an upload in the worker pool
+
+        Args:
+            source_path: Uploaded file
+            target_path: Where to write the normalized file
+
+        Returns:
+            NormalizeResult; its header is None if the file should be
+            stored as sent (nothing to change, or undecodable)
+        """
+        bytes_before = (await asyncio.to_thread(os.stat, source_path)).st_size
+        try:
+            with stage_timer("upload", "normalize").time():
+                header = await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    normalize_image,
+                    source_path,
+                    target_path,
+                    self.max_dimension,
+                    self.quality,
+                )
+        except (OSError, ValueError, Image.DecompressionBombError) as e:
+            self.failed += 1
+            logger.warning("Normalizing %s failed, storing as sent: %s", source_path.name, e)
+            header = None
+
+        if header is None:
+            bytes_after = bytes_before
+            self.unchanged += 1
+        else:
+            bytes_after = (await asyncio.to_thread(os.stat, target_path)).st_size
+            self.normalized += 1
+
+        self.bytes_before += bytes_before
+        self.bytes_after += bytes_after
+        return NormalizeResult(header=header, bytes_before=bytes_before, bytes_after=bytes_after)
+
+    def stats(self) -> dict:
+        """
+        Get normalization counters
+
+        Returns:
+            Dictionary of normalization statistics
+        """
+        return {
+            "enabled": self.enabled,
+            "max_dimension": self.max_dimension,
+            "normalized": self.normalized,
+            "unchanged": self.unchanged,
+            "failed": self.failed,
+            "bytes_before": self.bytes_before,
+            "bytes_after": self.bytes_after,
+            "size_ratio": (
+                round(self.bytes_after / self.bytes_before, 4) if self.bytes_before else 1.0
+            ),
+        }
+
+
+ingest_normalizer = IngestNormalizer(
+    workers=settings.NORMALIZE_WORKERS,
+    max_dimension=settings.NORMALIZE_MAX_DIMENSION,
+    quality=settings.NORMALIZE_QUALITY,
+)
@@ -0,0 +1,296 @@
+"""
+Upload Session Service
+Resumable, chunked uploads layered on the regular image storage
+"""
+
+import asyncio
+import fcntl
+import logging
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import aiofiles
+from fastapi import HTTPException
+
+from app.config import settings
+from app.services.image_service import ImageService
+from app.utils.metrics import UPLOAD_BYTES, UPLOAD_BYTES_IN_FLIGHT, stage_timer
+from app.utils.upload_sessions import (
+    UploadSession,
+    UploadSessionStore,
+    is_valid_upload_id,
+    upload_session_store,
+)
+from app.utils.validators import (
+    validate_file_extension,
+    validate_file_size,
+    validate_image_header,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class UploadSessionService:
+    """
+    Resumable uploads (a small subset of the tus protocol)
+
+    A client creates a session with the total length, appends chunks at
+    the current offset, can query the offset after a dropped connection
+    and finalizes once every byte has arrived. Bytes written before a
+    disconnect are kept, so only the missing tail is re-sent.
+
+    The declared length is checked against MAX_FILE_SIZE up front and
+    every chunk against the declared length; the image header is
+    validated as soon as enough leading bytes have arrived, so a renamed
+    or oversized image is rejected on its first chunk. Sessions are
+    locked with flock while being written, which keeps concurrent
+    appends from several server processes from interleaving.
+    """
+
+    def __init__(self, store: UploadSessionStore, gc_interval: float):
+        self.store = store
+        self.gc_interval = gc_interval
+        self._gc_task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """Create the session directory and start garbage collection"""
+        await asyncio.to_thread(self.store.open)
+        self._gc_task = asyncio.create_task(self._collect_garbage())
+
+    async def stop(self) -> None:
+        """Stop garbage collection"""
+        if self._gc_task is None:
+            return
+        self._gc_task.cancel()
+        await asyncio.gather(self._gc_task, return_exceptions=True)
+        self._gc_task = None
+
+    async def create(self, filename: str, length: int) -> UploadSession:
+        """
+        Start a resumable upload
+
+        Args:
+            filename: Original filename (its extension must be allowed)
+            length: Total size in bytes
+
+        Returns:
+            New session
+
+        Raises:
+            HTTPException: If the extension or length is not allowed
+        """
+        validate_file_extension(filename)
+        if length <= 0:
+            raise HTTPException(status_code=400, detail="Upload length must be positive")
+        validate_file_size(length)
+
+        session = await asyncio.to_thread(
+            self.store.create, filename, Path(filename).suffix.lower(), length
+        )
+        logger.info(
+            "Upload session %s created for %s (%s bytes)", session.upload_id, filename, length
+        )
+        return session
+
+    async def get(self, upload_id: str) -> UploadSession:
+        """
+        Get a session and its current offset
+
+        Args:
+            upload_id: Upload identifier
+
+        Returns:
+            UploadSession
+
+        Raises:
+            HTTPException: If the session doesn't exist (or has expired)
+        """
+        session = None
+        if is_valid_upload_id(upload_id):
+            session = await asyncio.to_thread(self.store.get, upload_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Upload session not found: {upload_id}")
+        return session
+
+    async def append(
+        self, upload_id: str, offset: int, chunks: AsyncIterator[bytes]
+    ) -> UploadSession:
+        """
+        Append data to a session
+
+        Args:
+            upload_id: Upload identifier
+            offset: Offset the client believes the data starts at
+            chunks: Request body stream
+
+        Returns:
+            Session with the new offset
+
+        Raises:
+            HTTPException: 404 if the session doesn't exist, 409 if the
+                offset doesn't match, 423 if another request is writing
+                to the session, 400 if the data exceeds the declared
+                length or is not a valid image
+        """
+        session = await self.get(upload_id)
+        self._check_offset(session, offset)
+
+        data_path = self.store.data_path(upload_id)
+        async with aiofiles.open(data_path, "ab") as out_file:
+            self._lock(out_file.fileno(), upload_id)
+
+            # Another request may have appended while this one waited
+            session = await self.get(upload_id)
+            self._check_offset(session, offset)
+
+            prefix = b""
+            if session.header is None:
+                prefix = await asyncio.to_thread(
+                    self.store.read_prefix, upload_id, settings.IMAGE_HEADER_MAX_BYTES
+                )
+
+            received = 0
+            try:
+                with stage_timer("upload", "write").time():
+                    async for chunk in chunks:
+                        if not chunk:
+                            continue
+                        if session.offset + received + len(chunk) > session.length:
+                            raise HTTPException(
+                                status_code=400,
+                                detail=(
+                                    "Data exceeds the declared upload length of "
+                                    f"{session.length} bytes"
+                                ),
+                            )
+                        if session.header is None:
+                            prefix += chunk
+                            await self._check_header(session, prefix)
+
+                        UPLOAD_BYTES_IN_FLIGHT.inc(len(chunk))
+                        received += len(chunk)
+                        await out_file.write(chunk)
+                        UPLOAD_BYTES.inc(len(chunk))
+            except HTTPException:
+                # Drop the rejected request's data; a client may retry from offset
+                await out_file.flush()
+                await out_file.truncate(offset)
+                raise
+            finally:
+                UPLOAD_BYTES_IN_FLIGHT.dec(received)
+
+        session.offset = offset + received
+        return session
+
+    async def finalize(self, upload_id: str) -> dict:
+        """
+        Store a completely received upload as an image
+
+        Repeating the call for a finalized session returns the same result.
+
+        Args:
+            upload_id: Upload identifier
+
+        Returns:
+            Dictionary in the same shape as the single-request upload
+
+        Raises:
+            HTTPException: 404 if the session doesn't exist, 409 if data is
+                still missing, 423 if a request is writing to the session,
+                400 if no valid image header was received
+        """
+        session = await self.get(upload_id)
+        if session.result is not None:
+            return session.result
+
+        data_path = self.store.data_path(upload_id)
+        async with aiofiles.open(data_path, "ab") as data_file:
+            self._lock(data_file.fileno(), upload_id)
+
+            session = await self.get(upload_id)
+            if session.result is not None:
+                return session.result
+            if not session.complete:
+                raise HTTPException(
+                    status_code=409,
+                    detail=(
+                        f"Upload incomplete: {session.offset} of {session.length} "
+                        "bytes received"
+                    ),
+                )
+            if session.header is None:
+                await asyncio.to_thread(self.store.delete, upload_id)
+                raise HTTPException(
+                    status_code=400, detail="Image header is truncated or too large"
+                )
+
+            session.result = await ImageService.store_file(
+                data_path, session.filename, session.header
+            )
+            await asyncio.to_thread(self.store.save, session)
+
+        logger.info("Upload session %s finalized as %s", upload_id, session.result["image_id"])
+        return session.result
+
+    async def abort(self, upload_id: str) -> None:
+        """
+        Discard a session and its data
+
+        Args:
+            upload_id: Upload identifier
+
+        Raises:
+            HTTPException: If the session doesn't exist
+        """
+        await self.get(upload_id)
+        await asyncio.to_thread(self.store.delete, upload_id)
+        logger.info("Upload session %s aborted", upload_id)
+
+    async def _check_header(self, session: UploadSession, prefix: bytes) -> None:
+        """Validate the image header once it has arrived; invalid content ends the session"""
+        try:
+            header = validate_image_header(prefix, session.extension)
+            if header is None and len(prefix) >= settings.IMAGE_HEADER_MAX_BYTES:
+                raise HTTPException(
+                    status_code=400, detail="Image header is truncated or too large"
+                )
+        except HTTPException:
+            await asyncio.to_thread(self.store.delete, session.upload_id)
+            raise
+
+        if header is not None:
+            session.header = header
+            await asyncio.to_thread(self.store.save, session)
+
+    @staticmethod
+    def _check_offset(session: UploadSession, offset: int) -> None:
+        if session.result is not None:
+            raise HTTPException(status_code=409, detail="Upload has already been finalized")
+        if offset != session.offset:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Upload-Offset {offset} does not match the current offset {session.offset}",
+            )
+
+    @staticmethod
+    def _lock(fileno: int, upload_id: str) -> None:
+        # Released when the file is closed
+        try:
+            fcntl.flock(fileno, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise HTTPException(
+                status_code=423, detail=f"Upload session is busy: {upload_id}"
+            )
+
+    async def _collect_garbage(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.store.collect_garbage)
+            except Exception as e:
+                logger.warning("Upload session cleanup failed: %s", e)
+            await asyncio.sleep(self.gc_interval)
+
+
+upload_session_service = UploadSessionService(
+    upload_session_store, settings.UPLOAD_SESSION_GC_INTERVAL
+)
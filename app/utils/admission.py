@@ -0,0 +1,243 @@
+"""
+Admission Control
+Per-route-class concurrency and in-flight byte limits with bounded wait queues
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot be admitted (queue full or wait timed out)"""
+
+    def __init__(self, limiter: str, reason: str):
+        super().__init__(f"{limiter}: {reason}")
+        self.limiter = limiter
+        self.reason = reason
+
+
+class AdmissionLimiter:
+    """
+    Bounds the requests of one route class running at once
+
+    A request is admitted while fewer than max_concurrent are active and
+    its byte cost fits in max_bytes (a single request larger than the
+    budget is admitted alone, so it cannot starve). Otherwise it waits in
+    a FIFO queue of at most max_queue requests for up to queue_timeout
+    seconds; a full queue or an expired wait raises AdmissionRejected
+    immediately instead of letting latency and memory grow without bound.
+    All methods run on the event loop.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_concurrent: int,
+        max_queue: int,
+        queue_timeout: float,
+        max_bytes: int = 0,
+    ):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_bytes = max_bytes
+
+        self.active = 0
+        self.active_bytes = 0
+        self._waiters: Deque[Tuple[asyncio.Future, int]] = deque()
+
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self, cost: int = 0) -> None:
+        """
+        Wait for a slot
+
+        Args:
+            cost: Bytes the request will hold in memory or on disk
+
+        Raises:
+            AdmissionRejected: If the queue is full or the wait timed out
+        """
+        if not self._waiters and self._fits(cost):
+            self._take(cost)
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise AdmissionRejected(self.name, "queue full")
+
+        waiter = (asyncio.get_running_loop().create_future(), cost)
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[0], self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.timeouts += 1
+            raise AdmissionRejected(self.name, "queue wait timed out")
+        except asyncio.CancelledError:
+            if waiter[0].done() and not waiter[0].cancelled():
+                # Admitted just as the client went away
+                self.release(cost)
+            else:
+                self._discard(waiter)
+            raise
+
+    def release(self, cost: int = 0) -> None:
+        """
+        Give a slot back and admit waiting requests that now fit
+
+        Args:
+            cost: The cost passed to acquire()
+        """
+        self.active -= 1
+        self.active_bytes -= cost
+        while self._waiters:
+            future, waiting_cost = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if not self._fits(waiting_cost):
+                break
+            self._waiters.popleft()
+            self._take(waiting_cost)
+            future.set_result(None)
+
+    def cap_cost(self, cost: int) -> int:
+        """Limit a request's cost to the byte budget"""
+        return min(cost, self.max_bytes) if self.max_bytes > 0 else 0
+
+    def saturation(self) -> float:
+        """
+        Fraction of the tighter of the concurrency and byte limits in use
+
+        Returns:
+            0.0 when idle, 1.0 or more when new requests have to wait
+        """
+        if not self.enabled:
+            return 0.0
+        used = self.active / self.max_concurrent
+        if self.max_bytes > 0:
+            used = max(used, self.active_bytes / self.max_bytes)
+        return used
+
+    def stats(self) -> dict:
+        """
+        Get limiter state and counters
+
+        Returns:
+            Dictionary of admission statistics
+        """
+        return {
+            "active": self.active,
+            "limit": self.max_concurrent,
+            "queued": self.queued,
+            "queue_limit": self.max_queue,
+            "bytes_in_flight": self.active_bytes,
+            "bytes_limit": self.max_bytes,
+            "saturation": round(self.saturation(), 3),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+    def _fits(self, cost: int) -> bool:
+        if self.active >= self.max_concurrent:
+            return False
+        if self.max_bytes > 0 and self.active > 0:
+            return self.active_bytes + cost <= self.max_bytes
+        return True
+
+    def _take(self, cost: int) -> None:
+        self.active += 1
+        self.active_bytes += cost
+        self.admitted += 1
+
+    def _discard(self, waiter: Tuple[asyncio.Future, int]) -> None:
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+
+upload_admission = AdmissionLimiter(
+    "upload",
+    max_concurrent=settings.UPLOAD_MAX_CONCURRENCY,
+    max_queue=settings.UPLOAD_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    max_bytes=settings.UPLOAD_MAX_INFLIGHT_BYTES,
+)
+analyze_admission = AdmissionLimiter(
+    "analyze",
+    max_concurrent=settings.ANALYZE_MAX_CONCURRENCY,
+    max_queue=settings.ANALYZE_MAX_QUEUE,
+    queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+)
+
+# (method, path, limiter, byte cost charged when Content-Length is missing);
+# paths ending in "/" match any sub-path
+ADMISSION_RULES: List[Tuple[str, str, AdmissionLimiter, int]] = [
+    ("POST", "/api/upload", upload_admission, settings.MAX_FILE_SIZE),
+    ("POST", "/api/upload/batch", upload_admission, settings.UPLOAD_BATCH_MAX_BYTES),
+    ("PATCH", "/api/uploads/", upload_admission, settings.MAX_FILE_SIZE),
+    ("POST", "/api/analyze", analyze_admission, 0),
+    ("POST", "/api/analyze/batch", analyze_admission, 0),
+    ("POST", "/api/analyze/batch/stream", analyze_admission, 0),
+]
+
+
+def match_admission(method: str, path: str) -> Optional[Tuple[AdmissionLimiter, int]]:
+    """
+    Find the limiter guarding a request
+
+    Args:
+        method: HTTP method
+        path: Request path
+
+    Returns:
+        Tuple of (limiter, default byte cost), or None if the route is not limited
+    """
+    for rule_method, rule_path, limiter, default_cost in ADMISSION_RULES:
+        if method != rule_method or not limiter.enabled:
+            continue
+        if path == rule_path or (rule_path.endswith("/") and path.startswith(rule_path)):
+            return limiter, default_cost
+    return None
+
+
+def admission_status() -> Dict[str, dict]:
+    """
+    Get the state of every limiter, for /health and /metrics
+
+    Returns:
+        Dictionary of limiter name to stats
+    """
+    return {
+        limiter.name: limiter.stats()
+        for limiter in (upload_admission, analyze_admission)
+        if limiter.enabled
+    }
+
+
+def is_saturated() -> bool:
+    """True when any limited route class would make a new request wait"""
+    return any(
+        limiter.enabled and (limiter.queued > 0 or limiter.saturation() >= 1)
+        for limiter in (upload_admission, analyze_admission)
+    )
@@ -0,0 +1,217 @@
+"""
+Analysis Cache Utilities
+In-memory LRU/TTL cache for analysis results with an optional SQLite tier
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional, Tuple
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AnalysisCache:
+    """Caches analysis results keyed by engine version and image identity"""
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        db_path: Optional[Path] = None,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.engine_version: Optional[str] = None
+
+        self._entries: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def make_key(self, image_id: str, digest: Optional[str] = None) -> str:
+        """
+        Build a cache key
+
+        Keys are scoped to the engine version. When ANALYSIS_CACHE_KEY is
+        "digest" and the content digest is known, identical content shares
+        one entry regardless of image ID.
+
+        Args:
+            image_id: Image identifier
+            digest: SHA-256 content digest, if known
+
+        Returns:
+            Cache key string
+        """
+        if settings.ANALYSIS_CACHE_KEY == "digest" and digest:
+            return f"{self.engine_version}:sha256:{digest}"
+        return f"{self.engine_version}:id:{image_id}"
+
+    async def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a cached result (memory first, then disk)
+
+        Args:
+            key: Cache key from make_key
+
+        Returns:
+            Cached result, or None on a miss
+        """
+        if not self.enabled:
+            return None
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+            self.expirations += 1
+
+        if self._db is not None:
+            value = await asyncio.to_thread(self._db_get, key)
+            if value is not None:
+                self._remember(key, value)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: dict) -> None:
+        """
+        Store a result in memory and, if configured, on disk
+
+        Args:
+            key: Cache key from make_key
+            value: Analysis result
+        """
+        if not self.enabled:
+            return
+
+        self._remember(key, value)
+        if self._db is not None:
+            await asyncio.to_thread(self._db_set, key, value)
+
+    def stats(self) -> dict:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary of cache statistics
+        """
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "engine_version": self.engine_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "persistent": self._db is not None,
+        }
+
+    def open(self, engine_version: str) -> None:
+        """
+        Open the cache for an analysis engine version
+
+        Entries stored for any other engine version are invalidated.
+
+        Args:
+            engine_version: Version string of the active analysis engine
+        """
+        if self.engine_version is not None and self.engine_version != engine_version:
+            self._entries.clear()
+        self.engine_version = engine_version
+
+        if not self.enabled or not self.db_path or self._db is not None:
+            return
+
+        db = sqlite3.connect(self.db_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS results "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+
+        row = db.execute("SELECT value FROM meta WHERE key = 'engine_version'").fetchone()
+        if row is None or row[0] != engine_version:
+            if row is not None:
+                logger.info(
+                    "Analysis engine changed (%s -> %s), clearing cache", row[0], engine_version
+                )
+            db.execute("DELETE FROM results")
+            db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('engine_version', ?)",
+                (engine_version,),
+            )
+        db.execute("DELETE FROM results WHERE created_at < ?", (time.time() - self.ttl,))
+        db.commit()
+
+        self._db = db
+        logger.info("Analysis cache persisted at: %s", self.db_path)
+
+    def close(self) -> None:
+        """Close the disk tier"""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def _remember(self, key: str, value: dict) -> None:
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _db_get(self, key: str) -> Optional[dict]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[1] < time.time() - self.ttl:
+            return None
+        return json.loads(row[0])
+
+    def _db_set(self, key: str, value: dict) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), time.time()),
+            )
+            self._db.commit()
+
+
+analysis_cache = AnalysisCache(
+    max_entries=settings.ANALYSIS_CACHE_SIZE,
+    ttl=settings.ANALYSIS_CACHE_TTL,
+    db_path=settings.ANALYSIS_CACHE_DB,
+)
@@ -0,0 +1,372 @@
+"""
+API Key Store
+Salted key hashes loaded from a JSON file or SQLite database, reloaded on change
+
+Usage: python -m app.utils.api_keys create --name mobile-app [--rate 10 --burst 20]
+       python -m app.utils.api_keys list
+       python -m app.utils.api_keys revoke <key_id>
+
+Keys have the form "<key_id>.<secret>". Only the key ID, a random salt
+and SHA-256(salt + secret) are stored; the full key is printed once by
+"create". The store file is API_KEYS_FILE: a path ending in .db or
+.sqlite is an SQLite database, anything else a JSON document. Running
+servers pick up changes within API_KEYS_RELOAD_INTERVAL seconds.
+"""
+
+import argparse
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+KEY_ID_BYTES = 8
+SECRET_BYTES = 32
+SALT_BYTES = 16
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+_COLUMNS = "key_id, name, salt, hash, rate, burst, disabled, created_at"
+
+
+@dataclass
+class ApiKey:
+    """A client key as stored (never the secret itself)"""
+
+    key_id: str
+    name: str
+    salt: str
+    hash: str
+    # Token bucket for this key; None uses API_KEY_RATE_LIMIT / API_KEY_RATE_BURST
+    rate: Optional[float] = None
+    burst: Optional[int] = None
+    disabled: bool = False
+    created_at: float = 0.0
+
+
+def hash_secret(secret: str, salt: str) -> str:
+    """
+    Hash a key secret
+
+    Secrets are 256-bit random values, so a single salted SHA-256 is as
+    strong as a slow password hash here and keeps verification cheap.
+
+    Args:
+        secret: Secret part of a key
+        salt: Hex-encoded salt
+
+    Returns:
+        Hex digest
+    """
+    return hashlib.sha256(bytes.fromhex(salt) + secret.encode()).hexdigest()
+
+
+def generate_api_key(
+    name: str, rate: Optional[float] = None, burst: Optional[int] = None
+) -> Tuple[str, ApiKey]:
+    """
+    Create a new random key
+
+    Args:
+        name: Human-readable owner of the key
+        rate: Requests per second allowed for the key (None for the default)
+        burst: Burst size for the key (None for the default)
+
+    Returns:
+        Tuple of (full key to hand to the client, ApiKey to store)
+    """
+    key_id = secrets.token_hex(KEY_ID_BYTES)
+    secret = secrets.token_urlsafe(SECRET_BYTES)
+    salt = secrets.token_hex(SALT_BYTES)
+    key = ApiKey(
+        key_id=key_id,
+        name=name,
+        salt=salt,
+        hash=hash_secret(secret, salt),
+        rate=rate,
+        burst=burst,
+        created_at=time.time(),
+    )
+    return f"{key_id}.{secret}", key
+
+
+class ApiKeyStore:
+    """
+    Client keys indexed by key ID
+
+    Verification is a dict lookup on the key ID, one SHA-256 and a
+    constant-time compare; keys that verified recently are remembered in
+    a small LRU cache, so the steady state is a single dict hit. The
+    whole key set is swapped in at once on reload (and the cache
+    cleared), so a revoked key stops working at the next reload.
+    """
+
+    def __init__(self, path: Optional[Path], cache_size: int, reload_interval: float):
+        self.path = path
+        self.cache_size = cache_size
+        self.reload_interval = reload_interval
+
+        self.keys: Dict[str, ApiKey] = {}
+        self._cache: "OrderedDict[str, ApiKey]" = OrderedDict()
+        self._version = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._reload_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_sqlite(self) -> bool:
+        return self.path is not None and self.path.suffix.lower() in SQLITE_SUFFIXES
+
+    async def start(self) -> None:
+        """Load the keys and start watching the store for changes"""
+        if self.path is None:
+            return
+        await asyncio.to_thread(self.load)
+        self._reload_task = asyncio.create_task(self._watch())
+
+    async def stop(self) -> None:
+        """Stop watching the store"""
+        if self._reload_task is not None:
+            self._reload_task.cancel()
+            await asyncio.gather(self._reload_task, return_exceptions=True)
+            self._reload_task = None
+        if self._db is not None:
+            await asyncio.to_thread(self.close)
+
+    def close(self) -> None:
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def verify(self, presented: str) -> Optional[ApiKey]:
+        """
+        Check a key presented by a client
+
+        Args:
+            presented: Full key from the request ("<key_id>.<secret>")
+
+        Returns:
+            The matching ApiKey, or None if it is unknown, wrong or disabled
+        """
+        cache = self._cache
+        key = cache.get(presented)
+        if key is not None:
+            cache.move_to_end(presented)
+            return key
+
+        key_id, separator, secret = presented.partition(".")
+        if not separator:
+            return None
+        key = self.keys.get(key_id)
+        if key is None or key.disabled:
+            return None
+        if not hmac.compare_digest(hash_secret(secret, key.salt), key.hash):
+            return None
+
+        cache[presented] = key
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return key
+
+    def load(self) -> None:
+        """(Re)read every key from the store"""
+        version = self._current_version()
+        keys = self._read_sqlite() if self.is_sqlite else self._read_json()
+        self.keys = {key.key_id: key for key in keys}
+        self._cache = OrderedDict()
+        self._version = version
+        logger.info("Loaded %s API keys from %s", len(self.keys), self.path)
+
+    def reload_if_changed(self) -> bool:
+        """
+        Reload the keys if the store changed since the last load
+
+        Returns:
+            True if the keys were reloaded
+        """
+        if self._current_version() == self._version:
+            return False
+        self.load()
+        return True
+
+    def add(self, key: ApiKey) -> None:
+        """
+        Store a new key
+
+        Args:
+            key: Key to add
+        """
+        if self.is_sqlite:
+            with self._db_lock:
+                db = self._connect()
+                row = asdict(key)
+                db.execute(
+                    f"INSERT INTO api_keys ({_COLUMNS}) VALUES "
+                    "(:key_id, :name, :salt, :hash, :rate, :burst, :disabled, :created_at)",
+                    row,
+                )
+                db.commit()
+        else:
+            keys = self._read_json()
+            keys.append(key)
+            self._write_json(keys)
+        self.keys[key.key_id] = key
+
+    def set_disabled(self, key_id: str, disabled: bool = True) -> bool:
+        """
+        Disable (revoke) or re-enable a key
+
+        Args:
+            key_id: Key identifier
+            disabled: New state
+
+        Returns:
+            True if the key exists
+        """
+        if self.is_sqlite:
+            with self._db_lock:
+                db = self._connect()
+                cursor = db.execute(
+                    "UPDATE api_keys SET disabled = ? WHERE key_id = ?", (int(disabled), key_id)
+                )
+                db.commit()
+                found = cursor.rowcount > 0
+        else:
+            keys = self._read_json()
+            found = False
+            for key in keys:
+                if key.key_id == key_id:
+                    key.disabled = disabled
+                    found = True
+            if found:
+                self._write_json(keys)
+        if found:
+            self.load()
+        return found
+
+    def _current_version(self):
+        """Cheap change marker: data_version for SQLite, stat for JSON"""
+        if self.is_sqlite:
+            with self._db_lock:
+                db = self._connect()
+                return db.execute("PRAGMA data_version").fetchone()[0]
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _connect(self) -> sqlite3.Connection:
+        # data_version only reports commits made by other connections, so
+        # one long-lived connection is kept; callers hold _db_lock
+        if self._db is None:
+            db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS api_keys ("
+                "key_id TEXT PRIMARY KEY, "
+                "name TEXT NOT NULL, "
+                "salt TEXT NOT NULL, "
+                "hash TEXT NOT NULL, "
+                "rate REAL, "
+                "burst INTEGER, "
+                "disabled INTEGER NOT NULL DEFAULT 0, "
+                "created_at REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        return self._db
+
+    def _read_sqlite(self) -> list:
+        with self._db_lock:
+            rows = self._connect().execute(f"SELECT {_COLUMNS} FROM api_keys").fetchall()
+        return [ApiKey(*row[:6], bool(row[6]), row[7]) for row in rows]
+
+    def _read_json(self) -> list:
+        try:
+            document = json.loads(self.path.read_text())
+        except FileNotFoundError:
+            return []
+        return [ApiKey(**entry) for entry in document.get("keys", [])]
+
+    def _write_json(self, keys: list) -> None:
+        temp_path = self.path.with_name(f".{self.path.name}.tmp")
+        temp_path.write_text(
+            json.dumps({"keys": [asdict(key) for key in keys]}, indent=2)
+        )
+        os.replace(temp_path, self.path)
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                # Keep serving the last good key set
+                logger.error("Reloading API keys failed: %s", e)
+
+
+api_key_store = ApiKeyStore(
+    settings.API_KEYS_FILE, settings.API_KEY_CACHE_SIZE, settings.API_KEYS_RELOAD_INTERVAL
+)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Manage API keys in API_KEYS_FILE")
+    parser.add_argument(
+        "--file", type=Path, default=settings.API_KEYS_FILE, help="Key store (default API_KEYS_FILE)"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    create = commands.add_parser("create", help="Create a key and print it once")
+    create.add_argument("--name", required=True)
+    create.add_argument("--rate", type=float, help="Requests per second (0 for unlimited)")
+    create.add_argument("--burst", type=int)
+
+    commands.add_parser("list", help="List keys (without secrets)")
+
+    revoke = commands.add_parser("revoke", help="Disable a key")
+    revoke.add_argument("key_id")
+
+    args = parser.parse_args()
+
+    if args.file is None:
+        print("Set API_KEYS_FILE or pass --file", file=sys.stderr)
+        return 1
+    store = ApiKeyStore(args.file, cache_size=0, reload_interval=0)
+
+    if args.command == "create":
+        full_key, key = generate_api_key(args.name, args.rate, args.burst)
+        store.add(key)
+        print(full_key)
+    elif args.command == "list":
+        store.load()
+        for key in sorted(store.keys.values(), key=lambda key: key.created_at):
+            status = "disabled" if key.disabled else "active"
+            print(f"{key.key_id}  {status:8s}  rate={key.rate}  burst={key.burst}  {key.name}")
+    elif args.command == "revoke":
+        if not store.set_disabled(args.key_id):
+            print(f"Unknown key: {args.key_id}", file=sys.stderr)
+            return 1
+
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
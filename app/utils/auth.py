@@ -4,27 +4,39 @@ Authentication Utilities
 
 from fastapi import HTTPException, Security
 from fastapi.security import APIKeyHeader
+import hmac
 import logging
 
 from app.config import settings
+from app.utils.api_keys import api_key_store
+from app.utils.rate_limit import TokenBucketLimiter, retry_after_header
 
 logger = logging.getLogger(__name__)
 
 api_key_header = APIKeyHeader(name="X-API-Key", auto_error=False)
 
+# Identity of requests made with the shared settings.API_KEY
+LEGACY_KEY_ID = "legacy"
+
+rate_limiter = TokenBucketLimiter()
+
 
 async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
     """
     Verify API key from request header
 
+    Accepts the shared settings.API_KEY and any active key from the key
+    store, then charges the key's token bucket.
+
     Args:
         api_key: API key from request header
 
     Returns:
-        The validated API key
+        ID of the validated key ("legacy" for the shared key)
 
     Raises:
-        HTTPException: If API key is missing or invalid
+        HTTPException: 401 if the key is missing, 403 if it is invalid,
+            429 (with Retry-After) if the key is over its rate limit
     """
     if not api_key:
         logger.warning("API key missing from request")
@@ -32,9 +44,27 @@ async def verify_api_key(api_key: str = Security(api_key_header)) -> str:
             status_code=401, detail="API key is required. Include 'X-API-Key' header."
         )
 
-    if api_key != settings.API_KEY:
-        logger.warning(f"Invalid API key attempted: {api_key[:8]}...")
-        raise HTTPException(status_code=403, detail="Invalid API key")
+    rate = settings.API_KEY_RATE_LIMIT
+    burst = settings.API_KEY_RATE_BURST
+    if settings.API_KEY and hmac.compare_digest(api_key.encode(), settings.API_KEY.encode()):
+        key_id = LEGACY_KEY_ID
+    else:
+        key = api_key_store.verify(api_key)
+        if key is None:
+            # Log the key ID part only, never the secret
+            logger.warning("Invalid API key attempted: %s...", api_key.partition(".")[0][:8])
+            raise HTTPException(status_code=403, detail="Invalid API key")
+        key_id = key.key_id
+        if key.rate is not None:
+            rate = key.rate
+        if key.burst is not None:
+            burst = key.burst
+
+    delay = rate_limiter.acquire(key_id, rate, burst)
+    if delay is not None:
+        logger.warning("Rate limit exceeded for API key %s", key_id)
+        raise HTTPException(
+            status_code=429, detail="Rate limit exceeded", headers=retry_after_header(delay)
+        )
 
-    logger.info("API key validated successfully")
-    return api_key
+    return key_id
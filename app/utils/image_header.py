@@ -0,0 +1,110 @@
+"""
+Image Header Utilities
+Identifies JPEG/PNG data and reads its dimensions without decoding pixels
+"""
+
+from dataclasses import dataclass
+from typing import Optional
+
+JPEG_MAGIC = b"\xff\xd8\xff"
+PNG_MAGIC = b"\x89PNG\r\n\x1a\n"
+
+# Start-of-frame markers carrying the image dimensions (C4, C8 and CC are
+# DHT, JPG and DAC, which share the range)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = frozenset({0x01, *range(0xD0, 0xD9)})
+
+# Extensions each detected format may be stored under
+FORMAT_EXTENSIONS = {
+    "jpeg": (".jpg", ".jpeg"),
+    "png": (".png",),
+}
+
+
+class InvalidImageHeader(ValueError):
+    """Raised when data is not a well-formed JPEG or PNG header"""
+
+
+@dataclass
+class ImageHeader:
+    """Format and dimensions read from an image header"""
+
+    format: str
+    width: int
+    height: int
+
+
+def parse_image_header(data: bytes) -> Optional[ImageHeader]:
+    """
+    Parse the format and dimensions from the start of an image
+
+    Only the JPEG marker segments up to the first SOF, or the PNG IHDR
+    chunk, are read; no pixel data is decoded.
+
+    Args:
+        data: Leading bytes of the file
+
+    Returns:
+        ImageHeader, or None if more data is needed to find the dimensions
+
+    Raises:
+        InvalidImageHeader: If the data is not a JPEG or PNG, or the
+            header is malformed
+    """
+    if data.startswith(PNG_MAGIC):
+        return _parse_png(data)
+    if data.startswith(JPEG_MAGIC):
+        return _parse_jpeg(data)
+    if PNG_MAGIC.startswith(data) or JPEG_MAGIC.startswith(data):
+        # Too short to tell yet
+        return None
+    raise InvalidImageHeader("File content is not a JPEG or PNG image")
+
+
+def _parse_png(data: bytes) -> Optional[ImageHeader]:
+    # Signature, then the IHDR chunk: length, type, width, height
+    if len(data) < 24:
+        return None
+    if data[12:16] != b"IHDR":
+        raise InvalidImageHeader("PNG is missing its IHDR chunk")
+    width = int.from_bytes(data[16:20], "big")
+    height = int.from_bytes(data[20:24], "big")
+    return ImageHeader("png", width, height)
+
+
+def _parse_jpeg(data: bytes) -> Optional[ImageHeader]:
+    position = 2
+    while True:
+        if position + 2 > len(data):
+            return None
+        if data[position] != 0xFF:
+            raise InvalidImageHeader("Malformed JPEG marker")
+
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            position += 1
+            continue
+        if marker in JPEG_STANDALONE_MARKERS:
+            position += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            raise InvalidImageHeader("JPEG has no frame header before its image data")
+
+        if position + 4 > len(data):
+            return None
+        length = int.from_bytes(data[position + 2:position + 4], "big")
+        if length < 2:
+            raise InvalidImageHeader("Malformed JPEG segment length")
+
+        if marker in JPEG_SOF_MARKERS:
+            # Length, precision, height, width
+            if position + 9 > len(data):
+                return None
+            height = int.from_bytes(data[position + 5:position + 7], "big")
+            width = int.from_bytes(data[position + 7:position + 9], "big")
+            return ImageHeader("jpeg", width, height)
+
+        position += 2 + length
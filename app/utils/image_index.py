@@ -0,0 +1,317 @@
+"""
+Image Index Utilities
+In-memory index of stored images keyed by image ID
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPES = {
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".png": "image/png",
+}
+
+# Derivative renditions are stored as {image_id}.{name}.jpg
+DERIVATIVE_EXTENSION = ".jpg"
+
+SNAPSHOT_VERSION = 3
+
+# Older snapshot versions whose rows are a prefix of the current layout
+COMPATIBLE_SNAPSHOT_VERSIONS = (2, SNAPSHOT_VERSION)
+
+
+@dataclass
+class ImageRecord:
+    """Metadata for a stored image"""
+
+    image_id: str
+    path: Path
+    size: int
+    content_type: str
+    created_at: float
+    digest: Optional[str] = None
+    # Dimensions parsed from the upload header (unknown for files found on disk)
+    width: Optional[int] = None
+    height: Optional[int] = None
+
+
+def record_from_entry(
+    entry: os.DirEntry, blob_digests: Optional[Dict[int, str]] = None
+) -> Optional[ImageRecord]:
+    """
+    Build an image record from a directory entry
+
+    Args:
+        entry: Entry returned by os.scandir
+        blob_digests: Map of blob inode to digest, used to recover the
+            digest of hard-linked content-addressed images
+
+    Returns:
+        ImageRecord, or None if the entry is not a stored image
+    """
+    if entry.name.startswith("."):
+        return None
+
+    image_id, extension = os.path.splitext(entry.name)
+    extension = extension.lower()
+    if extension not in settings.ALLOWED_EXTENSIONS or not entry.is_file():
+        return None
+
+    # Derivatives ({image_id}.{name}.jpg) are not images of their own
+    if "." in image_id:
+        return None
+
+    stat = entry.stat()
+    return ImageRecord(
+        image_id=image_id,
+        path=Path(entry.path),
+        size=stat.st_size,
+        content_type=CONTENT_TYPES.get(extension, "application/octet-stream"),
+        created_at=stat.st_mtime,
+        digest=blob_digests.get(stat.st_ino) if blob_digests else None,
+    )
+
+
+def iter_file_entries(
+    directory: Path, max_depth: int, skip: Optional[Path] = None
+) -> Iterator[os.DirEntry]:
+    """
+    Yield the file entries of a directory and its shard subdirectories
+
+    Hidden entries (temp files, sessions) are ignored.
+
+    Args:
+        directory: Directory to scan
+        max_depth: How many levels of subdirectories to descend into
+        skip: Subdirectory to leave out (e.g. the blob directory)
+
+    Yields:
+        os.DirEntry for each non-directory entry
+    """
+    subdirectories = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                if max_depth > 0 and Path(entry.path) != skip:
+                    subdirectories.append(Path(entry.path))
+            else:
+                yield entry
+
+    for subdirectory in subdirectories:
+        yield from iter_file_entries(subdirectory, max_depth - 1, skip)
+
+
+def scan_blob_digests(blob_dir: Path) -> Dict[int, str]:
+    """
+    Map blob inodes to their digests
+
+    Args:
+        blob_dir: Content-addressed blob directory
+
+    Returns:
+        Dictionary of inode number to SHA-256 hex digest
+    """
+    if not blob_dir.is_dir():
+        return {}
+
+    return {
+        entry.inode(): os.path.splitext(entry.name)[0]
+        for entry in iter_file_entries(blob_dir, settings.STORAGE_SHARD_DEPTH)
+    }
+
+
+def record_from_path(image_id: str, path: Path) -> ImageRecord:
+    """
+    Build an image record for a file that was just written
+
+    Args:
+        image_id: Image identifier
+        path: Path of the stored file
+
+    Returns:
+        ImageRecord for the file
+    """
+    stat = path.stat()
+    return ImageRecord(
+        image_id=image_id,
+        path=path,
+        size=stat.st_size,
+        content_type=CONTENT_TYPES.get(path.suffix.lower(), "application/octet-stream"),
+        created_at=stat.st_mtime,
+    )
+
+
+class ImageIndex:
+    """Maps image IDs to their stored file metadata"""
+
+    def __init__(self):
+        self._records: Dict[str, ImageRecord] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, image_id: str) -> Optional[ImageRecord]:
+        """
+        Look up an image by ID (no disk I/O)
+
+        Args:
+            image_id: Image identifier
+
+        Returns:
+            ImageRecord, or None if the ID is not indexed
+        """
+        return self._records.get(image_id)
+
+    def records(self) -> List[ImageRecord]:
+        """
+        Snapshot of every indexed record
+
+        Returns:
+            List of records in no particular order
+        """
+        with self._lock:
+            return list(self._records.values())
+
+    def add(self, record: ImageRecord) -> None:
+        """
+        Add or replace an image record
+
+        Args:
+            record: Record to index
+        """
+        with self._lock:
+            self._records[record.image_id] = record
+
+    def discard(self, image_id: str) -> None:
+        """
+        Remove an image from the index if present
+
+        Args:
+            image_id: Image identifier
+        """
+        with self._lock:
+            self._records.pop(image_id, None)
+
+    def build(self, directory: Path) -> int:
+        """
+        Rebuild the index by scanning a directory
+
+        Both the sharded layout and legacy flat files are picked up.
+
+        Args:
+            directory: Directory containing stored images
+
+        Returns:
+            Number of indexed images
+        """
+        records: Dict[str, ImageRecord] = {}
+        blob_digests = scan_blob_digests(settings.BLOB_DIR)
+        for entry in iter_file_entries(
+            directory, settings.STORAGE_SHARD_DEPTH, skip=settings.BLOB_DIR
+        ):
+            record = record_from_entry(entry, blob_digests)
+            if record is not None:
+                records[record.image_id] = record
+
+        with self._lock:
+            self._records = records
+        return len(records)
+
+    def load_snapshot(self, snapshot_path: Path) -> bool:
+        """
+        Load the index from a snapshot file
+
+        Args:
+            snapshot_path: Path of the snapshot
+
+        Returns:
+            True if the snapshot was loaded, False if missing or unusable
+        """
+        try:
+            with open(snapshot_path, "r") as snapshot_file:
+                data = json.load(snapshot_file)
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable image index snapshot: %s", e)
+            return False
+
+        if data.get("version") not in COMPATIBLE_SNAPSHOT_VERSIONS:
+            logger.warning("Ignoring image index snapshot with unknown version")
+            return False
+
+        records = {
+            row[0]: ImageRecord(row[0], Path(row[1]), *row[2:])
+            for row in data["records"]
+        }
+        with self._lock:
+            self._records = records
+        return True
+
+    def save_snapshot(self, snapshot_path: Path) -> None:
+        """
+        Persist the index to a snapshot file (atomically replaced)
+
+        Args:
+            snapshot_path: Path of the snapshot
+        """
+        with self._lock:
+            rows = [
+                [
+                    r.image_id, str(r.path), r.size, r.content_type, r.created_at, r.digest,
+                    r.width, r.height,
+                ]
+                for r in self._records.values()
+            ]
+
+        temp_path = snapshot_path.with_name(f".{snapshot_path.name}.part")
+        with open(temp_path, "w") as snapshot_file:
+            json.dump({"version": SNAPSHOT_VERSION, "records": rows}, snapshot_file)
+        os.replace(temp_path, snapshot_path)
+
+    async def load(self) -> None:
+        """
+        Populate the index at startup
+
+        Uses the snapshot when IMAGE_INDEX_SNAPSHOT is configured and present,
+        otherwise scans UPLOAD_DIR. A loaded snapshot is deleted: it stops
+        describing UPLOAD_DIR with the first upload, and only a clean
+        shutdown writes it again. After a crash the next start therefore
+        rescans instead of loading an index missing the latest uploads.
+        """
+        start_time = time.perf_counter()
+        snapshot_path = settings.IMAGE_INDEX_SNAPSHOT
+
+        if snapshot_path and await asyncio.to_thread(self.load_snapshot, snapshot_path):
+            await asyncio.to_thread(snapshot_path.unlink, missing_ok=True)
+            source = f"snapshot {snapshot_path}"
+        else:
+            await asyncio.to_thread(self.build, settings.UPLOAD_DIR)
+            source = f"scan of {settings.UPLOAD_DIR}"
+
+        elapsed = time.perf_counter() - start_time
+        logger.info("Image index loaded %s images from %s in %.2fs", len(self), source, elapsed)
+
+    async def persist(self) -> None:
+        """Write the snapshot at shutdown when IMAGE_INDEX_SNAPSHOT is configured"""
+        if settings.IMAGE_INDEX_SNAPSHOT:
+            await asyncio.to_thread(self.save_snapshot, settings.IMAGE_INDEX_SNAPSHOT)
+            logger.info("Image index snapshot written: %s", settings.IMAGE_INDEX_SNAPSHOT)
+
+
+image_index = ImageIndex()
@@ -0,0 +1,255 @@
+"""
+Job Queue Utilities
+Persistent SQLite-backed queue for asynchronous analysis jobs
+"""
+
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Optional, Tuple
+import logging
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+FINISHED_STATUSES = (JOB_SUCCEEDED, JOB_FAILED)
+
+_COLUMNS = (
+    "job_id, image_id, engine, status, result, error, attempts, created_at, updated_at"
+)
+
+
+def _row_to_job(row: tuple) -> dict:
+    job_id, image_id, engine, status, result, error, attempts, created_at, updated_at = row
+    return {
+        "job_id": job_id,
+        "image_id": image_id,
+        "engine": engine,
+        "status": status,
+        "result": json.loads(result) if result else None,
+        "error": json.loads(error) if error else None,
+        "attempts": attempts,
+        "created_at": created_at,
+        "updated_at": updated_at,
+    }
+
+
+class JobQueue:
+    """
+    Analysis jobs stored in SQLite
+
+    There is at most one job per (image_id, engine), so repeated
+    submissions for the same image share one computation. Jobs are
+    claimed with a single UPDATE, which keeps claiming atomic when several
+    server processes share the database. A job whose worker died stays
+    "running" until its lease expires, after which it is claimed again.
+
+    All methods block on SQLite and are meant to be called via
+    asyncio.to_thread.
+    """
+
+    def __init__(self, db_path: Path, lease_timeout: float, max_attempts: int):
+        self.db_path = db_path
+        self.lease_timeout = lease_timeout
+        self.max_attempts = max_attempts
+
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+
+    def open(self) -> None:
+        """Open the database and create the schema if needed"""
+        if self._db is not None:
+            return
+
+        db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "job_id TEXT PRIMARY KEY, "
+            "image_id TEXT NOT NULL, "
+            "engine TEXT NOT NULL, "
+            "status TEXT NOT NULL, "
+            "result TEXT, "
+            "error TEXT, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "created_at REAL NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        db.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS jobs_image_engine ON jobs (image_id, engine)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        db.commit()
+
+        self._db = db
+        logger.info("Job queue persisted at: %s", self.db_path)
+
+    def close(self) -> None:
+        """Close the database"""
+        if self._db is not None:
+            with self._db_lock:
+                self._db.close()
+            self._db = None
+
+    def submit(self, image_id: str, engine: str) -> Tuple[dict, bool]:
+        """
+        Queue an analysis job, reusing an existing job for the same image
+
+        A failed job is re-queued under its existing ID; queued, running
+        and succeeded jobs are returned unchanged.
+
+        Args:
+            image_id: Image identifier
+            engine: Identity of the analysis engine
+
+        Returns:
+            Tuple of (job, created) where created is False if an existing
+            job was returned
+        """
+        now = time.time()
+        with self._db_lock:
+            cursor = self._db.execute(
+                "INSERT OR IGNORE INTO jobs (job_id, image_id, engine, status, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(uuid.uuid4()), image_id, engine, JOB_QUEUED, now, now),
+            )
+            created = cursor.rowcount == 1
+            if not created:
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, error = NULL, attempts = 0, updated_at = ? "
+                    "WHERE image_id = ? AND engine = ? AND status = ?",
+                    (JOB_QUEUED, now, image_id, engine, JOB_FAILED),
+                )
+            self._db.commit()
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE image_id = ? AND engine = ?",
+                (image_id, engine),
+            ).fetchone()
+        return _row_to_job(row), created
+
+    def get(self, job_id: str) -> Optional[dict]:
+        """
+        Look up a job
+
+        Args:
+            job_id: Job identifier
+
+        Returns:
+            Job dictionary, or None if unknown
+        """
+        with self._db_lock:
+            row = self._db.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE job_id = ?", (job_id,)
+            ).fetchone()
+        return _row_to_job(row) if row else None
+
+    def claim(self) -> Optional[dict]:
+        """
+        Take the oldest runnable job and mark it running
+
+        Runnable jobs are queued jobs and running jobs whose lease has
+        expired. Jobs that have used up max_attempts are failed instead.
+
+        Returns:
+            The claimed job, or None if nothing is runnable
+        """
+        now = time.time()
+        expired = now - self.lease_timeout
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                "WHERE status = ? AND updated_at < ? AND attempts >= ?",
+                (
+                    JOB_FAILED,
+                    json.dumps({"status_code": 500, "detail": "Analysis worker did not finish"}),
+                    now,
+                    JOB_RUNNING,
+                    expired,
+                    self.max_attempts,
+                ),
+            )
+            row = self._db.execute(
+                f"UPDATE jobs SET status = ?, attempts = attempts + 1, updated_at = ? "
+                f"WHERE job_id = ("
+                f"SELECT job_id FROM jobs WHERE status = ? "
+                f"OR (status = ? AND updated_at < ?) ORDER BY created_at LIMIT 1"
+                f") RETURNING {_COLUMNS}",
+                (JOB_RUNNING, now, JOB_QUEUED, JOB_RUNNING, expired),
+            ).fetchone()
+            self._db.commit()
+        return _row_to_job(row) if row else None
+
+    def complete(self, job_id: str, result: dict) -> None:
+        """
+        Mark a job as succeeded
+
+        Args:
+            job_id: Job identifier
+            result: Analysis result
+        """
+        self._finish(job_id, JOB_SUCCEEDED, "result", result)
+
+    def fail(self, job_id: str, error: dict) -> None:
+        """
+        Mark a job as failed
+
+        Args:
+            job_id: Job identifier
+            error: Dictionary with status_code and detail
+        """
+        self._finish(job_id, JOB_FAILED, "error", error)
+
+    def release(self, job_id: str) -> None:
+        """
+        Return a running job to the queue without counting the attempt
+
+        Args:
+            job_id: Job identifier
+        """
+        with self._db_lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, attempts = MAX(attempts - 1, 0), updated_at = ? "
+                "WHERE job_id = ? AND status = ?",
+                (JOB_QUEUED, time.time(), job_id, JOB_RUNNING),
+            )
+            self._db.commit()
+
+    def counts(self) -> dict:
+        """
+        Count jobs by status
+
+        Returns:
+            Dictionary mapping status to number of jobs
+        """
+        with self._db_lock:
+            rows = self._db.execute(
+                "SELECT status, COUNT(*) FROM jobs GROUP BY status"
+            ).fetchall()
+        counts = {status: 0 for status in (JOB_QUEUED, JOB_RUNNING, *FINISHED_STATUSES)}
+        counts.update(dict(rows))
+        return counts
+
+    def _finish(self, job_id: str, status: str, column: str, value: dict) -> None:
+        with self._db_lock:
+            self._db.execute(
+                f"UPDATE jobs SET status = ?, {column} = ?, updated_at = ? WHERE job_id = ?",
+                (status, json.dumps(value), time.time(), job_id),
+            )
+            self._db.commit()
+
+
+job_queue = JobQueue(
+    db_path=settings.JOB_QUEUE_DB,
+    lease_timeout=settings.JOB_LEASE_TIMEOUT,
+    max_attempts=settings.JOB_MAX_ATTEMPTS,
+)
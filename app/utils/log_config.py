@@ -0,0 +1,130 @@
+"""
+Logging Configuration
+Queue-based logging with optional JSON output, request IDs and sampling
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import zlib
+from contextvars import ContextVar
+from typing import Optional
+
+from app.config import settings
+
+# Correlation ID of the request being served ("-" outside requests)
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Attaches the current request ID to every record"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the INFO/DEBUG records emitted while serving requests
+
+    Sampling is decided per request ID, so a sampled request keeps all of
+    its lines. Warnings and errors, and records logged outside requests
+    (startup, shutdown, background work), are always kept.
+    """
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.threshold = int(max(0.0, min(rate, 1.0)) * 0xFFFFFFFF)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        request_id = getattr(record, "request_id", "-")
+        if request_id == "-":
+            return True
+        return zlib.crc32(request_id.encode()) <= self.threshold
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as compact single-line JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, separators=(",", ":"), default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Enqueues records without formatting them
+
+    The stock QueueHandler merges the message and arguments on the calling
+    thread so records can be pickled; the listener here is in-process, so
+    message formatting is left to the listener thread as well.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def configure_logging() -> None:
+    """
+    Configure the root logger from LOG_* settings
+
+    With LOG_QUEUE enabled, callers only put records on an in-memory
+    queue; a background thread formats them and writes to stderr.
+    """
+    global _listener
+
+    if settings.LOG_FORMAT == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.setLevel(settings.LOG_LEVEL)
+
+    if settings.LOG_QUEUE:
+        handler: logging.Handler = _DeferredQueueHandler(queue.SimpleQueue())
+        _listener = logging.handlers.QueueListener(
+            handler.queue, stream_handler, respect_handler_level=True
+        )
+        _listener.start()
+        atexit.register(stop_logging)
+    else:
+        handler = stream_handler
+
+    # Handler filters run on the calling thread, where the request context lives
+    handler.addFilter(RequestIdFilter())
+    if settings.LOG_SAMPLE_RATE < 1.0:
+        handler.addFilter(SamplingFilter(settings.LOG_SAMPLE_RATE))
+    root.addHandler(handler)
+
+
+def stop_logging() -> None:
+    """Flush queued records and stop the background logging thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
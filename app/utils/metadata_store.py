@@ -0,0 +1,346 @@
+"""
+Metadata Store Utilities
+SQLite table of uploaded images and their latest analysis results
+"""
+
+import base64
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+import logging
+
+from app.utils.image_index import ImageRecord
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+    "image_id, filename, size, content_type, format, width, height, digest, "
+    "created_at, engine, analysis, analyzed_at"
+)
+
+# Image columns are rewritten on conflict; the analysis columns are kept
+_UPSERT_IMAGE = (
+    "INSERT INTO images "
+    "(image_id, filename, size, content_type, format, width, height, digest, created_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (image_id) DO UPDATE SET "
+    "filename = COALESCE(excluded.filename, filename), size = excluded.size, "
+    "content_type = excluded.content_type, format = COALESCE(excluded.format, format), "
+    "width = COALESCE(excluded.width, width), height = COALESCE(excluded.height, height), "
+    "digest = COALESCE(excluded.digest, digest), created_at = excluded.created_at"
+)
+
+# Images analyzed before they were recorded get a row from the index record
+_UPSERT_ANALYSIS = (
+    "INSERT INTO images "
+    "(image_id, size, content_type, width, height, digest, created_at, "
+    "engine, analysis, analyzed_at) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (image_id) DO UPDATE SET "
+    "engine = excluded.engine, analysis = excluded.analysis, "
+    "analyzed_at = excluded.analyzed_at"
+)
+
+FORMATS = {
+    "image/jpeg": "jpeg",
+    "image/png": "png",
+}
+
+
+def image_row(record: ImageRecord, filename: Optional[str], format: Optional[str]) -> tuple:
+    """
+    Build the parameters of an image upsert
+
+    Args:
+        record: Record of the stored image
+        filename: Original filename, if known
+        format: Image format from the validated header, if known
+
+    Returns:
+        Parameter tuple for the images table
+    """
+    return (
+        record.image_id,
+        filename,
+        record.size,
+        record.content_type,
+        format or FORMATS.get(record.content_type),
+        record.width,
+        record.height,
+        record.digest,
+        record.created_at,
+    )
+
+
+def analysis_row(record: ImageRecord, engine: str, result: dict, analyzed_at: float) -> tuple:
+    """
+    Build the parameters of an analysis upsert
+
+    Args:
+        record: Record of the analyzed image
+        engine: Identity of the analysis engine
+        result: Analysis result
+        analyzed_at: Time of the analysis
+
+    Returns:
+        Parameter tuple for the images table
+    """
+    return (
+        record.image_id,
+        record.size,
+        record.content_type,
+        record.width,
+        record.height,
+        record.digest,
+        record.created_at,
+        engine,
+        json.dumps(result),
+        analyzed_at,
+    )
+
+
+def encode_cursor(created_at: float, image_id: str) -> str:
+    """
+    Encode the position after a listed image as an opaque cursor
+
+    Args:
+        created_at: Creation time of the last image of a page
+        image_id: ID of the last image of a page
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps([created_at, image_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[float, str]:
+    """
+    Decode a cursor from encode_cursor
+
+    Args:
+        cursor: Cursor string
+
+    Returns:
+        Tuple of (created_at, image_id)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, image_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(created_at, (int, float)) or not isinstance(image_id, str):
+        raise ValueError("Invalid cursor")
+    return float(created_at), image_id
+
+
+def _row_to_image(row: tuple) -> dict:
+    (
+        image_id, filename, size, content_type, format, width, height, digest,
+        created_at, engine, analysis, analyzed_at,
+    ) = row
+    return {
+        "image_id": image_id,
+        "filename": filename,
+        "size": size,
+        "content_type": content_type,
+        "format": format,
+        "width": width,
+        "height": height,
+        "digest": digest,
+        "created_at": created_at,
+        "analysis": {
+            "engine": engine,
+            "result": json.loads(analysis),
+            "analyzed_at": analyzed_at,
+        } if analysis else None,
+    }
+
+
+class MetadataStore:
+    """
+    Image and analysis metadata stored in SQLite
+
+    One row per image holds what is known about the upload plus the
+    result of its most recent analysis. The database runs in WAL mode
+    with synchronous=NORMAL, so commits append to the log without an
+    fsync (a crash can lose the last few commits, never corrupt the
+    table). Writes and reads use separate connections, so listing does
+    not wait for a batch being written.
+
+    All methods block on SQLite and are meant to be called via
+    asyncio.to_thread.
+    """
+
+    def __init__(self, db_path: Path):
+        self.db_path = db_path
+
+        self._writer: Optional[sqlite3.Connection] = None
+        self._reader: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+
+    def open(self) -> None:
+        """Open the database and create the schema if needed"""
+        if self._writer is not None:
+            return
+
+        db = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS images ("
+            "image_id TEXT PRIMARY KEY, "
+            "filename TEXT, "
+            "size INTEGER NOT NULL, "
+            "content_type TEXT NOT NULL, "
+            "format TEXT, "
+            "width INTEGER, "
+            "height INTEGER, "
+            "digest TEXT, "
+            "created_at REAL NOT NULL, "
+            "engine TEXT, "
+            "analysis TEXT, "
+            "analyzed_at REAL)"
+        )
+        # Listing is newest first with (created_at, image_id) as the cursor
+        db.execute("CREATE INDEX IF NOT EXISTS images_created ON images (created_at, image_id)")
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS images_format ON images (format, created_at, image_id)"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS images_digest ON images (digest, created_at, image_id)"
+        )
+        db.execute(
+            "CREATE INDEX IF NOT EXISTS images_analyzed ON images (created_at, image_id) "
+            "WHERE analyzed_at IS NOT NULL"
+        )
+        db.commit()
+        self._writer = db
+
+        self._reader = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+        logger.info("Metadata store persisted at: %s", self.db_path)
+
+    def close(self) -> None:
+        """Close the database"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._read_lock:
+            if self._reader is not None:
+                self._reader.close()
+                self._reader = None
+
+    def write(self, images: Iterable[tuple], analyses: Iterable[tuple]) -> None:
+        """
+        Upsert a batch of rows in one transaction
+
+        Args:
+            images: Parameter tuples from image_row
+            analyses: Parameter tuples from analysis_row
+        """
+        with self._write_lock:
+            with self._writer:
+                self._writer.executemany(_UPSERT_IMAGE, images)
+                self._writer.executemany(_UPSERT_ANALYSIS, analyses)
+
+    def is_empty(self) -> bool:
+        """True if no image has been recorded"""
+        with self._read_lock:
+            return self._reader.execute("SELECT 1 FROM images LIMIT 1").fetchone() is None
+
+    def count(self) -> int:
+        """Number of recorded images"""
+        with self._read_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM images").fetchone()[0]
+
+    def get(self, image_id: str) -> Optional[dict]:
+        """
+        Look up an image
+
+        Args:
+            image_id: Image identifier
+
+        Returns:
+            Image dictionary, or None if unknown
+        """
+        with self._read_lock:
+            row = self._reader.execute(
+                f"SELECT {_COLUMNS} FROM images WHERE image_id = ?", (image_id,)
+            ).fetchone()
+        return _row_to_image(row) if row else None
+
+    def query(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        format: Optional[str] = None,
+        digest: Optional[str] = None,
+        analyzed: Optional[bool] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """
+        List images newest first, one page at a time
+
+        Pages are addressed by keyset (the created_at and image_id of the
+        last row), so each page is an index range scan however deep the
+        client has paged, and images added meanwhile do not shift pages.
+
+        Args:
+            limit: Maximum number of images to return
+            cursor: next_cursor of the previous page, or None for the first page
+            since: Only images created at or after this Unix time
+            until: Only images created before this Unix time
+            format: Only images of this format ("jpeg" or "png")
+            digest: Only images with this SHA-256 content digest
+            analyzed: Only images with (True) or without (False) an analysis
+
+        Returns:
+            Tuple of (images, cursor of the next page or None on the last page)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        conditions = []
+        params: list = []
+        if cursor is not None:
+            conditions.append("(created_at, image_id) < (?, ?)")
+            params.extend(decode_cursor(cursor))
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("created_at < ?")
+            params.append(until)
+        if format is not None:
+            conditions.append("format = ?")
+            params.append(format)
+        if digest is not None:
+            conditions.append("digest = ?")
+            params.append(digest)
+        if analyzed is not None:
+            conditions.append(
+                "analyzed_at IS NOT NULL" if analyzed else "analyzed_at IS NULL"
+            )
+
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+        with self._read_lock:
+            rows = self._reader.execute(
+                f"SELECT {_COLUMNS} FROM images {where}"
+                "ORDER BY created_at DESC, image_id DESC LIMIT ?",
+                (*params, limit + 1),
+            ).fetchall()
+
+        images = [_row_to_image(row) for row in rows[:limit]]
+        next_cursor = None
+        if len(rows) > limit:
+            last = images[-1]
+            next_cursor = encode_cursor(last["created_at"], last["image_id"])
+        return images, next_cursor
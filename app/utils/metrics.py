@@ -0,0 +1,193 @@
+"""
+Metrics Utilities
+Prometheus instruments for requests, pipeline stages and internal stats
+"""
+
+import os
+from functools import lru_cache
+from typing import Callable, Iterable, Tuple
+import logging
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+# Latency buckets from sub-millisecond stages up to slow analyses
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP requests by route template and status code",
+    ["method", "route", "status"],
+)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum",
+)
+UPLOAD_BYTES = Counter(
+    "upload_bytes_total",
+    "Bytes received in image uploads",
+)
+UPLOAD_BYTES_IN_FLIGHT = Gauge(
+    "upload_bytes_in_flight",
+    "Bytes of uploads currently being written",
+    multiprocess_mode="livesum",
+)
+STAGE_LATENCY = Histogram(
+    "stage_duration_seconds",
+    "Latency of individual upload and analysis stages",
+    ["operation", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Label used for requests that matched no route, to bound cardinality
+UNMATCHED_ROUTE = "unmatched"
+
+_stats_collectors: list = []
+
+
+@lru_cache(maxsize=None)
+def stage_timer(operation: str, stage: str):
+    """
+    Get the histogram child timing one stage of an operation
+
+    Children are cached so timing a stage costs no label lookup:
+    ``with stage_timer("upload", "write").time(): ...``
+
+    Args:
+        operation: Operation name, e.g. "upload" or "analyze"
+        stage: Stage name within the operation
+
+    Returns:
+        Histogram child whose time() method is a context manager
+    """
+    return STAGE_LATENCY.labels(operation=operation, stage=stage)
+
+
+def route_template(scope: dict) -> str:
+    """
+    Get the route template that served a request
+
+    Routes of included routers may only know the path relative to their
+    router prefix; the prefix is recovered from the concrete request path.
+
+    Args:
+        scope: ASGI scope after routing
+
+    Returns:
+        Template such as /api/jobs/{job_id}, or UNMATCHED_ROUTE
+    """
+    route = scope.get("route")
+    if route is None:
+        return UNMATCHED_ROUTE
+
+    path = scope.get("path", "")
+    try:
+        matched = route.path_format.format(**scope.get("path_params", {}))
+    except (AttributeError, KeyError, IndexError):
+        return route.path
+    if path.endswith(matched):
+        return path[: len(path) - len(matched)] + route.path
+    return route.path
+
+
+def observe_request(method: str, route: str, status: int, duration: float) -> None:
+    """
+    Record one finished HTTP request
+
+    Args:
+        method: HTTP method
+        route: Route template (e.g. /api/jobs/{job_id}), not the raw path
+        status: Response status code
+        duration: Seconds spent serving the request
+    """
+    REQUESTS.labels(method, route, str(status)).inc()
+    REQUEST_LATENCY.labels(method, route).observe(duration)
+
+
+class StatsCollector:
+    """
+    Exposes a component's stats() dictionary at scrape time
+
+    Numeric top-level values become metrics named {prefix}_{key};
+    keys listed in counters are exported as counters, the rest as gauges.
+    """
+
+    def __init__(self, prefix: str, stats: Callable[[], dict], counters: Iterable[str] = ()):
+        self.prefix = prefix
+        self.stats = stats
+        self.counters = set(counters)
+
+    def describe(self):
+        # Nothing to declare up front; avoids calling stats() on registration
+        return []
+
+    def collect(self):
+        try:
+            values = self.stats()
+        except Exception as e:
+            logger.warning("Stats collection failed for %s: %s", self.prefix, e)
+            return
+
+        for key, value in values.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{self.prefix}_{key}"
+            if key in self.counters:
+                yield CounterMetricFamily(name, f"{self.prefix} {key}", value=value)
+            else:
+                yield GaugeMetricFamily(name, f"{self.prefix} {key}", value=value)
+
+
+def register_stats(prefix: str, stats: Callable[[], dict], counters: Iterable[str] = ()) -> None:
+    """
+    Export a component's stats() dictionary as metrics
+
+    Args:
+        prefix: Metric name prefix
+        stats: Callable returning the stats dictionary
+        counters: Keys whose values only ever increase
+    """
+    collector = StatsCollector(prefix, stats, counters)
+    REGISTRY.register(collector)
+    _stats_collectors.append(collector)
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """
+    Render every metric in the Prometheus text format
+
+    With PROMETHEUS_MULTIPROC_DIR set (several server processes), the
+    instruments of all processes are aggregated; stats collectors only
+    cover the process serving the scrape.
+
+    Returns:
+        Tuple of (body, content type)
+    """
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _stats_collectors:
+            registry.register(collector)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
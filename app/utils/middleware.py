@@ -0,0 +1,134 @@
+"""
+Request Middleware
+Raw ASGI middleware for request IDs, timing, logging, metrics and admission control
+"""
+
+import json
+import time
+import uuid
+import logging
+
+from app.config import settings
+from app.utils import metrics
+from app.utils.admission import AdmissionRejected, match_admission
+from app.utils.log_config import request_id_var
+from app.utils.rate_limit import retry_after_header
+
+logger = logging.getLogger(__name__)
+
+# Longest client-supplied X-Request-ID that is propagated as-is
+MAX_REQUEST_ID_LENGTH = 128
+
+
+class RequestContextMiddleware:
+    """
+    Times, logs and counts every HTTP request
+
+    Unlike @app.middleware("http") (Starlette's BaseHTTPMiddleware), this
+    wraps the ASGI callables directly: no extra task per request and no
+    re-streaming of request or response bodies, which matters for large
+    multipart uploads. Each request gets an X-Request-ID (taken from the
+    request when present) that is set for logging and echoed back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter()
+
+        request_id = _header(scope, b"x-request-id")[:MAX_REQUEST_ID_LENGTH] or uuid.uuid4().hex
+        request_id_token = request_id_var.set(request_id)
+        request_id_header = (b"x-request-id", request_id.encode("latin-1"))
+
+        logger.info("Request: %s %s", scope["method"], scope["path"])
+
+        status_code = 500
+
+        async def send_with_request_id(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", ()), request_id_header]
+            await send(message)
+
+        metrics.REQUESTS_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            metrics.REQUESTS_IN_FLIGHT.dec()
+            process_time = time.perf_counter() - start_time
+            # Label by route template so IDs in paths don't create new series
+            metrics.observe_request(
+                scope["method"], metrics.route_template(scope), status_code, process_time
+            )
+            logger.info("Response: %s | Time: %.1fms", status_code, process_time * 1000)
+            request_id_var.reset(request_id_token)
+
+
+class AdmissionMiddleware:
+    """
+    Sheds load before request bodies are read
+
+    Requests to limited routes (see app.utils.admission) take a slot from
+    their class's limiter, charged with their Content-Length for uploads,
+    and hold it until the response has been sent. Requests that cannot be
+    admitted get a 503 with Retry-After without their body ever being
+    buffered.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        match = match_admission(scope["method"], scope["path"])
+        if match is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter, default_cost = match
+        content_length = _header(scope, b"content-length")
+        cost = limiter.cap_cost(
+            int(content_length) if content_length.isdigit() else default_cost
+        )
+
+        try:
+            await limiter.acquire(cost)
+        except AdmissionRejected as e:
+            logger.warning("Request shed by %s admission control: %s", e.limiter, e.reason)
+            await _send_overloaded(send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(cost)
+
+
+async def _send_overloaded(send) -> None:
+    body = json.dumps({"detail": "Server is overloaded, retry later"}).encode()
+    headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+        *[
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in retry_after_header(settings.ADMISSION_RETRY_AFTER).items()
+        ],
+    ]
+    await send({"type": "http.response.start", "status": 503, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _header(scope: dict, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
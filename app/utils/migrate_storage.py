@@ -0,0 +1,165 @@
+"""
+Storage Migration
+Moves images from the flat UPLOAD_DIR layout into shard directories
+
+Usage: python -m app.utils.migrate_storage [--dry-run]
+
+Every file is moved with an atomic rename, so the migration can be
+interrupted and re-run at any time; files already in their shard are
+left alone. Disk lookups resolve both layouts during the transition,
+but running workers keep the paths they had indexed, so restart them
+once the migration has finished.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+import logging
+
+from app.config import settings
+from app.utils.image_index import ImageIndex
+from app.utils.storage import get_blob_path, get_file_path
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_INTERVAL = 10000
+
+
+def _flat_entries(directory: Path):
+    """Yield stored files sitting directly in a directory"""
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            name, extension = os.path.splitext(entry.name)
+            if (
+                not entry.name.startswith(".")
+                and extension.lower() in settings.ALLOWED_EXTENSIONS
+                and not entry.is_dir(follow_symlinks=False)
+            ):
+                yield entry, name, extension.lower()
+
+
+def _move(source: Path, target: Path, dry_run: bool) -> bool:
+    """
+    Move one file into its shard
+
+    Returns:
+        True if the file was moved (or would be, in a dry run)
+    """
+    if target.exists():
+        logger.warning("Skipping %s: %s already exists", source, target)
+        return False
+
+    if not dry_run:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(source, target)
+    return True
+
+
+def migrate_blobs(dry_run: bool = False) -> int:
+    """
+    Move flat content-addressed blobs into shard directories
+
+    Hard links from image files keep pointing at the same inode, so
+    images stay valid while their blobs move. A flat blob whose digest
+    already exists in the sharded layout (uploaded again after sharding
+    was enabled) is identical content and is simply dropped.
+
+    Args:
+        dry_run: Only count what would be moved
+
+    Returns:
+        Number of blobs moved
+    """
+    if not settings.BLOB_DIR.is_dir():
+        return 0
+
+    moved = 0
+    for entry, digest, extension in _flat_entries(settings.BLOB_DIR):
+        source = Path(entry.path)
+        target = get_blob_path(digest, extension)
+        if target.exists():
+            if not dry_run:
+                source.unlink()
+        elif _move(source, target, dry_run):
+            moved += 1
+    return moved
+
+
+def migrate_images(dry_run: bool = False) -> int:
+    """
+    Move flat image files into shard directories
+
+    Symlinked images (content-addressed fallback) are re-created so their
+    relative target stays correct from the new location.
+
+    Args:
+        dry_run: Only count what would be moved
+
+    Returns:
+        Number of images moved
+    """
+    moved = 0
+    start_time = time.perf_counter()
+
+    for entry, image_id, extension in _flat_entries(settings.UPLOAD_DIR):
+        source = Path(entry.path)
+        target = get_file_path(image_id, extension)
+        if target == source:
+            continue
+
+        if entry.is_symlink():
+            blob_name = Path(os.readlink(source)).name
+            blob_digest = os.path.splitext(blob_name)[0]
+            if target.exists():
+                logger.warning("Skipping %s: %s already exists", source, target)
+                continue
+            if not dry_run:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                blob_path = get_blob_path(blob_digest, extension)
+                os.symlink(os.path.relpath(blob_path, target.parent), target)
+                source.unlink()
+            moved += 1
+        elif _move(source, target, dry_run):
+            moved += 1
+
+        if moved and moved % PROGRESS_INTERVAL == 0:
+            elapsed = time.perf_counter() - start_time
+            logger.info("Migrated %s images (%.0f/s)", moved, moved / elapsed)
+
+    return moved
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Migrate UPLOAD_DIR to the sharded layout")
+    parser.add_argument(
+        "--dry-run", action="store_true", help="Report what would be moved without moving it"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    if settings.STORAGE_SHARD_DEPTH <= 0:
+        logger.error("STORAGE_SHARD_DEPTH is 0; nothing to migrate to")
+        return 1
+
+    blobs = migrate_blobs(args.dry_run)
+    images = migrate_images(args.dry_run)
+    action = "Would move" if args.dry_run else "Moved"
+    logger.info("%s %s images and %s blobs into shard directories", action, images, blobs)
+
+    # A snapshot written before the migration points at the old paths
+    if settings.IMAGE_INDEX_SNAPSHOT and not args.dry_run:
+        index = ImageIndex()
+        index.build(settings.UPLOAD_DIR)
+        index.save_snapshot(settings.IMAGE_INDEX_SNAPSHOT)
+        logger.info("Image index snapshot rebuilt: %s", settings.IMAGE_INDEX_SNAPSHOT)
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+"""
+Perceptual Hash Utilities
+Difference hashes of images and a multi-index Hamming-distance index
+"""
+
+import itertools
+import threading
+from array import array
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+HASH_BITS = 64
+
+# Side of the grayscale grid compared by dhash (8 x 8 comparisons = 64 bits)
+DHASH_SIZE = 8
+
+# Images are decoded at roughly this size before hashing (JPEG DCT scaling)
+DHASH_DECODE_SIZE = 64
+
+# Hashes with fewer set (or unset) bits come from flat or smooth images,
+# which all hash alike whatever their color
+MIN_INFORMATIVE_BITS = 4
+
+
+def dhash(image: Image.Image, size: int = DHASH_SIZE) -> int:
+    """
+    Compute the difference hash of an image
+
+    The image is reduced to a (size + 1) x size grayscale grid and each
+    bit records whether a pixel is brighter than its right neighbor.
+    Re-compression, resizing and small crops or edits flip few bits, so
+    near-identical photos have hashes a small Hamming distance apart.
+
+    Args:
+        image: Decoded image
+        size: Grid side length (the hash has size * size bits)
+
+    Returns:
+        Hash as an unsigned integer
+    """
+    width = size + 1
+    pixels = image.convert("L").resize((width, size), Image.BILINEAR).tobytes()
+    value = 0
+    for row in range(size):
+        offset = row * width
+        for column in range(size):
+            value = (value << 1) | (pixels[offset + column] > pixels[offset + column + 1])
+    return value
+
+
+def dhash_file(path: Path) -> int:
+    """
+    Compute the difference hash of an image file
+
+    Only a thumbnail-sized version is decoded, and EXIF orientation is
+    applied so a rotated copy hashes like the upright original.
+
+    Args:
+        path: Path to a JPEG or PNG file
+
+    Returns:
+        64-bit hash
+
+    Raises:
+        OSError: If the file cannot be decoded
+    """
+    with Image.open(path) as image:
+        image.draft("L", (DHASH_DECODE_SIZE, DHASH_DECODE_SIZE))
+        return dhash(ImageOps.exif_transpose(image))
+
+
+def is_informative(value: int, bits: int = HASH_BITS) -> bool:
+    """
+    Check whether a hash says enough about an image to match on
+
+    Args:
+        value: Hash from dhash
+        bits: Hash length
+
+    Returns:
+        False for near-constant hashes (flat, gradient or blank images)
+    """
+    return MIN_INFORMATIVE_BITS <= value.bit_count() <= bits - MIN_INFORMATIVE_BITS
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+@lru_cache(maxsize=None)
+def _flip_masks(bits: int, radius: int) -> Tuple[int, ...]:
+    """Every mask of at most radius set bits within a bits-wide chunk"""
+    return tuple(
+        sum(1 << bit for bit in positions)
+        for count in range(radius + 1)
+        for positions in itertools.combinations(range(bits), count)
+    )
+
+
+class HammingIndex:
+    """
+    Finds stored hashes within a Hamming distance of a query
+
+    Multi-index hashing: each 64-bit hash is split into `chunks` disjoint
+    substrings and every substring is indexed in its own hash table. By
+    the pigeonhole principle, two hashes at most r bits apart agree to
+    within r // chunks bits on at least one substring, so probing each
+    table with the query substring and its few close variants finds every
+    match. Candidates are then verified with a full popcount. Each query
+    touches a handful of buckets instead of every stored hash.
+
+    Buckets are compact arrays of row numbers. Entries cannot be removed
+    (image IDs are never reused). The index is safe to use from several
+    threads.
+    """
+
+    def __init__(self, chunks: int = 4, bits: int = HASH_BITS):
+        if bits % chunks:
+            raise ValueError("bits must be divisible by chunks")
+        self.chunks = chunks
+        self.bits = bits
+        self.chunk_bits = bits // chunks
+        self._chunk_mask = (1 << self.chunk_bits) - 1
+
+        self._keys: List[str] = []
+        self._hashes = array("Q")
+        self._rows: Dict[str, int] = {}
+        self._tables: List[Dict[int, array]] = [{} for _ in range(chunks)]
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._rows
+
+    def get(self, key: str) -> Optional[int]:
+        """
+        Look up the hash stored for a key
+
+        Args:
+            key: Image identifier
+
+        Returns:
+            The hash, or None if the key is not indexed
+        """
+        row = self._rows.get(key)
+        return self._hashes[row] if row is not None else None
+
+    def add(self, key: str, value: int) -> bool:
+        """
+        Index a hash
+
+        Args:
+            key: Image identifier
+            value: Hash of the image
+
+        Returns:
+            True if the key was added, False if it was already indexed
+        """
+        with self._lock:
+            if key in self._rows:
+                return False
+            row = len(self._keys)
+            self._keys.append(key)
+            self._hashes.append(value)
+            self._rows[key] = row
+            for table, chunk in zip(self._tables, self._split(value)):
+                bucket = table.get(chunk)
+                if bucket is None:
+                    table[chunk] = array("I", (row,))
+                else:
+                    bucket.append(row)
+        return True
+
+    def search(self, value: int, max_distance: int, limit: int = 10) -> List[Tuple[str, int]]:
+        """
+        Find indexed hashes within a Hamming distance
+
+        Args:
+            value: Query hash
+            max_distance: Largest number of differing bits to report
+            limit: Maximum number of matches
+
+        Returns:
+            List of (key, distance), nearest first
+        """
+        masks = _flip_masks(self.chunk_bits, max_distance // self.chunks)
+        candidates = set()
+        with self._lock:
+            for table, chunk in zip(self._tables, self._split(value)):
+                for mask in masks:
+                    bucket = table.get(chunk ^ mask)
+                    if bucket is not None:
+                        candidates.update(bucket)
+
+            hashes, keys = self._hashes, self._keys
+            matches = []
+            for row in candidates:
+                distance = (hashes[row] ^ value).bit_count()
+                if distance <= max_distance:
+                    matches.append((distance, keys[row]))
+
+        matches.sort()
+        return [(key, distance) for distance, key in matches[:limit]]
+
+    def _split(self, value: int) -> List[int]:
+        return [
+            (value >> (index * self.chunk_bits)) & self._chunk_mask
+            for index in range(self.chunks)
+        ]
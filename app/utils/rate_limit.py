@@ -0,0 +1,85 @@
+"""
+Rate Limiting Utilities
+In-memory token buckets keyed by client
+"""
+
+import math
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class TokenBucketLimiter:
+    """
+    One token bucket per key, refilled lazily on access
+
+    Each key may make `burst` requests at once and `rate` requests per
+    second on average. Buckets live in process memory, so with several
+    server processes each enforces the limit separately. Idle buckets
+    beyond max_keys are evicted least-recently-used first (an evicted
+    bucket simply starts full again).
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        # key -> [tokens, last refill time]
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+
+    def acquire(self, key: str, rate: float, burst: int) -> Optional[float]:
+        """
+        Take one token from a key's bucket
+
+        Args:
+            key: Client identifier
+            rate: Tokens added per second (0 or less disables the limit)
+            burst: Bucket capacity
+
+        Returns:
+            None if the request is allowed, otherwise the seconds until a
+            token is available
+        """
+        if rate <= 0:
+            return None
+
+        now = time.monotonic()
+        capacity = max(burst, 1)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = [float(capacity), now]
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+            bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            bucket[1] = now
+
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return None
+        return (1 - bucket[0]) / rate
+
+    def reset(self, key: Optional[str] = None) -> None:
+        """
+        Forget one bucket, or all of them
+
+        Args:
+            key: Client identifier, or None for every bucket
+        """
+        if key is None:
+            self._buckets.clear()
+        else:
+            self._buckets.pop(key, None)
+
+
+def retry_after_header(delay: float) -> dict:
+    """
+    Build a Retry-After header for a rejected request
+
+    Args:
+        delay: Seconds until the request may be retried
+
+    Returns:
+        Header dictionary with whole seconds (at least 1)
+    """
+    return {"Retry-After": str(max(1, math.ceil(delay)))}
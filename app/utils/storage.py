@@ -2,16 +2,45 @@
 Storage Utilities
 """
 
+import asyncio
+import hashlib
+import os
+import time
 import uuid
-import aiofiles
+import aiofiles.os
+from dataclasses import dataclass
 from pathlib import Path
-from fastapi import UploadFile
+from typing import Optional, Tuple
 import logging
 
 from app.config import settings
+from app.utils.image_index import (
+    CONTENT_TYPES,
+    DERIVATIVE_EXTENSION,
+    ImageRecord,
+    image_index,
+    record_from_path,
+)
+from app.utils.image_header import ImageHeader
+from app.utils.metrics import stage_timer
+from app.utils.upload_stream import ReceivedFile
 
 logger = logging.getLogger(__name__)
 
+# Rendition name of uploads kept as sent alongside their normalized image
+ORIGINAL_RENDITION = "original"
+
+# Extension each blob is stored under, where it differs from the upload's
+BLOB_EXTENSIONS = {".jpeg": ".jpg"}
+
+
+@dataclass
+class SavedImage:
+    """Result of storing an upload"""
+
+    record: ImageRecord
+    duplicate: bool = False
+
 
 def generate_image_id() -> str:
     """
@@ -23,6 +52,29 @@ def generate_image_id() -> str:
     return str(uuid.uuid4())
 
 
+def get_shard_dir(base_dir: Path, key: str) -> Path:
+    """
+    Get the shard directory for a key
+
+    With STORAGE_SHARD_DEPTH=2 and STORAGE_SHARD_WIDTH=2, the key
+    'ab12cd34-...' maps to base_dir/ab/12.
+
+    Args:
+        base_dir: Root directory of the layout
+        key: Image ID or digest the shard is derived from
+
+    Returns:
+        Directory the key's files live in
+    """
+    width = settings.STORAGE_SHARD_WIDTH
+    prefix = key.replace("-", "").lower().ljust(settings.STORAGE_SHARD_DEPTH * width, "0")
+    parts = [
+        prefix[level * width:(level + 1) * width]
+        for level in range(settings.STORAGE_SHARD_DEPTH)
+    ]
+    return base_dir.joinpath(*parts)
+
+
 def get_file_path(image_id: str, extension: str) -> Path:
     """
     Get full file path for an image
@@ -32,41 +84,291 @@ def get_file_path(image_id: str, extension: str) -> Path:
         extension: File extension (e.g., '.jpg')
 
     Returns:
-        Full path to the file
+        Full path to the file (inside its shard directory)
     """
     filename = f"{image_id}{extension}"
-    return settings.UPLOAD_DIR / filename
+    return get_shard_dir(settings.UPLOAD_DIR, image_id) / filename
 
 
-async def save_image(file: UploadFile, image_id: str) -> Path:
+def get_legacy_file_path(image_id: str, extension: str) -> Path:
     """
-    Save uploaded image to local storage
+    Get the pre-sharding flat path of an image
 
     Args:
-        file: Uploaded file
-        image_id: Unique identifier for the image
+        image_id: Unique image identifier
+        extension: File extension (e.g., '.jpg')
+
+    Returns:
+        Path directly inside UPLOAD_DIR
+    """
+    return settings.UPLOAD_DIR / f"{image_id}{extension}"
+
+
+def get_blob_path(digest: str, extension: str) -> Path:
+    """
+    Get the content-addressed path of a blob
+
+    Blobs are keyed by content, so every extension of a format maps to one
+    blob name: identical bytes uploaded as .jpg and .jpeg share a blob.
+
+    Args:
+        digest: SHA-256 hex digest of the content
+        extension: File extension (e.g., '.jpg')
+
+    Returns:
+        Full path to the blob (inside its shard directory)
+    """
+    extension = BLOB_EXTENSIONS.get(extension, extension)
+    return get_shard_dir(settings.BLOB_DIR, digest) / f"{digest}{extension}"
+
+
+def get_derivative_path(record: ImageRecord, name: str) -> Path:
+    """
+    Get the path of a derivative rendition of an image
+
+    Derivatives sit next to the original (in the same shard directory, or
+    flat for legacy images) and are always JPEG.
+
+    Args:
+        record: Record of the original image
+        name: Derivative name, e.g. 'thumb'
+
+    Returns:
+        Path such as uploads/ab/12/ab12cd34-....thumb.jpg
+    """
+    return record.path.with_name(f"{record.image_id}.{name}{DERIVATIVE_EXTENSION}")
+
+
+def get_original_path(file_path: Path) -> Path:
+    """
+    Get the path an upload is kept at, as sent, when ingest normalization
+    replaced it
+
+    Args:
+        file_path: Path of the stored image
+
+    Returns:
+        Path such as uploads/ab/12/ab12cd34-....original.jpg
+    """
+    return file_path.with_name(f"{file_path.stem}.{ORIGINAL_RENDITION}{file_path.suffix}")
+
+
+def is_valid_image_id(image_id: str) -> bool:
+    """
+    Check that an image ID cannot escape the upload directory
+
+    Args:
+        image_id: Image identifier to check
+
+    Returns:
+        True if the ID is safe to use in a path
+    """
+    # Dots are reserved for derivatives ({image_id}.{name}.jpg) and
+    # rule out hidden files and relative path components
+    return (
+        bool(image_id)
+        and "." not in image_id
+        and "/" not in image_id
+        and "\\" not in image_id
+    )
+
+
+def get_temp_path(file_path: Path) -> Path:
+    """
+    Get the temporary path an upload is streamed to before it is committed
+
+    Args:
+        file_path: Final path of the file
 
     Returns:
-        Path where the file was saved
+        Hidden sibling path in the same directory (so the final rename is atomic)
+    """
+    return file_path.with_name(f".{file_path.name}.part")
+
+
+def _link_blob(temp_path: Path, blob_path: Path, file_path: Path) -> bool:
     """
-    # Get file extension
-    if not file.filename:
-        raise ValueError("Uploaded file must have a filename")
-    extension = Path(file.filename).suffix.lower()
+    Commit a streamed upload as a content-addressed blob and reference it
+
+    Args:
+        temp_path: Fully written temporary file
+        blob_path: Content-addressed path for the data
+        file_path: Per-image path that should reference the blob
+
+    Returns:
+        True if the blob already existed (duplicate content)
+    """
+    duplicate = blob_path.exists()
+    if duplicate:
+        temp_path.unlink()
+    else:
+        blob_path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(temp_path, blob_path)
+
+    # A hard link keeps get_file_path/image lookups working unchanged
+    try:
+        os.link(blob_path, file_path)
+    except OSError:
+        os.symlink(os.path.relpath(blob_path, file_path.parent), file_path)
+
+    return duplicate
+
+
+async def save_image(file: ReceivedFile) -> SavedImage:
+    """
+    Store an upload the multipart parser has written to its temporary path
+
+    The temporary file is atomically renamed into place. With
+    CONTENT_ADDRESSED_STORAGE the data is stored once per digest and the
+    image path is a link to that blob.
+
+    Args:
+        file: Completely received and validated upload
+
+    Returns:
+        SavedImage with the indexed record and whether the content was a duplicate
+    """
+    file_path = get_file_path(file.image_id, file.extension)
+    try:
+        return await _commit_image(
+            file.path, file_path, file.image_id, file.size, file.digest, file.header
+        )
+    except BaseException:
+        await asyncio.to_thread(file.path.unlink, missing_ok=True)
+        raise
+
+
+async def save_image_file(
+    source_path: Path, image_id: str, extension: str, header: Optional[ImageHeader] = None
+) -> SavedImage:
+    """
+    Store a fully received file (e.g. a resumable upload session) as an image
+
+    The file is hashed in a thread and moved into place, so it must be on
+    the same filesystem as UPLOAD_DIR. It is consumed on success.
+
+    Args:
+        source_path: Complete file to store
+        image_id: Unique identifier for the image
+        extension: Lower-case file extension, e.g. ".jpg"
+        header: Format and dimensions from validation, recorded in the index
 
-    # Determine save path
+    Returns:
+        SavedImage with the indexed record and whether the content was a duplicate
+    """
     file_path = get_file_path(image_id, extension)
+    await aiofiles.os.makedirs(file_path.parent, exist_ok=True)
+
+    with stage_timer("upload", "hash").time():
+        file_size, digest = await asyncio.to_thread(_hash_file, source_path)
+    return await _commit_image(source_path, file_path, image_id, file_size, digest, header)
+
+
+def _hash_file(path: Path) -> Tuple[int, str]:
+    hasher = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as source:
+        while chunk := source.read(settings.UPLOAD_CHUNK_SIZE):
+            size += len(chunk)
+            hasher.update(chunk)
+    return size, hasher.hexdigest()
+
+
+async def _commit_image(
+    temp_path: Path,
+    file_path: Path,
+    image_id: str,
+    file_size: int,
+    digest: str,
+    header: Optional[ImageHeader],
+) -> SavedImage:
+    """
+    Move a complete file into place and index it
+
+    Args:
+        temp_path: Fully written file in the upload directory
+        file_path: Final path of the image
+        image_id: Unique identifier for the image
+        file_size: Size of the file in bytes
+        digest: SHA-256 hex digest of the content
+        header: Format and dimensions from validation
+
+    Returns:
+        SavedImage with the indexed record and whether the content was a duplicate
+    """
+    extension = file_path.suffix
+    duplicate = False
+    with stage_timer("upload", "commit").time():
+        if settings.CONTENT_ADDRESSED_STORAGE:
+            blob_path = get_blob_path(digest, extension)
+            duplicate = await asyncio.to_thread(
+                _link_blob, temp_path, blob_path, file_path
+            )
+        else:
+            await aiofiles.os.replace(temp_path, file_path)
+
+    record = ImageRecord(
+        image_id=image_id,
+        path=file_path,
+        size=file_size,
+        content_type=CONTENT_TYPES.get(extension, "application/octet-stream"),
+        created_at=time.time(),
+        digest=digest,
+        width=header.width if header else None,
+        height=header.height if header else None,
+    )
+    image_index.add(record)
+
+    if duplicate:
+        logger.info("Image saved: %s (duplicate of blob %s)", file_path, digest)
+    else:
+        logger.info("Image saved: %s (%s bytes)", file_path, file_size)
+    return SavedImage(record=record, duplicate=duplicate)
+
+
+async def find_image(image_id: str) -> Optional[ImageRecord]:
+    """
+    Look up a stored image
+
+    Served from the in-memory image index. Unless IMAGE_INDEX_AUTHORITATIVE
+    is set, a miss falls back to probing the upload directory (another
+    worker may have stored the image) and indexes what it finds. Both the
+    sharded and the legacy flat layout are probed, in a thread so the
+    event loop never blocks on the filesystem.
+
+    Args:
+        image_id: Image identifier
+
+    Returns:
+        ImageRecord, or None if the image doesn't exist
+    """
+    record = image_index.get(image_id)
+    if record is not None or settings.IMAGE_INDEX_AUTHORITATIVE:
+        return record
+
+    if not is_valid_image_id(image_id):
+        return None
+
+    return await asyncio.to_thread(_probe_image, image_id)
+
 
-    # Save file
-    async with aiofiles.open(file_path, "wb") as out_file:
-        content = await file.read()
-        await out_file.write(content)
+def _probe_image(image_id: str) -> Optional[ImageRecord]:
+    # With a flat layout both functions return the same path
+    layouts = (get_file_path, get_legacy_file_path) if settings.STORAGE_SHARD_DEPTH else (
+        get_file_path,
+    )
+    for get_path in layouts:
+        for ext in settings.ALLOWED_EXTENSIONS:
+            file_path = get_path(image_id, ext)
+            if file_path.exists():
+                record = record_from_path(image_id, file_path)
+                image_index.add(record)
+                return record
 
-    logger.info(f"Image saved: {file_path}")
-    return file_path
+    return None
 
 
-def image_exists(image_id: str) -> bool:
+async def image_exists(image_id: str) -> bool:
     """
     Check if an image exists for the given ID
 
@@ -76,18 +378,16 @@ def image_exists(image_id: str) -> bool:
     Returns:
         True if image exists, False otherwise
     """
-    # Check for common extensions
-    for ext in settings.ALLOWED_EXTENSIONS:
-        file_path = get_file_path(image_id, ext)
-        if file_path.exists():
-            logger.info(f"Image found: {file_path}")
-            return True
+    record = await find_image(image_id)
+    if record is None:
+        logger.warning("Image not found for ID: %s", image_id)
+        return False
 
-    logger.warning(f"Image not found for ID: {image_id}")
-    return False
+    logger.info("Image found: %s", record.path)
+    return True
 
 
-def get_existing_image_path(image_id: str) -> Path:
+async def get_existing_image_path(image_id: str) -> Path:
     """
     Get the path of an existing image
 
@@ -100,9 +400,8 @@ def get_existing_image_path(image_id: str) -> Path:
     Raises:
         FileNotFoundError: If image doesn't exist
     """
-    for ext in settings.ALLOWED_EXTENSIONS:
-        file_path = get_file_path(image_id, ext)
-        if file_path.exists():
-            return file_path
+    record = await find_image(image_id)
+    if record is None:
+        raise FileNotFoundError(f"Image not found: {image_id}")
 
-    raise FileNotFoundError(f"Image not found: {image_id}")
+    return record.path
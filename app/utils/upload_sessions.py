@@ -0,0 +1,206 @@
+"""
+Upload Session Utilities
+On-disk state of resumable (chunked) uploads
+"""
+
+import json
+import os
+import re
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+import logging
+
+from app.config import settings
+from app.utils.image_header import ImageHeader
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_ID_PATTERN = re.compile(r"^[0-9a-f]{32}$")
+
+
+def is_valid_upload_id(upload_id: str) -> bool:
+    """
+    Check that an upload ID was generated by the store (and is path-safe)
+
+    Args:
+        upload_id: Upload identifier from a request
+
+    Returns:
+        True if the ID is well-formed
+    """
+    return bool(UPLOAD_ID_PATTERN.match(upload_id))
+
+
+@dataclass
+class UploadSession:
+    """State of one resumable upload"""
+
+    upload_id: str
+    filename: str
+    extension: str
+    length: int
+    created_at: float
+    # Set once enough leading bytes have arrived to read the dimensions
+    header: Optional[ImageHeader] = None
+    # Upload response, set once the session has been finalized
+    result: Optional[dict] = None
+    # Bytes received so far (size of the data file, not persisted)
+    offset: int = 0
+
+    @property
+    def complete(self) -> bool:
+        return self.offset == self.length
+
+
+class UploadSessionStore:
+    """
+    Resumable uploads stored as files
+
+    Each session is {upload_id}.json (metadata) plus {upload_id}.part (the
+    bytes received so far). The offset is the size of the data file, so it
+    survives restarts and is shared by every server process using the same
+    directory. The directory lives inside UPLOAD_DIR, so a completed data
+    file can be renamed into place instead of copied.
+
+    All methods block on the filesystem and are meant to be called via
+    asyncio.to_thread.
+    """
+
+    def __init__(self, directory: Path, ttl: float):
+        self.directory = directory
+        self.ttl = ttl
+
+    def open(self) -> None:
+        """Create the session directory if needed"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def data_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.part"
+
+    def _meta_path(self, upload_id: str) -> Path:
+        return self.directory / f"{upload_id}.json"
+
+    def create(self, filename: str, extension: str, length: int) -> UploadSession:
+        """
+        Start a new session
+
+        Args:
+            filename: Original filename
+            extension: Lower-case file extension
+            length: Total size the client will send, in bytes
+
+        Returns:
+            New session at offset 0
+        """
+        session = UploadSession(
+            upload_id=uuid.uuid4().hex,
+            filename=filename,
+            extension=extension,
+            length=length,
+            created_at=time.time(),
+        )
+        self.data_path(session.upload_id).touch()
+        self.save(session)
+        return session
+
+    def get(self, upload_id: str) -> Optional[UploadSession]:
+        """
+        Load a session
+
+        Args:
+            upload_id: Upload identifier
+
+        Returns:
+            UploadSession with its current offset, or None if it doesn't exist
+        """
+        try:
+            meta = json.loads(self._meta_path(upload_id).read_text())
+        except FileNotFoundError:
+            return None
+
+        header = meta.pop("header", None)
+        session = UploadSession(**meta, header=ImageHeader(**header) if header else None)
+        if session.result is not None:
+            # Finalized: the data file has become the stored image
+            session.offset = session.length
+            return session
+
+        try:
+            session.offset = self.data_path(upload_id).stat().st_size
+        except FileNotFoundError:
+            return None
+        return session
+
+    def save(self, session: UploadSession) -> None:
+        """
+        Persist a session's metadata (atomically)
+
+        Args:
+            session: Session to write
+        """
+        meta = asdict(session)
+        del meta["offset"]
+        meta_path = self._meta_path(session.upload_id)
+        temp_path = meta_path.with_name(f".{meta_path.name}.tmp")
+        temp_path.write_text(json.dumps(meta))
+        os.replace(temp_path, meta_path)
+
+    def read_prefix(self, upload_id: str, size: int) -> bytes:
+        """
+        Read the first bytes received for a session
+
+        Args:
+            upload_id: Upload identifier
+            size: Maximum number of bytes to read
+
+        Returns:
+            Up to size leading bytes of the data file
+        """
+        with open(self.data_path(upload_id), "rb") as data_file:
+            return data_file.read(size)
+
+    def delete(self, upload_id: str) -> None:
+        """
+        Remove a session and any data received for it
+
+        Args:
+            upload_id: Upload identifier
+        """
+        self.data_path(upload_id).unlink(missing_ok=True)
+        self._meta_path(upload_id).unlink(missing_ok=True)
+
+    def collect_garbage(self) -> int:
+        """
+        Remove sessions without activity for longer than the TTL
+
+        Finalized sessions are kept for the same period so a client that
+        lost the finalize response can retry it.
+
+        Returns:
+            Number of sessions removed
+        """
+        cutoff = time.time() - self.ttl
+        last_activity = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                upload_id, _, suffix = entry.name.partition(".")
+                if suffix not in ("json", "part"):
+                    continue
+                try:
+                    mtime = entry.stat().st_mtime
+                except FileNotFoundError:
+                    continue
+                last_activity[upload_id] = max(last_activity.get(upload_id, 0.0), mtime)
+
+        expired = [upload_id for upload_id, mtime in last_activity.items() if mtime < cutoff]
+        for upload_id in expired:
+            self.delete(upload_id)
+        if expired:
+            logger.info("Removed %s expired upload sessions", len(expired))
+        return len(expired)
+
+
+upload_session_store = UploadSessionStore(settings.UPLOAD_SESSION_DIR, settings.UPLOAD_SESSION_TTL)
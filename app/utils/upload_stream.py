@@ -0,0 +1,315 @@
+"""
+Upload Stream Utilities
+Parses multipart uploads straight into the upload directory
+"""
+
+import asyncio
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import AsyncIterator, Callable, List, Optional, Tuple
+import logging
+
+import aiofiles
+import aiofiles.os
+from fastapi import HTTPException
+from python_multipart import MultipartParser
+from python_multipart.exceptions import FormParserError
+from python_multipart.multipart import parse_options_header
+from starlette.datastructures import Headers
+
+from app.config import settings
+from app.utils.image_header import ImageHeader
+from app.utils.metrics import UPLOAD_BYTES, UPLOAD_BYTES_IN_FLIGHT, stage_timer
+from app.utils.validators import (
+    validate_file_extension,
+    validate_file_size,
+    validate_image_header,
+)
+
+logger = logging.getLogger(__name__)
+
+# Maps a file extension to the image ID and temporary path an upload is written to
+UploadTarget = Callable[[str], Tuple[str, Path]]
+
+
+class ReceivedFile:
+    """
+    A file part of a multipart upload, written to its temporary path as it arrives
+
+    Chunks are size-checked against MAX_FILE_SIZE, hashed and appended to
+    the file in UPLOAD_CHUNK_SIZE writes, so the upload is stored once and
+    never held in memory or spooled elsewhere. The image header is
+    validated from the leading bytes as they arrive, so non-JPEG/PNG
+    content, a mismatched extension or oversized dimensions fail on the
+    first chunk. After an error the data written so far is removed and
+    later chunks are ignored; the error is raised when the file is
+    processed (or at once, by a fail-fast parser).
+    """
+
+    def __init__(self, filename: str, target: UploadTarget):
+        self.filename = filename
+        self.extension = Path(filename).suffix.lower()
+        self.image_id = ""
+        self.path: Optional[Path] = None
+        self.size = 0
+        self.digest = ""
+        self.header: Optional[ImageHeader] = None
+        self.error: Optional[HTTPException] = None
+
+        # Leading bytes kept until the header is found; parsed again each
+        # time they double, so slow trickles don't re-parse per chunk
+        self._prefix = b""
+        self._parsed_length = 0
+        self._buffer = bytearray()
+        self._hasher = hashlib.sha256()
+        self._out_file = None
+        self._write_time = 0.0
+        self._in_flight = 0
+
+        try:
+            if not filename:
+                raise HTTPException(status_code=400, detail="Invalid filename")
+            validate_file_extension(filename)
+        except HTTPException as e:
+            self.error = e
+            return
+        self.image_id, self.path = target(self.extension)
+
+    async def write(self, data: bytes) -> None:
+        """
+        Append a chunk of the file
+
+        Args:
+            data: Next bytes of the file part
+        """
+        if self.error is not None or not data:
+            return
+        try:
+            self.size += len(data)
+            validate_file_size(self.size)
+            if self.header is None:
+                limit = settings.IMAGE_HEADER_MAX_BYTES
+                self._prefix += data[:limit - len(self._prefix)]
+                if len(self._prefix) >= min(2 * self._parsed_length, limit):
+                    self._check_header(final=len(self._prefix) >= limit)
+            UPLOAD_BYTES_IN_FLIGHT.inc(len(data))
+            self._in_flight += len(data)
+            self._hasher.update(data)
+            self._buffer += data
+            if len(self._buffer) >= settings.UPLOAD_CHUNK_SIZE:
+                await self._flush()
+        except HTTPException as e:
+            await self._fail(e)
+
+    async def finish(self) -> None:
+        """Write the rest of the file and check that a header was found"""
+        if self.error is not None:
+            return
+        try:
+            if self.header is None:
+                self._check_header(final=True)
+            await self._flush()
+            if settings.UPLOAD_FSYNC:
+                with stage_timer("upload", "fsync").time():
+                    await self._out_file.flush()
+                    await asyncio.to_thread(os.fsync, self._out_file.fileno())
+            await self._close()
+            stage_timer("upload", "write").observe(self._write_time)
+        except HTTPException as e:
+            await self._fail(e)
+            return
+
+        self.digest = self._hasher.hexdigest()
+        UPLOAD_BYTES.inc(self.size)
+        logger.info(
+            "File received: %s (%s %sx%s, %s bytes)",
+            self.filename, self.header.format, self.header.width, self.header.height, self.size,
+        )
+
+    async def discard(self) -> None:
+        """Remove the temporary file if it was not stored"""
+        await self._close()
+        if self.path is not None:
+            await asyncio.to_thread(self.path.unlink, missing_ok=True)
+
+    def _check_header(self, final: bool) -> None:
+        with stage_timer("upload", "validate").time():
+            self.header = validate_image_header(self._prefix, self.extension)
+        self._parsed_length = len(self._prefix)
+        if self.header is not None:
+            self._prefix = b""
+        elif final:
+            raise HTTPException(status_code=400, detail="Image header is truncated or too large")
+
+    async def _flush(self) -> None:
+        if not self._buffer:
+            return
+        start = time.perf_counter()
+        if self._out_file is None:
+            await aiofiles.os.makedirs(self.path.parent, exist_ok=True)
+            self._out_file = await aiofiles.open(self.path, "wb")
+        await self._out_file.write(bytes(self._buffer))
+        self._buffer.clear()
+        self._write_time += time.perf_counter() - start
+
+    async def _close(self) -> None:
+        if self._out_file is not None:
+            await self._out_file.close()
+            self._out_file = None
+        self._release()
+
+    def _release(self) -> None:
+        UPLOAD_BYTES_IN_FLIGHT.dec(self._in_flight)
+        self._in_flight = 0
+
+    async def _fail(self, error: HTTPException) -> None:
+        self.error = error
+        self._buffer.clear()
+        await self.discard()
+
+
+class UploadStreamParser:
+    """
+    Multipart parser writing the file parts of one form field to storage
+
+    Unlike Starlette's form parser, nothing is spooled: each file part is
+    streamed into a ReceivedFile at its final location's temporary path.
+    Parts of other fields are counted against the limits and dropped.
+    With fail_fast, the first invalid file is raised at once and the rest
+    of the body is never read.
+    """
+
+    def __init__(
+        self,
+        headers: Headers,
+        stream: AsyncIterator[bytes],
+        field: str,
+        max_files: int,
+        target: UploadTarget,
+        fail_fast: bool = False,
+    ):
+        self.headers = headers
+        self.stream = stream
+        self.field = field
+        self.max_files = max_files
+        self.target = target
+        self.fail_fast = fail_fast
+
+        self.files: List[ReceivedFile] = []
+        self._file_count = 0
+        self._field_count = 0
+        self._header_name = b""
+        self._header_value = b""
+        self._disposition = b""
+        self._current: Optional[ReceivedFile] = None
+        self._to_write: List[Tuple[ReceivedFile, bytes]] = []
+        self._to_finish: List[ReceivedFile] = []
+
+    async def parse(self) -> List[ReceivedFile]:
+        """
+        Read the request body and write its files
+
+        Returns:
+            Received files of the field, in request order (each either
+            complete or carrying its validation error)
+
+        Raises:
+            HTTPException: If the multipart data is malformed or has too
+                many parts, or (with fail_fast) a file is invalid; files
+                written so far are removed
+        """
+        _, params = parse_options_header(self.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise HTTPException(status_code=400, detail="Missing boundary in multipart.")
+
+        callbacks = {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        }
+        try:
+            parser = MultipartParser(boundary, callbacks)
+            async for chunk in self.stream:
+                parser.write(chunk)
+                # File writes are awaited here, outside the parser's
+                # synchronous callbacks
+                for received, data in self._to_write:
+                    await received.write(data)
+                    self._check(received)
+                for received in self._to_finish:
+                    await received.finish()
+                    self._check(received)
+                self._to_write.clear()
+                self._to_finish.clear()
+            parser.finalize()
+            if self._current is not None:
+                raise HTTPException(status_code=400, detail="Invalid multipart data.")
+        except BaseException as e:
+            for received in self.files:
+                await received.discard()
+            if isinstance(e, FormParserError):
+                raise HTTPException(status_code=400, detail="Invalid multipart data.")
+            raise
+        return self.files
+
+    def _check(self, received: ReceivedFile) -> None:
+        if self.fail_fast and received.error is not None:
+            raise received.error
+
+    def _on_part_begin(self) -> None:
+        self._disposition = b""
+        self._current = None
+
+    def _on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def _on_header_end(self) -> None:
+        if self._header_name.lower() == b"content-disposition":
+            self._disposition = self._header_value
+        self._header_name = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._disposition)
+        # Plain fields count against the same limit, so a request cannot
+        # stream an unbounded number of small parts
+        if b"filename" in options:
+            self._file_count += 1
+            if self._file_count > self.max_files:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Too many files. Maximum number of files is {self.max_files}.",
+                )
+        else:
+            self._field_count += 1
+            if self._field_count > self.max_files:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Too many fields. Maximum number of fields is {self.max_files}.",
+                )
+        name = options.get(b"name", b"").decode("utf-8", "replace")
+        if name != self.field or b"filename" not in options:
+            return
+        filename = options[b"filename"].decode("utf-8", "replace")
+        self._current = ReceivedFile(filename, self.target)
+        self.files.append(self._current)
+        self._check(self._current)
+
+    def _on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._current is not None:
+            self._to_write.append((self._current, data[start:end]))
+
+    def _on_part_end(self) -> None:
+        if self._current is not None:
+            self._to_finish.append(self._current)
+            self._current = None
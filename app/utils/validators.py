@@ -2,15 +2,21 @@
 Validation Utilities
 """
 
-from fastapi import UploadFile, HTTPException
+from fastapi import HTTPException
+from typing import Optional
 from pathlib import Path
 import logging
 
 from app.config import settings
+from app.utils.image_header import (
+    FORMAT_EXTENSIONS,
+    ImageHeader,
+    InvalidImageHeader,
+    parse_image_header,
+)
 
 logger = logging.getLogger(__name__)
 
-
 def validate_file_extension(filename: str) -> None:
     """
     Validate file extension
@@ -25,56 +31,95 @@ def validate_file_extension(filename: str) -> None:
 
     if file_ext not in settings.ALLOWED_EXTENSIONS:
         allowed = ", ".join(settings.ALLOWED_EXTENSIONS)
-        logger.warning(f"Invalid file extension attempted: {file_ext}")
+        logger.warning("Invalid file extension attempted: %s", file_ext)
         raise HTTPException(
             status_code=400, detail=f"Invalid file type. Allowed types: {allowed}"
         )
 
 
-async def validate_file_size(file: UploadFile) -> None:
+def file_too_large() -> HTTPException:
+    """
+    Build the error returned for an upload over MAX_FILE_SIZE
+
+    Returns:
+        HTTPException with status 400
+    """
+    max_size_mb = settings.MAX_FILE_SIZE / (1024 * 1024)
+    return HTTPException(
+        status_code=400,
+        detail=f"File size exceeds maximum allowed size of {max_size_mb}MB",
+    )
+
+
+def validate_file_size(file_size: int) -> None:
     """
     Validate file size
 
+    The upload routes already bound the request body while parsing it;
+    this is the exact per-file check, made as each file part is written
+    to storage or as resumable upload chunks arrive.
+
     Args:
-        file: Uploaded file to validate
+        file_size: Number of bytes received so far
 
     Raises:
         HTTPException: If file size exceeds maximum
     """
-    contents = await file.read()
-    file_size = len(contents)
-
-    await file.seek(0)
-
     if file_size > settings.MAX_FILE_SIZE:
-        max_size_mb = settings.MAX_FILE_SIZE / (1024 * 1024)
-        logger.warning(f"File size {file_size} exceeds limit {settings.MAX_FILE_SIZE}")
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size exceeds maximum allowed size of {max_size_mb}MB",
-        )
-
-    logger.info(f"File size validated: {file_size} bytes")
+        logger.warning("File size %s exceeds limit %s", file_size, settings.MAX_FILE_SIZE)
+        raise file_too_large()
 
 
-async def validate_image_file(file: UploadFile) -> None:
+def validate_image_header(data: bytes, extension: str) -> Optional[ImageHeader]:
     """
-    Validate uploaded image file
+    Validate the leading bytes of an image
+
+    Checks the magic bytes against the file extension and the dimensions
+    from the JPEG SOF / PNG IHDR header against the configured limits.
 
     Args:
-        file: Uploaded file to validate
+        data: Leading bytes of the file
+        extension: Lower-case file extension, e.g. ".jpg"
+
+    Returns:
+        ImageHeader, or None if more data is needed to read the dimensions
 
     Raises:
-        HTTPException: If validation fails
+        HTTPException: If the content is not an allowed image or its
+            dimensions exceed the limits
     """
-    if not file:
-        raise HTTPException(status_code=400, detail="No file provided")
+    try:
+        header = parse_image_header(data)
+    except InvalidImageHeader as e:
+        logger.warning("Rejected upload content: %s", e)
+        raise HTTPException(status_code=400, detail=str(e))
 
-    if not file.filename:
-        raise HTTPException(status_code=400, detail="Invalid filename")
+    if header is None:
+        return None
 
-    validate_file_extension(file.filename)
+    if extension not in FORMAT_EXTENSIONS[header.format]:
+        logger.warning("Upload content is %s but extension is %s", header.format, extension)
+        raise HTTPException(
+            status_code=400,
+            detail=f"File content ({header.format.upper()}) does not match its extension",
+        )
+
+    if header.width <= 0 or header.height <= 0:
+        raise HTTPException(status_code=400, detail="Image has invalid dimensions")
 
-    await validate_file_size(file)
+    if (
+        header.width > settings.MAX_IMAGE_WIDTH
+        or header.height > settings.MAX_IMAGE_HEIGHT
+        or header.width * header.height > settings.MAX_IMAGE_PIXELS
+    ):
+        logger.warning("Image dimensions %sx%s exceed limits", header.width, header.height)
+        raise HTTPException(
+            status_code=400,
+            detail=(
+                f"Image dimensions {header.width}x{header.height} exceed the maximum of "
+                f"{settings.MAX_IMAGE_WIDTH}x{settings.MAX_IMAGE_HEIGHT} "
+                f"({settings.MAX_IMAGE_PIXELS} pixels)"
+            ),
+        )
 
-    logger.info(f"File validation passed: {file.filename}")
+    return header
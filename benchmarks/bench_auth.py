@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+API Key Benchmark
+Measures key verification cost as the number of stored keys grows
+
+Usage: python -m benchmarks.bench_auth [--keys 10,1000,100000] [--lookups 100000]
+
+For each store size, the same set of client keys is verified with the
+LRU cache cold (every lookup hashes the secret) and warm, alongside the
+per-request token bucket.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from app.utils.api_keys import ApiKeyStore, generate_api_key
+from app.utils.rate_limit import TokenBucketLimiter
+
+
+def build_store(directory: Path, count: int, cache_size: int) -> tuple:
+    """Create a store holding count keys; returns it with the full keys"""
+    store = ApiKeyStore(directory / f"keys-{count}.json", cache_size, reload_interval=0)
+    full_keys = []
+    for i in range(count):
+        full_key, key = generate_api_key(f"client-{i}")
+        store.keys[key.key_id] = key
+        full_keys.append(full_key)
+    return store, full_keys
+
+
+def per_lookup_us(func, keys: list, lookups: int) -> float:
+    start = time.perf_counter()
+    for i in range(lookups):
+        func(keys[i % len(keys)])
+    return (time.perf_counter() - start) / lookups * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--keys", default="10,1000,100000")
+    parser.add_argument("--lookups", type=int, default=100_000)
+    parser.add_argument("--clients", type=int, default=1000, help="Distinct keys in use")
+    args = parser.parse_args()
+
+    print(f"{args.lookups} verifications over up to {args.clients} active clients")
+    print(f"{'stored keys':>12s} {'uncached us':>12s} {'cached us':>10s} {'bucket us':>10s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in (int(value) for value in args.keys.split(",")):
+            store, full_keys = build_store(Path(tmp), count, cache_size=args.clients)
+            active = full_keys[: args.clients]
+
+            store.cache_size = 0
+            uncached = per_lookup_us(store.verify, active, args.lookups)
+
+            store.cache_size = args.clients
+            for key in active:
+                store.verify(key)
+            cached = per_lookup_us(store.verify, active, args.lookups)
+
+            limiter = TokenBucketLimiter()
+            bucket = per_lookup_us(
+                lambda key: limiter.acquire(key[:16], 1e9, 100), active, args.lookups
+            )
+
+            print(f"{count:12d} {uncached:12.2f} {cached:10.2f} {bucket:10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Derivative Benchmark
+Compares analysis decode cost of phone-camera originals vs the analysis rendition
+
+Usage: python -m benchmarks.bench_derivatives [--images 16] [--width 4032 --height 3024]
+
+Each synthetic original is written as JPEG and PNG, its derivatives are
+rendered once (the background cost paid per upload), and the features
+engine's decode step is timed on the original and on the rendition.
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.config import settings
+from app.services.derivative_service import parse_derivative_specs, render_derivatives
+from app.services.engines.features import load_image_array
+from app.utils.image_index import CONTENT_TYPES, ImageRecord
+from app.utils.storage import get_derivative_path
+
+
+def make_records(directory: Path, count: int, width: int, height: int, extension: str) -> list:
+    """Write synthetic skin-toned originals and return their records"""
+    rng = np.random.default_rng(0)
+    # Smooth gradient plus mild noise compresses roughly like a photo
+    gradient = np.linspace(0, 40, width, dtype=np.float32)[None, :, None]
+    records = []
+    for i in range(count):
+        tone = np.array([180 + i % 40, 130 + i % 30, 110], dtype=np.float32)
+        noise = rng.normal(0, 6, (height, width, 3)).astype(np.float32)
+        pixels = np.clip(tone + gradient + noise, 0, 255).astype(np.uint8)
+        image_id = f"image-{extension[1:]}-{i}"
+        path = directory / f"{image_id}{extension}"
+        Image.fromarray(pixels).save(path, quality=90)
+        content_type = CONTENT_TYPES[extension]
+        records.append(ImageRecord(image_id, path, path.stat().st_size, content_type, 0.0))
+    return records
+
+
+def timed(func, repeat: int) -> float:
+    """Best wall time of several runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    specs = parse_derivative_specs(settings.DERIVATIVES)
+    rendition = settings.ANALYSIS_RENDITION
+
+    print(f"Images: {args.images} per format at {args.width}x{args.height}, derivatives {specs}")
+    print(f"{'format':8s} {'original ms':>12s} {'rendition ms':>13s} {'speedup':>8s} {'render ms':>10s}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension in (".jpg", ".png"):
+            records = make_records(Path(tmp), args.images, args.width, args.height, extension)
+
+            render_time = timed(
+                lambda: [render_derivatives(r, specs, settings.DERIVATIVE_QUALITY) for r in records],
+                1,
+            )
+            originals = [r.path for r in records]
+            renditions = [get_derivative_path(r, rendition) for r in records]
+
+            original_time = timed(lambda: [load_image_array(p) for p in originals], args.repeat)
+            rendition_time = timed(lambda: [load_image_array(p) for p in renditions], args.repeat)
+
+            n = len(records)
+            print(
+                f"{extension[1:]:8s} {original_time / n * 1e3:12.2f} "
+                f"{rendition_time / n * 1e3:13.2f} {original_time / rendition_time:7.1f}x "
+                f"{render_time / n * 1e3:10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
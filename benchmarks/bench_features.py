@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Feature Extraction Benchmark
+Compares per-image cost of batched vs one-at-a-time feature extraction
+
+Usage: python -m benchmarks.bench_features [--images 256] [--batch-size 8]
+"""
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.services.engines.features import (
+    ANALYSIS_SIZE,
+    extract_features,
+    load_image_array,
+)
+
+
+def make_images(directory: Path, count: int, width: int, height: int) -> list:
+    """Write synthetic skin-toned JPEGs and return their paths"""
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(count):
+        tone = np.array([190 + i % 40, 130 + i % 30, 110], dtype=np.float32)
+        pixels = np.clip(tone + rng.normal(0, 12, (height, width, 3)), 0, 255)
+        path = directory / f"image-{i}.jpg"
+        Image.fromarray(pixels.astype(np.uint8)).save(path, "JPEG", quality=90)
+        paths.append(path)
+    return paths
+
+
+def timed(func, repeat: int) -> float:
+    """Best wall time of several runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_images(Path(tmp), args.images, args.width, args.height)
+
+        decode_time = timed(lambda: [load_image_array(p) for p in paths], args.repeat)
+        arrays = [load_image_array(p) for p in paths]
+
+    def per_image():
+        for array in arrays:
+            extract_features(array[None])
+
+    def batched():
+        for start in range(0, len(arrays), args.batch_size):
+            extract_features(np.stack(arrays[start:start + args.batch_size]))
+
+    per_image_time = timed(per_image, args.repeat)
+    batched_time = timed(batched, args.repeat)
+
+    n = len(arrays)
+    print(f"Images: {n} ({args.width}x{args.height} JPEG, analyzed at {ANALYSIS_SIZE}px)")
+    print(f"Decode + downsample:       {decode_time / n * 1e3:8.3f} ms/image")
+    print(f"Features, per image:       {per_image_time / n * 1e3:8.3f} ms/image")
+    print(f"Features, batch of {args.batch_size:<4}:   {batched_time / n * 1e3:8.3f} ms/image")
+    print(f"Batched speedup:           {per_image_time / batched_time:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Request Middleware Benchmark
+Compares the previous @app.middleware("http") layer with the raw ASGI one
+
+Usage: python -m benchmarks.bench_middleware [--requests 2000] [--uploads 50]
+
+Both variants wrap the same upload route and /health endpoint and are
+driven in-process through httpx.ASGITransport, so the numbers isolate
+framework and middleware overhead from the network.
+"""
+import argparse
+import asyncio
+import io
+import logging
+import os
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import httpx
+from PIL import Image
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.config import settings
+from app.routes import upload
+from app.utils import metrics
+from app.utils.log_config import request_id_var
+from app.utils.middleware import RequestContextMiddleware
+
+logger = logging.getLogger("benchmarks.bench_middleware")
+
+API_HEADERS = {"X-API-Key": settings.API_KEY}
+
+
+async def legacy_log_requests(request: Request, call_next):
+    """Previous implementation, registered through BaseHTTPMiddleware"""
+    start_time = time.perf_counter()
+
+    request_id = request.headers.get("x-request-id", "")[:128] or uuid.uuid4().hex
+    request_id_token = request_id_var.set(request_id)
+
+    logger.info("Request: %s %s", request.method, request.url.path)
+
+    status_code = 500
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        response.headers["X-Request-ID"] = request_id
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        process_time = time.perf_counter() - start_time
+        metrics.observe_request(
+            request.method, metrics.route_template(request.scope), status_code, process_time
+        )
+        logger.info("Response: %s | Time: %.1fms", status_code, process_time * 1000)
+        request_id_var.reset(request_id_token)
+
+    return response
+
+
+def build_app(variant: str) -> FastAPI:
+    app = FastAPI()
+    app.include_router(upload.router, prefix="/api")
+
+    @app.get("/health")
+    async def health_check():
+        return {"status": "healthy"}
+
+    if variant == "base_http":
+        app.add_middleware(BaseHTTPMiddleware, dispatch=legacy_log_requests)
+    else:
+        app.add_middleware(RequestContextMiddleware)
+    return app
+
+
+async def run_concurrently(count: int, concurrency: int, request) -> float:
+    """Issue count requests with bounded concurrency; returns elapsed seconds"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            response = await request()
+            response.raise_for_status()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(count)))
+    return time.perf_counter() - start
+
+
+async def bench_variant(variant: str, args, payload: bytes) -> dict:
+    transport = httpx.ASGITransport(app=build_app(variant))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up routing, validation and the upload path
+        await client.get("/health")
+        await client.post(
+            "/api/upload", headers=API_HEADERS, files={"file": ("warm.jpg", payload, "image/jpeg")}
+        )
+
+        health_time = await run_concurrently(
+            args.requests, args.concurrency, lambda: client.get("/health")
+        )
+        upload_time = await run_concurrently(
+            args.uploads,
+            args.concurrency,
+            lambda: client.post(
+                "/api/upload",
+                headers=API_HEADERS,
+                files={"file": ("bench.jpg", payload, "image/jpeg")},
+            ),
+        )
+
+    return {
+        "health_rps": args.requests / health_time,
+        "upload_rps": args.uploads / upload_time,
+        "upload_mb_s": args.uploads * len(payload) / upload_time / 1e6,
+    }
+
+
+async def run(args) -> None:
+    # A valid JPEG header (checked by upload validation) padded to size
+    header = io.BytesIO()
+    Image.new("RGB", (64, 48), (200, 150, 120)).save(header, "JPEG")
+    payload = header.getvalue() + os.urandom(int(args.upload_mb * 1024 * 1024) - header.tell())
+
+    results = {}
+    for variant in ("base_http", "asgi"):
+        best: dict = {}
+        for _ in range(args.repeat):
+            result = await bench_variant(variant, args, payload)
+            best = {key: max(best.get(key, 0.0), value) for key, value in result.items()}
+        results[variant] = best
+
+    print(
+        f"{args.requests} health requests, {args.uploads} uploads of {args.upload_mb}MB, "
+        f"concurrency {args.concurrency}, best of {args.repeat}"
+    )
+    print(f"{'variant':12s} {'health req/s':>14s} {'upload req/s':>14s} {'upload MB/s':>12s}")
+    for variant, result in results.items():
+        print(
+            f"{variant:12s} {result['health_rps']:14.0f} {result['upload_rps']:14.1f} "
+            f"{result['upload_mb_s']:12.1f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--upload-mb", type=float, default=4.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    # Per-request logging would dominate the measurement
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as upload_dir:
+        settings.UPLOAD_DIR = Path(upload_dir)
+        asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Ingest Normalization Benchmark
+Compares stored bytes and analysis decode cost of uploads before and after normalization
+
+Usage: python -m benchmarks.bench_normalize [--images 16] [--jpeg-size 4032x3024] [--png-size 2560x1440]
+
+Synthetic uploads are written as JPEG phone photos carrying an EXIF block
+(rotated orientation, camera tags and vendor data) and as PNG screenshots
+with text metadata, normalized once (the cost paid per upload), and the
+features engine's decode step is timed on the upload and on the stored
+file. Every upload must be accepted by /upload, so the script refuses
+sizes whose files exceed MAX_FILE_SIZE.
+"""
+import argparse
+import io
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, PngImagePlugin
+
+from app.config import settings
+from app.services.engines.features import load_image_array
+from app.services.normalize_service import normalize_image
+
+
+def make_exif() -> bytes:
+    """EXIF block of a typical phone photo, with its embedded thumbnail"""
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+    exif[0x010F] = "Benchmark"  # Make
+    exif[0x0110] = "Phone 1"  # Model
+    thumbnail = io.BytesIO()
+    Image.new("RGB", (160, 120), (180, 130, 110)).save(thumbnail, "JPEG")
+    exif[0x927C] = thumbnail.getvalue()  # MakerNote, standing in for vendor data
+    return exif.tobytes()
+
+
+def make_uploads(
+    directory: Path, count: int, width: int, height: int, extension: str
+) -> list:
+    """Write synthetic skin-toned uploads and return their paths"""
+    rng = np.random.default_rng(0)
+    exif = make_exif()
+    text = PngImagePlugin.PngInfo()
+    text.add_text("Software", "Benchmark")
+    # Smooth gradient plus noise compresses roughly like a photo (JPEG) or
+    # a screenshot of one (PNG, with less noise to stay within the limit)
+    gradient = np.linspace(0, 40, width, dtype=np.float32)[None, :, None]
+    sigma = 1.5 if extension == ".png" else 6
+    paths = []
+    for i in range(count):
+        tone = np.array([180 + i % 40, 130 + i % 30, 110], dtype=np.float32)
+        noise = rng.normal(0, sigma, (height, width, 3)).astype(np.float32)
+        pixels = np.clip(tone + gradient + noise, 0, 255).astype(np.uint8)
+        path = directory / f"upload-{i}{extension}"
+        if extension == ".png":
+            Image.fromarray(pixels).save(path, pnginfo=text)
+        else:
+            Image.fromarray(pixels).save(path, quality=92, exif=exif)
+        paths.append(path)
+    return paths
+
+
+def parse_size(value: str) -> tuple:
+    width, _, height = value.partition("x")
+    return int(width), int(height)
+
+
+def timed(func, repeat: int) -> float:
+    """Best wall time of several runs, in seconds"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--jpeg-size", type=parse_size, default=(4032, 3024))
+    parser.add_argument("--png-size", type=parse_size, default=(2560, 1440))
+    parser.add_argument("--max-dimension", type=int, default=settings.NORMALIZE_MAX_DIMENSION)
+    parser.add_argument("--quality", type=int, default=settings.NORMALIZE_QUALITY)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"Images: {args.images} per format (JPEG {args.jpeg_size[0]}x{args.jpeg_size[1]}, "
+        f"PNG {args.png_size[0]}x{args.png_size[1]}), normalized to {args.max_dimension}px "
+        f"(JPEG quality {args.quality})"
+    )
+    print(
+        f"{'format':8s} {'upload KB':>10s} {'stored KB':>10s} {'ratio':>6s} "
+        f"{'upload ms':>10s} {'stored ms':>10s} {'speedup':>8s} {'normalize ms':>13s}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for extension, (width, height) in ((".jpg", args.jpeg_size), (".png", args.png_size)):
+            uploads = make_uploads(Path(tmp), args.images, width, height, extension)
+            largest = max(path.stat().st_size for path in uploads)
+            if largest > settings.MAX_FILE_SIZE:
+                parser.error(
+                    f"{extension[1:]} uploads reach {largest} bytes, over MAX_FILE_SIZE "
+                    f"({settings.MAX_FILE_SIZE}); choose a smaller size"
+                )
+
+            targets = [path.with_name(f"{path.stem}.normalized{extension}") for path in uploads]
+            start = time.perf_counter()
+            # Uploads with nothing to normalize are stored as sent
+            stored = [
+                target
+                if normalize_image(source, target, args.max_dimension, args.quality)
+                else source
+                for source, target in zip(uploads, targets)
+            ]
+            normalize_time = time.perf_counter() - start
+
+            upload_bytes = sum(path.stat().st_size for path in uploads)
+            stored_bytes = sum(path.stat().st_size for path in stored)
+            upload_time = timed(lambda: [load_image_array(p) for p in uploads], args.repeat)
+            stored_time = timed(lambda: [load_image_array(p) for p in stored], args.repeat)
+
+            n = len(uploads)
+            print(
+                f"{extension[1:]:8s} {upload_bytes / n / 1024:10.0f} {stored_bytes / n / 1024:10.0f} "
+                f"{stored_bytes / upload_bytes:6.2f} {upload_time / n * 1e3:10.2f} "
+                f"{stored_time / n * 1e3:10.2f} {upload_time / stored_time:7.1f}x "
+                f"{normalize_time / n * 1e3:13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Index Benchmark
+Measures the multi-index Hamming index against a linear scan at up to 1M hashes
+
+Usage: python -m benchmarks.bench_phash [--entries 1000000] [--queries 2000] [--distances 0,4,8]
+
+Random 64-bit hashes are indexed, then queried with copies of stored
+hashes that have a given number of bits flipped, so every query has at
+least one true match. Reported per distance: index query latency, the
+NumPy linear scan it replaces, and recall against that scan. Also
+reported: build time, memory growth, replay time of a hash log of the
+same size, and the cost of hashing one phone-size JPEG.
+
+Real dHashes are less uniform than random ones (similar photos share
+chunks), so buckets are larger and queries somewhat slower in practice.
+"""
+import argparse
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+from app.services.near_duplicate_service import NearDuplicateService
+from app.utils.perceptual_hash import HammingIndex, dhash_file
+
+
+def max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def flip_bits(value: int, count: int, rng: random.Random) -> int:
+    for bit in rng.sample(range(64), count):
+        value ^= 1 << bit
+    return value
+
+
+def linear_scan(hashes: np.ndarray, value: int, max_distance: int) -> set:
+    """Rows within max_distance, by XOR and popcount over the whole array"""
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+    return set(np.nonzero(distances <= max_distance)[0].tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--entries", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--scan-queries", type=int, default=20, help="Queries timed/checked by scan")
+    parser.add_argument("--distances", default="0,4,8")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    values = [rng.getrandbits(64) for _ in range(args.entries)]
+    keys = [f"image-{i:08d}" for i in range(args.entries)]
+
+    rss_before = max_rss_mb()
+    index = HammingIndex()
+    start = time.perf_counter()
+    for key, value in zip(keys, values):
+        index.add(key, value)
+    build = time.perf_counter() - start
+    print(
+        f"{args.entries} hashes indexed in {build:.2f}s "
+        f"({build / args.entries * 1e6:.2f} us each, ~{max_rss_mb() - rss_before:.0f} MB)"
+    )
+
+    hashes = np.array(values, dtype=np.uint64)
+    print(f"{'distance':>8s} {'index us':>10s} {'scan us':>10s} {'recall':>7s} {'matches':>8s}")
+    for max_distance in (int(value) for value in args.distances.split(",")):
+        queries = [
+            flip_bits(values[rng.randrange(args.entries)], rng.randint(0, max_distance), rng)
+            for _ in range(args.queries)
+        ]
+
+        start = time.perf_counter()
+        found = [index.search(query, max_distance, limit=args.entries) for query in queries]
+        index_us = (time.perf_counter() - start) / len(queries) * 1e6
+
+        checked = queries[: args.scan_queries]
+        start = time.perf_counter()
+        expected = [linear_scan(hashes, query, max_distance) for query in checked]
+        scan_us = (time.perf_counter() - start) / len(checked) * 1e6
+
+        hits = total = 0
+        for matches, rows in zip(found, expected):
+            returned = {int(key.rpartition("-")[2]) for key, _ in matches}
+            hits += len(rows & returned)
+            total += len(rows)
+        matches = sum(len(result) for result in found) / len(found)
+        print(
+            f"{max_distance:8d} {index_us:10.1f} {scan_us:10.1f} "
+            f"{hits / total if total else 1.0:7.3f} {matches:8.2f}"
+        )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log_path = Path(tmp) / "phash.log"
+        with open(log_path, "w") as log_file:
+            log_file.writelines(f"{key} {value:016x}\n" for key, value in zip(keys, values))
+        service = NearDuplicateService(log_path, workers=1, max_distance=4, reuse=False)
+        start = time.perf_counter()
+        service._open_log()
+        replay = time.perf_counter() - start
+        service._log.close()
+        print(f"Log replay: {len(service.index)} hashes in {replay:.2f}s")
+
+        image_path = Path(tmp) / "photo.jpg"
+        pixels = np.random.default_rng(0).integers(0, 255, (378, 504, 3), dtype=np.uint8)
+        Image.fromarray(pixels).resize((4032, 3024), Image.BILINEAR).save(image_path, quality=90)
+        start = time.perf_counter()
+        for _ in range(20):
+            dhash_file(image_path)
+        print(f"dHash of a 4032x3024 JPEG: {(time.perf_counter() - start) / 20 * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+"""
+Load Benchmark
+Concurrent upload / analyze / download / mixed workloads against the full application
+
+Usage: python -m benchmarks.load [--target inprocess|uvicorn] [--workload all]
+                                 [--requests 500] [--concurrency 16]
+                                 [--sizes 640x480,1920x1080] [--format jpeg]
+                                 [--output results.json] [--baseline benchmarks/baseline.json]
+
+The in-process target drives the ASGI app through httpx.ASGITransport
+(lifespan included); the uvicorn target starts a local server in a
+subprocess. Either way the server works in a temporary directory, so
+bytes written can be measured and nothing touches ./uploads.
+
+Results are printed as a table and, with --output, written as JSON.
+With --baseline, throughput and p95 latency are compared against a
+previous --output file and the exit status is 1 if any workload
+regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import httpx
+import numpy as np
+from PIL import Image
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+API_KEY = os.getenv("API_KEY", "veefyed-UV9tbAcqbFpk")
+HEADERS = {"X-API-Key": API_KEY}
+
+WORKLOADS = ("upload", "analyze", "download", "mixed")
+
+# Distinct payloads generated per size, so content-addressed storage and
+# digest-keyed caches see realistic variety
+VARIANTS_PER_SIZE = 8
+
+
+def make_payloads(sizes: List[tuple], image_format: str) -> List[tuple]:
+    """
+    Encode synthetic skin-toned images
+
+    Returns:
+        List of (filename, bytes, content type)
+    """
+    rng = np.random.default_rng(0)
+    extension, content_type = (".png", "image/png") if image_format == "png" else (".jpg", "image/jpeg")
+    payloads = []
+    for width, height in sizes:
+        for variant in range(VARIANTS_PER_SIZE):
+            tone = np.array([185 + 5 * variant, 135, 115], dtype=np.float32)
+            pixels = np.clip(tone + rng.normal(0, 14, (height, width, 3)), 0, 255).astype(np.uint8)
+            buffer = io.BytesIO()
+            if image_format == "png":
+                Image.fromarray(pixels).save(buffer, "PNG", compress_level=1)
+            else:
+                Image.fromarray(pixels).save(buffer, "JPEG", quality=90)
+            payloads.append((f"bench-{width}x{height}-{variant}{extension}", buffer.getvalue(), content_type))
+    return payloads
+
+
+def percentile(samples: List[float], q: float) -> float:
+    return float(np.percentile(samples, q)) if samples else 0.0
+
+
+def directory_bytes(directory: Path) -> int:
+    """Total size of regular files (hard links counted once)"""
+    seen = set()
+    total = 0
+    for root, _, files in os.walk(directory):
+        for name in files:
+            try:
+                stat = os.lstat(os.path.join(root, name))
+            except FileNotFoundError:
+                # Temporary file renamed into place while walking
+                continue
+            if stat.st_ino not in seen:
+                seen.add(stat.st_ino)
+                total += stat.st_size
+    return total
+
+
+class Target:
+    """A running application plus an HTTP client for it"""
+
+    def __init__(self, client: httpx.AsyncClient, workdir: Path, peak_rss: Callable[[], int]):
+        self.client = client
+        self.workdir = workdir
+        self.peak_rss = peak_rss
+
+
+async def upload(client: httpx.AsyncClient, payload: tuple) -> str:
+    response = await client.post("/api/upload", headers=HEADERS, files={"file": payload})
+    response.raise_for_status()
+    return response.json()["image_id"]
+
+
+async def analyze(client: httpx.AsyncClient, image_id: str) -> None:
+    response = await client.post("/api/analyze", headers=HEADERS, json={"image_id": image_id})
+    response.raise_for_status()
+
+
+async def download(client: httpx.AsyncClient, image_id: str) -> None:
+    response = await client.get(f"/api/images/{image_id}", headers=HEADERS)
+    response.raise_for_status()
+
+
+async def run_workload(target: Target, workload: str, args, payloads: List[tuple]) -> dict:
+    """Run one workload and summarise its latencies"""
+    client = target.client
+
+    # Images for the analyze / download side are uploaded up front and not timed
+    image_ids: List[str] = []
+    if workload in ("analyze", "download", "mixed"):
+        for i in range(args.analyze_images):
+            image_ids.append(await upload(client, payloads[i % len(payloads)]))
+
+    def operation(i: int):
+        if workload == "upload" or (workload == "mixed" and i % 2 == 0):
+            return upload(client, payloads[i % len(payloads)])
+        if workload == "download":
+            return download(client, image_ids[i % len(image_ids)])
+        return analyze(client, image_ids[i % len(image_ids)])
+
+    latencies: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                await operation(i)
+            except httpx.HTTPError:
+                errors += 1
+                return
+            latencies.append(time.perf_counter() - start)
+
+    bytes_before = directory_bytes(target.workdir)
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(args.requests)))
+    elapsed = time.perf_counter() - start
+    bytes_written = directory_bytes(target.workdir) - bytes_before
+
+    return {
+        "requests": args.requests,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 4),
+        "rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 3),
+        "bytes_written": bytes_written,
+        "peak_rss_mb": round(target.peak_rss() / 1024 / 1024, 1),
+    }
+
+
+def _self_peak_rss() -> int:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _process_peak_rss(pid: int) -> Callable[[], int]:
+    def peak() -> int:
+        try:
+            with open(f"/proc/{pid}/status") as status:
+                for line in status:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        except OSError:
+            pass
+        return 0
+    return peak
+
+
+def _cpu_model() -> str:
+    # platform.processor() is empty on most Linux systems
+    try:
+        with open("/proc/cpuinfo") as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def _app_commit() -> Optional[str]:
+    # Commit of the benchmarked app code, marked dirty if app/ has local changes
+    root = Path(__file__).resolve().parent.parent
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=root, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        changes = subprocess.run(
+            ["git", "status", "--porcelain", "--", "app"],
+            cwd=root, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return f"{commit}-dirty" if changes else commit
+
+
+def _memory_mb() -> Optional[int]:
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES") // (1024 * 1024)
+    except (ValueError, OSError):
+        return None
+
+
+async def run_inprocess(args, payloads: List[tuple]) -> Dict[str, dict]:
+    # Settings are read from the environment at import and UPLOAD_DIR is
+    # relative, so import the app from inside the temporary directory
+    from app.main import app
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            target = Target(client, Path.cwd() / "uploads", _self_peak_rss)
+            for workload in args.workloads:
+                results[workload] = await run_workload(target, workload, args, payloads)
+    return results
+
+
+async def run_uvicorn(args, payloads: List[tuple]) -> Dict[str, dict]:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    env = {**os.environ, "PYTHONPATH": str(REPO_ROOT)}
+    server = subprocess.Popen(
+        [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(args.workers), "--log-level", "warning",
+        ],
+        env=env,
+        stderr=subprocess.DEVNULL if args.quiet_server else None,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    results = {}
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                if time.monotonic() > deadline or server.poll() is not None:
+                    raise RuntimeError("uvicorn did not become healthy")
+                await asyncio.sleep(0.2)
+
+            target = Target(client, Path.cwd() / "uploads", _process_peak_rss(server.pid))
+            for workload in args.workloads:
+                results[workload] = await run_workload(target, workload, args, payloads)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """
+    Compare throughput and p95 latency against a baseline
+
+    Returns:
+        Human-readable descriptions of every regression beyond tolerance
+    """
+    regressions = []
+    for workload, current in results["workloads"].items():
+        previous = baseline.get("workloads", {}).get(workload)
+        if previous is None:
+            continue
+        if current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{workload}: throughput {current['rps']:.1f} req/s vs baseline {previous['rps']:.1f}"
+            )
+        if current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{workload}: p95 {current['p95_ms']:.2f}ms vs baseline {previous['p95_ms']:.2f}ms"
+            )
+    return regressions
+
+
+def parse_sizes(value: str) -> List[tuple]:
+    sizes = []
+    for size in value.split(","):
+        width, height = size.lower().split("x")
+        sizes.append((int(width), int(height)))
+    return sizes
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workload", choices=(*WORKLOADS, "all"), default="all")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sizes", type=parse_sizes, default=parse_sizes("640x480,1920x1080"))
+    parser.add_argument("--format", choices=("jpeg", "png"), default="jpeg")
+    parser.add_argument(
+        "--analyze-images", type=int, default=64,
+        help="Images uploaded before analyze/download/mixed runs and used round-robin",
+    )
+    parser.add_argument(
+        "--cold", action="store_true", help="Disable the analysis cache so every analyze runs the engine"
+    )
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    parser.add_argument("--quiet-server", action="store_true", help="Discard uvicorn stderr")
+    parser.add_argument("--output", type=Path, help="Write results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+    args.workloads = WORKLOADS if args.workload == "all" else (args.workload,)
+
+    # Per-request logging would dominate the measurement
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ.setdefault("JOB_WORKERS", "0")
+    if args.cold:
+        os.environ["ANALYSIS_CACHE_SIZE"] = "0"
+
+    payloads = make_payloads(args.sizes, args.format)
+    sys.path.insert(0, str(REPO_ROOT))
+
+    original_cwd = Path.cwd()
+    with tempfile.TemporaryDirectory(prefix="veefyed-bench-") as workdir:
+        os.chdir(workdir)
+        os.makedirs("uploads", exist_ok=True)
+        try:
+            runner = run_inprocess if args.target == "inprocess" else run_uvicorn
+            workloads = asyncio.run(runner(args, payloads))
+        finally:
+            os.chdir(original_cwd)
+
+    results = {
+        "target": args.target,
+        "config": {
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "sizes": [f"{width}x{height}" for width, height in args.sizes],
+            "format": args.format,
+            "payload_bytes_avg": int(sum(len(p[1]) for p in payloads) / len(payloads)),
+            "analyze_images": args.analyze_images,
+            "cold": args.cold,
+            "workers": args.workers if args.target == "uvicorn" else None,
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "cpu_model": _cpu_model(),
+            "memory_mb": _memory_mb(),
+            "recorded": time.strftime("%Y-%m-%d"),
+            "commit": _app_commit(),
+        },
+        "workloads": workloads,
+    }
+
+    print(
+        f"{args.target}: {args.requests} requests per workload, concurrency {args.concurrency}, "
+        f"{results['config']['payload_bytes_avg'] / 1024:.0f}KB avg {args.format} payload"
+    )
+    print(
+        f"{'workload':10s} {'req/s':>9s} {'p50 ms':>9s} {'p95 ms':>9s} {'p99 ms':>9s} "
+        f"{'errors':>7s} {'written MB':>11s} {'peak RSS MB':>12s}"
+    )
+    for workload, result in workloads.items():
+        print(
+            f"{workload:10s} {result['rps']:9.1f} {result['p50_ms']:9.2f} {result['p95_ms']:9.2f} "
+            f"{result['p99_ms']:9.2f} {result['errors']:7d} {result['bytes_written'] / 1e6:11.1f} "
+            f"{result['peak_rss_mb']:12.1f}"
+        )
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Results written to {args.output}")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline.get("target") != results["target"] or baseline.get("config") != results["config"]:
+            print(f"Warning: {args.baseline} was recorded with a different target or configuration")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"Regressions beyond {args.tolerance:.0%} of {args.baseline}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            return 1
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,2 @@
+# test_api.py is a script against a live server (see TESTING.md), not a pytest module
+collect_ignore = ["test_api.py"]
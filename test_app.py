@@ -0,0 +1,180 @@
+"""
+In-process tests for Veefyed - Backend Technical Task
+Exercise the API through FastAPI's TestClient, without a running server
+
+Run with: python -m pytest test_app.py
+"""
+import io
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from PIL import Image
+
+# Size of the body chunks a client sends in the raw ASGI tests
+CHUNK_SIZE = 64 * 1024
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    """TestClient running the app inside a scratch directory"""
+    # UPLOAD_DIR and the stores under it are relative to the working directory
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    from app.main import app
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture(scope="module")
+def headers():
+    from app.config import settings
+    return {"X-API-Key": settings.API_KEY}
+
+
+def make_jpeg(size=(64, 48), color=(200, 100, 50)) -> bytes:
+    """Encode a solid-color JPEG"""
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def post_raw_upload(client, headers, payload: bytes, filename: str, content_length: bool = True):
+    """
+    Send a single-file upload straight to the ASGI app in CHUNK_SIZE pieces
+
+    Returns:
+        Tuple of (status code, body bytes the app read, body size)
+    """
+    body = (
+        b"--boundary\r\nContent-Disposition: form-data; name=\"file\"; "
+        b"filename=\"" + filename.encode() + b"\"\r\nContent-Type: image/jpeg\r\n\r\n"
+        + payload + b"\r\n--boundary--\r\n"
+    )
+    raw_headers = [(b"content-type", b"multipart/form-data; boundary=boundary")]
+    raw_headers += [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+    if content_length:
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/api/upload",
+        "raw_path": b"/api/upload",
+        "query_string": b"",
+        "headers": raw_headers,
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("testserver", 80),
+        "client": ("testclient", 50000),
+        "root_path": "",
+    }
+
+    async def run():
+        read = 0
+        messages = []
+
+        async def receive():
+            nonlocal read
+            chunk = body[read:read + CHUNK_SIZE]
+            read += len(chunk)
+            return {"type": "http.request", "body": chunk, "more_body": read < len(body)}
+
+        async def send(message):
+            messages.append(message)
+
+        await client.app(scope, receive, send)
+        return messages[0]["status"], read
+
+    status, read = client.portal.call(run)
+    return status, read, len(body)
+
+
+def test_upload_rejects_invalid_content_from_first_chunk(client, headers):
+    payload = os.urandom(4 * 1024 * 1024)
+    for content_length in (True, False):
+        status, read, total = post_raw_upload(
+            client, headers, payload, "photo.jpg", content_length=content_length
+        )
+        assert status == 400
+        assert read <= CHUNK_SIZE < total
+
+
+def test_upload_rejects_oversized_body(client, headers):
+    from app.config import settings
+    payload = make_jpeg() + bytes(settings.MAX_FILE_SIZE + 1024 * 1024)
+
+    # A declared Content-Length over the limit is rejected before any byte is read
+    status, read, _ = post_raw_upload(client, headers, payload, "photo.jpg")
+    assert status == 400
+    assert read == 0
+
+    # Without one, the upload fails as soon as the file crosses MAX_FILE_SIZE
+    status, read, total = post_raw_upload(
+        client, headers, payload, "photo.jpg", content_length=False
+    )
+    assert status == 400
+    assert read < total
+
+
+def test_upload_rejects_content_not_matching_extension(client, headers):
+    response = client.post(
+        "/api/upload",
+        headers=headers,
+        files={"file": ("photo.png", make_jpeg(), "image/png")},
+    )
+    assert response.status_code == 400
+    assert "does not match its extension" in response.json()["detail"]
+
+
+def upload_image(client, headers, content: bytes) -> str:
+    response = client.post(
+        "/api/upload",
+        headers=headers,
+        files={"file": ("photo.jpg", content, "image/jpeg")},
+    )
+    assert response.status_code == 200
+    return response.json()["image_id"]
+
+
+def test_analyze_misses_then_hits_cache(client, headers):
+    image_id = upload_image(client, headers, make_jpeg(color=(10, 20, 30)))
+    before = client.get("/api/analyze/stats", headers=headers).json()["cache"]
+
+    first = client.post("/api/analyze", headers=headers, json={"image_id": image_id})
+    middle = client.get("/api/analyze/stats", headers=headers).json()["cache"]
+    second = client.post("/api/analyze", headers=headers, json={"image_id": image_id})
+    after = client.get("/api/analyze/stats", headers=headers).json()["cache"]
+
+    assert first.status_code == second.status_code == 200
+    assert first.json() == second.json()
+    assert (middle["misses"] - before["misses"], middle["hits"] - before["hits"]) == (1, 0)
+    assert (after["misses"] - middle["misses"], after["hits"] - middle["hits"]) == (0, 1)
+
+
+def test_download_revalidates_and_serves_ranges(client, headers):
+    content = make_jpeg(size=(320, 240), color=(90, 160, 30))
+    image_id = upload_image(client, headers, content)
+    url = f"/api/images/{image_id}"
+
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200
+    assert response.content == content
+    assert "X-API-Key" in response.headers["vary"]
+    etag = response.headers["etag"]
+
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+
+    response = client.get(url, headers={**headers, "Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 0-99/{len(content)}"
+    assert response.content == content[:100]
+
+    # A stale If-Range validator gets the whole file instead
+    response = client.get(url, headers={**headers, "Range": "bytes=0-99", "If-Range": '"stale"'})
+    assert response.status_code == 200
+    assert response.content == content